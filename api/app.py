@@ -1,5 +1,8 @@
+import atexit
+import os
 import sys
 from pathlib import Path
+from typing import Optional, Union
 
 root_dir = Path(__file__).parent.parent
 sys.path.insert(0, str(root_dir))
@@ -8,31 +11,93 @@ from flask import Flask
 from flask_cors import CORS
 
 from database.database import Database
-from database.queue_manager import QueueManager
+from database.write_behind import WriteBehindConfig
+from database.queue_manager import QueueManager, SchedulingPolicy, create_policy
+from database.sqlite_queue import SQLiteQueueManager
 from services.order_service import OrderService
+from services.pending_loader import PendingOrderLoader
+from services.queue_checkpointer import QueueCheckpointer
+from services.status_cache import PassThroughStatusCache
+from services.sync_worker import SyncWorker
 from api.http.order_controller import OrderController
 from api.http.routes import register_routes
 from utils.logger import get_logger
+from utils.metrics import QUEUE_SIZE
 
 logger = get_logger(__name__)
 
-def create_app():
+def create_app(
+    scheduler: Union[str, SchedulingPolicy, None] = None,
+    aging_rate: Optional[float] = None,
+    write_behind: Optional[WriteBehindConfig] = None,
+    sync_url: Optional[str] = None,
+    background_load: Optional[bool] = None,
+    checkpoint_path: Optional[str] = None,
+    database_path: Optional[str] = None,
+    queue_backend: Optional[str] = None,
+    normalized_products: Optional[bool] = None
+):
+    """
+    Cria a aplicação. `scheduler` escolhe a política da fila ("fifo", "priority",
+    "sjf", "box_lanes" ou uma instância de SchedulingPolicy); sem argumentos são
+    usadas as variáveis ORDERS_API_SCHEDULER e ORDERS_API_AGING_RATE.
+    `write_behind` liga a gravação assíncrona em grupo (ou ORDERS_API_WRITE_BEHIND=1).
+    `sync_url` liga o envio dos pedidos ao sistema central (ou ORDERS_API_SYNC_URL).
+    `background_load` carrega os pendentes em segundo plano, com a API já no ar
+    (ou ORDERS_API_BACKGROUND_LOAD=1).
+    `checkpoint_path` liga o checkpoint binário da fila, gravado a cada
+    ORDERS_API_CHECKPOINT_INTERVAL segundos e ao encerrar (ou ORDERS_API_CHECKPOINT_PATH).
+    `database_path` troca o arquivo SQLite padrão (ou ORDERS_API_DATABASE_PATH).
+    `queue_backend` escolhe a fila: "memory" (padrão) ou "sqlite", compartilhada
+    por vários processos servindo o mesmo banco (ou ORDERS_API_QUEUE_BACKEND).
+    Na fila SQLite não há carga inicial nem checkpoint: os pendentes do banco já são a fila.
+    `normalized_products` mantém os produtos também nas tabelas Products, Syrups
+    e Toppings (ou ORDERS_API_NORMALIZED_PRODUCTS=1).
+    """
     logger.info("Inicializando aplicação Flask")
     app = Flask(__name__)
     CORS(app)
     
+    scheduler = scheduler or os.environ.get("ORDERS_API_SCHEDULER")
+    if aging_rate is None:
+        aging_rate = float(os.environ.get("ORDERS_API_AGING_RATE", 0))
+    if background_load is None:
+        background_load = os.environ.get("ORDERS_API_BACKGROUND_LOAD", "0").lower() in ("1", "true", "yes")
+    checkpoint_path = checkpoint_path or os.environ.get("ORDERS_API_CHECKPOINT_PATH")
+    if normalized_products is None:
+        normalized_products = os.environ.get("ORDERS_API_NORMALIZED_PRODUCTS", "0").lower() in ("1", "true", "yes")
+    
     logger.debug("Criando instâncias de dependências")
-    database = Database()
-    queue = QueueManager()
-    order_service = OrderService(database, queue)
+    database = Database(
+        database_path or os.environ.get("ORDERS_API_DATABASE_PATH"),
+        write_behind=write_behind or WriteBehindConfig.from_env(),
+        normalized_products=normalized_products
+    )
+    atexit.register(database.close)
+    policy = create_policy(scheduler, aging_rate)
+    queue_backend = (queue_backend or os.environ.get("ORDERS_API_QUEUE_BACKEND", "memory")).lower()
+    if queue_backend == "sqlite":
+        queue = SQLiteQueueManager(database, policy)
+        # Outros processos alteram os mesmos pedidos: o status é sempre lido do banco
+        order_service = OrderService(database, queue, PassThroughStatusCache())
+    elif queue_backend == "memory":
+        queue = QueueManager(policy)
+        order_service = OrderService(database, queue)
+    else:
+        raise ValueError(f"Fila desconhecida: {queue_backend}. Opções: memory, sqlite")
+    QUEUE_SIZE.set_function(queue.size)
     order_controller = OrderController(order_service)
     
-    logger.info("Carregando pedidos pendentes do banco de dados")
-    _load_pending_orders(database, queue)
+    if queue_backend == "memory":
+        _start_memory_queue(database, queue, order_service, background_load, checkpoint_path)
+    elif checkpoint_path:
+        logger.warning("Checkpoint da fila ignorado: a fila SQLite já é gravada no banco")
     
-    # Exibe estado inicial da fila
-    if queue.size() > 0:
-        print(queue.get_queue_state())
+    sync_url = sync_url or os.environ.get("ORDERS_API_SYNC_URL")
+    if sync_url:
+        sync_worker = SyncWorker(database, sync_url)
+        sync_worker.start()
+        atexit.register(sync_worker.stop)
     
     logger.info("Registrando rotas da API")
     register_routes(app, order_controller)
@@ -41,15 +106,35 @@ def create_app():
     return app
 
 
-def _load_pending_orders(database: Database, queue: QueueManager):
-    pending_orders = database.get_pending()
-    logger.info(f"Carregando {len(pending_orders)} pedidos pendentes para a fila")
-    
-    for order in pending_orders:
-        queue.enqueue(order)
-        logger.debug(f"Pedido {order.id} adicionado à fila")
+def _start_memory_queue(
+    database: Database,
+    queue: QueueManager,
+    order_service: OrderService,
+    background_load: bool,
+    checkpoint_path: Optional[str]
+) -> None:
+    """Carrega os pedidos pendentes na fila em memória e liga o checkpoint, se configurado"""
+    logger.info("Carregando pedidos pendentes do banco de dados")
+    loader = PendingOrderLoader(database, queue, order_service.status_cache, checkpoint_path=checkpoint_path)
+    if background_load:
+        loader.start()
+    else:
+        loader.run()
+        
+        # Exibe estado inicial da fila
+        if queue.size() > 0:
+            print(queue.get_queue_state())
     
-    logger.info(f"Total de {queue.size()} pedidos na fila após carregamento")
+    if checkpoint_path:
+        checkpointer = QueueCheckpointer(
+            queue,
+            database,
+            checkpoint_path,
+            interval=float(os.environ.get("ORDERS_API_CHECKPOINT_INTERVAL", 30)),
+            loader=loader
+        )
+        checkpointer.start()
+        atexit.register(checkpointer.stop)
 
 
 if __name__ == '__main__':
@@ -1,10 +1,25 @@
+from datetime import datetime
+from typing import Optional
 from flask import request
-from services.order_service import OrderService
+from services.order_service import DuplicateOrderError, OrderService
 from utils.responses import OrderResponse, ApiResponse
 from utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+# Limite do long polling em GET /order/get?wait=SECONDS; cada espera ocupa uma thread do servidor
+MAX_WAIT_SECONDS = 30.0
+# Tamanho da página de GET /queue/snapshot
+DEFAULT_PAGE_LIMIT = 50
+MAX_PAGE_LIMIT = 500
+# Janela padrão de GET /stats, em horas; o máximo é a retenção do OrderAnalytics
+DEFAULT_STATS_HOURS = 24
+
+
+def _int_arg(name: str, default: Optional[int]) -> Optional[int]:
+    """Parâmetro inteiro da query string; -1 quando presente mas não numérico"""
+    return request.args.get(name, default=-1, type=int) if name in request.args else default
+
 
 class OrderController:
     
@@ -19,25 +34,71 @@ class OrderController:
             return OrderResponse.invalid_order_format()
         
         try:
-            logger.debug(f"Criando pedido com dados: box={data.get('box')}, size={data.get('size')}")
+            logger.debug("Criando pedido com dados: box=%s, size=%s", data.get('box'), data.get('size'))
             order = self.order_service.create_order(data)
-            logger.info(f"Pedido criado com sucesso: ID={order.id}, Box={order.box}, Status={order.status}")
+            logger.info("Pedido criado com sucesso: ID=%s, Box=%s, Status=%s", order.id, order.box, order.status)
             return OrderResponse.order_created(order)
+        except DuplicateOrderError as e:
+            return OrderResponse.order_already_exists(str(e))
+        except Exception as e:
+            logger.error("Erro ao criar pedido: %s", e, exc_info=True)
+            return ApiResponse.error(message=str(e))
+    
+    def put_orders_batch(self):
+        data = request.get_json(silent=True)
+        orders_data = data.get('orders') if isinstance(data, dict) else data
+        
+        if not isinstance(orders_data, list) or not orders_data:
+            logger.warning("Tentativa de criar lote de pedidos com dados inválidos ou vazios")
+            return OrderResponse.invalid_order_format()
+        
+        try:
+            logger.debug("Criando lote de pedidos: quantidade=%s", len(orders_data))
+            results = self.order_service.create_orders(orders_data)
+            return OrderResponse.orders_batch_created(results)
         except Exception as e:
-            logger.error(f"Erro ao criar pedido: {str(e)}", exc_info=True)
+            logger.error("Erro ao criar lote de pedidos: %s", e, exc_info=True)
             return ApiResponse.error(message=str(e))
     
     def get_order(self):
-        logger.debug("Solicitando próximo pedido da fila")
-        order = self.order_service.get_next_order()
+        if 'n' in request.args:
+            return self.get_orders()
+        
+        wait = 0.0
+        if 'wait' in request.args:
+            wait = request.args.get('wait', default=-1.0, type=float)
+        if not 0 <= wait < float('inf'):
+            logger.warning("Tentativa de obter pedido com espera inválida: %s", request.args.get('wait'))
+            return OrderResponse.invalid_wait()
+        
+        wait = min(wait, MAX_WAIT_SECONDS)
+        logger.debug("Solicitando próximo pedido da fila, espera máxima de %ss", wait)
+        order = self.order_service.get_next_order(wait=wait)
         
         if order:
-            logger.info(f"Pedido recuperado: ID={order.id}, Box={order.box}, Status={order.status}")
+            logger.info("Pedido recuperado: ID=%s, Box=%s, Status=%s", order.id, order.box, order.status)
             return OrderResponse.order_retrieved(order)
         
         logger.info("Fila de pedidos está vazia")
         return OrderResponse.queue_empty()
     
+    def get_orders(self):
+        count = request.args.get('n', default=-1, type=int)
+        
+        if count < 1:
+            logger.warning("Tentativa de obter pedidos com quantidade inválida: %s", request.args.get('n'))
+            return OrderResponse.invalid_order_count()
+        
+        logger.debug("Solicitando até %s pedidos da fila", count)
+        orders = self.order_service.get_next_orders(count)
+        
+        if orders:
+            logger.info("%s pedidos recuperados: IDs=%s", len(orders), [order.id for order in orders])
+            return OrderResponse.orders_retrieved(orders)
+        
+        logger.info("Fila de pedidos está vazia")
+        return OrderResponse.queue_empty()
+    
     def finish_order(self):
         data = request.get_json(silent=True)
         
@@ -45,17 +106,21 @@ class OrderController:
             logger.warning("Tentativa de finalizar pedido com dados inválidos ou vazios")
             return OrderResponse.invalid_order_format()
         
-        order_id = data.get('id', 'desconhecido')
-        logger.debug(f"Finalizando pedido: ID={order_id}")
+        order_id = data.get('id', -1)
+        logger.debug("Finalizando pedido: ID=%s", order_id)
         
-        success = self.order_service.finish_order(data)
+        try:
+            success = self.order_service.finish_order(data)
+        except ValueError as e:
+            logger.warning("Falha ao finalizar pedido %s: %s", order_id, e)
+            return OrderResponse.failed_to_finish()
         
         if success:
-            logger.info(f"Pedido finalizado com sucesso: ID={order_id}")
+            logger.info("Pedido finalizado com sucesso: ID=%s", order_id)
             return OrderResponse.order_finished()
         
-        logger.warning(f"Falha ao finalizar pedido: ID={order_id}")
-        return OrderResponse.failed_to_finish()
+        # O corpo é válido, então o id já é um inteiro (ou conversível para um)
+        return self._transition_refused(int(order_id))
     
     def cancel_order(self):
         data = request.get_json(silent=True)
@@ -64,52 +129,157 @@ class OrderController:
             logger.warning("Tentativa de cancelar pedido com dados inválidos ou vazios")
             return OrderResponse.invalid_order_format()
         
-        order_id = data.get('id', 'desconhecido')
-        logger.debug(f"Cancelando pedido: ID={order_id}")
+        order_id = data.get('id', -1)
+        logger.debug("Cancelando pedido: ID=%s", order_id)
         
-        success = self.order_service.cancel_order(data)
+        try:
+            success = self.order_service.cancel_order(data)
+        except ValueError as e:
+            logger.warning("Falha ao cancelar pedido %s: %s", order_id, e)
+            return OrderResponse.invalid_order_format()
         
         if success:
-            logger.info(f"Pedido cancelado com sucesso: ID={order_id}")
+            logger.info("Pedido cancelado com sucesso: ID=%s", order_id)
             return OrderResponse.order_cancelled()
         
-        logger.warning(f"Pedido não encontrado na fila para cancelamento: ID={order_id}")
-        return OrderResponse.order_not_in_queue()
+        return self._transition_refused(int(order_id))
     
     def cancel_order_by_id(self):
         order_id = request.args.get('id', default=-1, type=int)
         
         if order_id < 0:
-            logger.warning(f"Tentativa de cancelar pedido com ID inválido: {order_id}")
+            logger.warning("Tentativa de cancelar pedido com ID inválido: %s", order_id)
             return OrderResponse.invalid_order_id()
         
-        logger.debug(f"Cancelando pedido por ID: {order_id}")
+        logger.debug("Cancelando pedido por ID: %s", order_id)
         success = self.order_service.cancel_order_by_id(order_id)
         
         if success:
-            logger.info(f"Pedido cancelado com sucesso por ID: {order_id}")
+            logger.info("Pedido cancelado com sucesso por ID: %s", order_id)
             return OrderResponse.order_cancelled(order_id)
         
-        logger.warning(f"Pedido não encontrado para cancelamento: ID={order_id}")
+        logger.warning("Pedido não encontrado para cancelamento: ID=%s", order_id)
         return OrderResponse.order_not_in_queue()
     
+    def finish_order_by_id(self, order_id: int):
+        logger.debug("Finalizando pedido por ID: %s", order_id)
+        
+        if self.order_service.finish_order_by_id(order_id):
+            return OrderResponse.order_finished()
+        
+        return self._transition_refused(order_id)
+    
+    def cancel_order_by_path_id(self, order_id: int):
+        logger.debug("Cancelando pedido por ID: %s", order_id)
+        
+        if self.order_service.cancel_order_by_id(order_id):
+            return OrderResponse.order_cancelled(order_id)
+        
+        return self._transition_refused(order_id)
+    
+    def _transition_refused(self, order_id: int):
+        """404 se o pedido não existe; 409 se o status atual não permite a transição"""
+        status = self.order_service.get_order_status(order_id)
+        
+        if status is None:
+            logger.info("Pedido não encontrado: ID=%s", order_id)
+            return OrderResponse.order_not_found()
+        
+        logger.warning("Transição recusada para o pedido %s com status %s", order_id, status)
+        return OrderResponse.invalid_transition(status)
+    
+    def update_product(self, order_id: int, product_id: int):
+        data = request.get_json(silent=True)
+        
+        if not isinstance(data, dict) or not data:
+            logger.warning("Tentativa de alterar produto com dados inválidos ou vazios")
+            return OrderResponse.invalid_product_format()
+        
+        try:
+            product_json = self.order_service.update_product(order_id, product_id, data)
+        except ValueError as e:
+            logger.warning("Alteração inválida do produto %s do pedido %s: %s", product_id, order_id, e)
+            return ApiResponse.error(message=str(e))
+        
+        if product_json is None:
+            return OrderResponse.product_not_found()
+        
+        return OrderResponse.product_updated(product_json)
+    
     def get_order_status(self):
         order_id = request.args.get('id', default=-1, type=int)
         
         if order_id < 0:
-            logger.warning(f"Tentativa de consultar status com ID inválido: {order_id}")
+            logger.warning("Tentativa de consultar status com ID inválido: %s", order_id)
             return OrderResponse.invalid_order_id()
         
-        logger.debug(f"Consultando status do pedido: ID={order_id}")
+        logger.debug("Consultando status do pedido: ID=%s", order_id)
         status = self.order_service.get_order_status(order_id)
         
         if status:
-            logger.debug(f"Status do pedido {order_id}: {status}")
+            logger.debug("Status do pedido %s: %s", order_id, status)
             return OrderResponse.order_status(status)
         
-        logger.info(f"Pedido não encontrado: ID={order_id}")
+        logger.info("Pedido não encontrado: ID=%s", order_id)
         return OrderResponse.order_not_found()
     
+    def export_orders(self):
+        filters = {
+            "status": request.args.get('status'),
+            "box": _int_arg('box', None),
+            "since": request.args.get('since'),
+            "until": request.args.get('until'),
+            "after": _int_arg('after', None),
+            "limit": _int_arg('limit', None),
+        }
+        
+        for name in ("since", "until"):
+            if filters[name] is not None:
+                try:
+                    filters[name] = datetime.fromisoformat(filters[name]).strftime('%Y-%m-%d %H:%M:%S')
+                except ValueError:
+                    logger.warning("Filtro de exportação inválido: %s=%s", name, filters[name])
+                    return OrderResponse.invalid_export_filter(f"Invalid '{name}' timestamp")
+        
+        for name, minimum in (("box", 0), ("after", 0), ("limit", 1)):
+            if filters[name] is not None and filters[name] < minimum:
+                logger.warning("Filtro de exportação inválido: %s=%s", name, request.args.get(name))
+                return OrderResponse.invalid_export_filter(f"Invalid '{name}'")
+        
+        logger.debug("Exportando pedidos com filtros: %s", filters)
+        rows = self.order_service.export_orders(**filters)
+        return OrderResponse.orders_export(rows)
+    
+    def get_queue_snapshot(self):
+        offset = _int_arg('offset', 0)
+        limit = _int_arg('limit', DEFAULT_PAGE_LIMIT)
+        
+        if offset < 0 or not 1 <= limit <= MAX_PAGE_LIMIT:
+            logger.warning(
+                "Paginação inválida no snapshot da fila: offset=%s, limit=%s",
+                request.args.get('offset'), request.args.get('limit')
+            )
+            return OrderResponse.invalid_pagination()
+        
+        logger.debug("Snapshot da fila: offset=%s, limit=%s", offset, limit)
+        return OrderResponse.queue_snapshot(self.order_service.get_queue_page(offset, limit))
+    
+    def queue_events(self):
+        """Stream SSE das mudanças da fila, começando por um snapshot"""
+        events = self.order_service.events.stream(self.order_service.queue_snapshot)
+        return ApiResponse.stream(
+            events, "text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
+    
+    def get_stats(self):
+        hours = _int_arg('hours', DEFAULT_STATS_HOURS)
+        
+        if not 1 <= hours <= self.order_service.analytics.retention_hours:
+            logger.warning("Tentativa de consultar estatísticas com janela inválida: %s", request.args.get('hours'))
+            return OrderResponse.invalid_stats_window()
+        
+        return OrderResponse.stats(self.order_service.get_stats(hours))
+    
     def get_queue_state(self) -> str:
         """Retorna a representação visual do estado atual da fila"""
         return self.order_service.get_queue_state()
@@ -1,7 +1,9 @@
-from flask import Flask, request
+import time
+from flask import Flask, g, request
 from api.http.order_controller import OrderController
 from utils.responses import ApiResponse
 from utils.logger import get_logger
+from utils.metrics import CONTENT_TYPE, HTTP_REQUESTS, HTTP_REQUEST_SECONDS, REGISTRY
 
 logger = get_logger(__name__)
 
@@ -15,62 +17,135 @@ def _display_queue_state(controller: OrderController):
 def register_routes(app: Flask, controller: OrderController):
     """Registra todas as rotas da API de pedidos"""
     
+    @app.before_request
+    def start_timer():
+        g.request_started = time.perf_counter()
+    
+    @app.after_request
+    def record_metrics(response):
+        started = g.pop('request_started', None)
+        if started is not None:
+            # O padrão da rota (e não o path) mantém a cardinalidade dos rótulos fixa
+            route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+            HTTP_REQUESTS.inc(request.method, route, str(response.status_code))
+            HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, request.method, route)
+        return response
+    
     @app.route('/order/put', methods=['POST'])
     def put_order():
-        logger.info(f"POST /order/put - IP: {request.remote_addr}")
+        logger.info("POST /order/put - IP: %s", request.remote_addr)
         response = controller.put_order()
-        logger.debug(f"POST /order/put - Status: {response[1]}")
+        logger.debug("POST /order/put - Status: %s", response[1])
+        return response
+    
+    @app.route('/order/put_batch', methods=['POST'])
+    def put_orders_batch():
+        logger.info("POST /order/put_batch - IP: %s", request.remote_addr)
+        response = controller.put_orders_batch()
+        logger.debug("POST /order/put_batch - Status: %s", response[1])
         return response
     
     @app.route('/order/get', methods=['GET'])
     def get_order():
-        logger.info(f"GET /order/get - IP: {request.remote_addr}")
+        logger.info("GET /order/get - IP: %s", request.remote_addr)
         response = controller.get_order()
-        logger.debug(f"GET /order/get - Status: {response[1]}")
+        logger.debug("GET /order/get - Status: %s", response[1])
         return response
     
     @app.route('/order/finish', methods=['POST'])
     def finish_order():
-        logger.info(f"POST /order/finish - IP: {request.remote_addr}")
+        logger.info("POST /order/finish - IP: %s", request.remote_addr)
         response = controller.finish_order()
-        logger.debug(f"POST /order/finish - Status: {response[1]}")
+        logger.debug("POST /order/finish - Status: %s", response[1])
         return response
     
     @app.route('/order/cancel', methods=['POST'])
     def cancel_order():
-        logger.info(f"POST /order/cancel - IP: {request.remote_addr}")
+        logger.info("POST /order/cancel - IP: %s", request.remote_addr)
         response = controller.cancel_order()
-        logger.debug(f"POST /order/cancel - Status: {response[1]}")
+        logger.debug("POST /order/cancel - Status: %s", response[1])
+        return response
+    
+    @app.route('/order/<int:order_id>/finish', methods=['POST'])
+    def finish_order_by_id(order_id):
+        logger.info("POST /order/%s/finish - IP: %s", order_id, request.remote_addr)
+        response = controller.finish_order_by_id(order_id)
+        logger.debug("POST /order/%s/finish - Status: %s", order_id, response[1])
+        return response
+    
+    @app.route('/order/<int:order_id>/cancel', methods=['POST'])
+    def cancel_order_by_path_id(order_id):
+        logger.info("POST /order/%s/cancel - IP: %s", order_id, request.remote_addr)
+        response = controller.cancel_order_by_path_id(order_id)
+        logger.debug("POST /order/%s/cancel - Status: %s", order_id, response[1])
+        return response
+    
+    @app.route('/order/<int:order_id>/product/<int:product_id>', methods=['PATCH'])
+    def update_product(order_id, product_id):
+        logger.info("PATCH /order/%s/product/%s - IP: %s", order_id, product_id, request.remote_addr)
+        response = controller.update_product(order_id, product_id)
+        logger.debug("PATCH /order/%s/product/%s - Status: %s", order_id, product_id, response[1])
         return response
     
     @app.route('/order/cancel_by_id', methods=['GET'])
     def cancel_order_by_id():
         order_id = request.args.get('id', default=-1, type=int)
-        logger.info(f"GET /order/cancel_by_id?id={order_id} - IP: {request.remote_addr}")
+        logger.info("GET /order/cancel_by_id?id=%s - IP: %s", order_id, request.remote_addr)
         response = controller.cancel_order_by_id()
-        logger.debug(f"GET /order/cancel_by_id - Status: {response[1]}")
+        logger.debug("GET /order/cancel_by_id - Status: %s", response[1])
         return response
     
     @app.route('/order/status', methods=['GET'])
     def get_order_status():
         order_id = request.args.get('id', default=-1, type=int)
-        logger.info(f"GET /order/status?id={order_id} - IP: {request.remote_addr}")
+        logger.info("GET /order/status?id=%s - IP: %s", order_id, request.remote_addr)
         response = controller.get_order_status()
-        logger.debug(f"GET /order/status - Status: {response[1]}")
+        logger.debug("GET /order/status - Status: %s", response[1])
+        return response
+    
+    @app.route('/orders/export', methods=['GET'])
+    def export_orders():
+        logger.info("GET /orders/export - IP: %s", request.remote_addr)
+        response = controller.export_orders()
+        logger.debug("GET /orders/export - Status: %s", response[1])
         return response
     
     @app.route('/queue/status', methods=['GET'])
     def get_queue_status():
         """Exibe o estado atual da fila no console e retorna informações em JSON"""
-        logger.info(f"GET /queue/status - IP: {request.remote_addr}")
+        logger.info("GET /queue/status - IP: %s", request.remote_addr)
         _display_queue_state(controller)
         return ApiResponse.success(
             data={"message": "Queue state displayed in console"},
             message="Queue state displayed successfully"
         )
     
+    @app.route('/queue/snapshot', methods=['GET'])
+    def get_queue_snapshot():
+        logger.info("GET /queue/snapshot - IP: %s", request.remote_addr)
+        response = controller.get_queue_snapshot()
+        logger.debug("GET /queue/snapshot - Status: %s", response[1])
+        return response
+    
+    @app.route('/queue/events', methods=['GET'])
+    def get_queue_events():
+        logger.info("GET /queue/events - IP: %s", request.remote_addr)
+        return controller.queue_events()
+    
+    @app.route('/stats', methods=['GET'])
+    def get_stats():
+        logger.info("GET /stats - IP: %s", request.remote_addr)
+        response = controller.get_stats()
+        logger.debug("GET /stats - Status: %s", response[1])
+        return response
+    
+    @app.route('/metrics', methods=['GET'])
+    def get_metrics():
+        """Métricas no formato de exposição em texto do Prometheus"""
+        return ApiResponse.stream(REGISTRY.render(), CONTENT_TYPE)
+    
     @app.errorhandler(404)
     def not_found(e):
-        logger.warning(f"404 - Endpoint não encontrado: {request.path} - IP: {request.remote_addr}")
+        logger.warning("404 - Endpoint não encontrado: %s - IP: %s", request.path, request.remote_addr)
         return ApiResponse.not_found(message="Endpoint not found")
 
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Compara o tempo de reinício da fila com a carga completa do banco
+(PendingOrderLoader lendo todos os pendentes) e com o checkpoint binário
+mapeado em memória mais a reaplicação das linhas alteradas depois dele.
+
+Uso:
+    python benchmarks/bench_checkpoint_restore.py --rows 100000 --changes 1000
+"""
+import argparse
+import logging
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+root_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(root_dir))
+
+from database.database import Database
+from database.queue_manager import QueueManager
+from models.models import Order
+from services.pending_loader import PendingOrderLoader
+from services.queue_checkpointer import QueueCheckpointer
+from tests.testE2E.mock import create_order_with_multiple_products
+
+
+def restart(database: Database, checkpoint_path=None) -> QueueManager:
+    queue = QueueManager()
+    PendingOrderLoader(database, queue, checkpoint_path=checkpoint_path).run()
+    return queue
+
+
+def timed(label: str, func):
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<44} {elapsed * 1000:>9.1f} ms")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--changes", type=int, default=1000, help="pedidos criados depois do checkpoint")
+    args = parser.parse_args()
+    
+    logging.disable(logging.INFO)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        database = Database(str(Path(tmp) / "bench.db"))
+        checkpoint_path = str(Path(tmp) / "queue.ckpt")
+        template = create_order_with_multiple_products()
+        database.insert_many([
+            Order.model_validate({**template, "id": i}) for i in range(1, args.rows + 1)
+        ])
+        
+        queue = restart(database)
+        timed("gravação do checkpoint", QueueCheckpointer(queue, database, checkpoint_path).run_once)
+        database.insert_many([
+            Order.model_validate({**template, "id": i})
+            for i in range(args.rows + 1, args.rows + args.changes + 1)
+        ])
+        
+        print(f"{args.rows} pedidos no checkpoint, {args.changes} criados depois dele")
+        full = timed("carga completa do banco", lambda: restart(database))
+        restored = timed("checkpoint + reaplicação", lambda: restart(database, checkpoint_path))
+        assert full.size() == restored.size() == args.rows + args.changes
+        database.close()
+
+
+if __name__ == "__main__":
+    main()
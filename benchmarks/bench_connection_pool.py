@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Compara requests/s das rotas /order/put e /order/status com e sem o pool
+de conexões do Database.
+
+Uso:
+    python benchmarks/bench_connection_pool.py --requests 2000 --threads 4
+"""
+import argparse
+import logging
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+root_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(root_dir))
+
+from flask import Flask
+
+from database.database import Database
+from database.queue_manager import QueueManager
+from services.order_service import OrderService
+from api.http.order_controller import OrderController
+from api.http.routes import register_routes
+from tests.testE2E.mock import create_simple_order
+
+
+def build_app(database: Database) -> Flask:
+    app = Flask(__name__)
+    controller = OrderController(OrderService(database, QueueManager()))
+    register_routes(app, controller)
+    return app
+
+
+def run_route(app: Flask, route: str, total: int, threads: int, id_offset: int) -> float:
+    per_thread = total // threads
+
+    def worker(index: int):
+        client = app.test_client()
+        base = id_offset + index * per_thread
+        for i in range(per_thread):
+            order_id = base + i
+            if route == "put":
+                client.post("/order/put", json=create_simple_order(order_id=order_id))
+            else:
+                client.get("/order/status", query_string={"id": order_id})
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    start = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - start
+    return (per_thread * threads) / elapsed
+
+
+def run_scenario(label: str, pool_size: int, pragmas, total: int, threads: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        database = Database(str(Path(tmp) / "bench.db"), pool_size=pool_size, pragmas=pragmas)
+        app = build_app(database)
+        put_rps = run_route(app, "put", total, threads, id_offset=1)
+        status_rps = run_route(app, "status", total, threads, id_offset=1)
+        database.close()
+    print(f"{label:<32} put: {put_rps:>9.1f} req/s   status: {status_rps:>9.1f} req/s")
+    return put_rps, status_rps
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--with-logs", action="store_true", help="mantém os logs INFO/DEBUG ativos")
+    args = parser.parse_args()
+
+    if not args.with_logs:
+        logging.disable(logging.INFO)
+
+    print(f"Requisições por rota: {args.requests}, threads: {args.threads}")
+    before = run_scenario("sem pool (conexão por chamada)", 0, {}, args.requests, args.threads)
+    after = run_scenario("pool + PRAGMAs", Database.POOL_SIZE, None, args.requests, args.threads)
+    print(f"{'ganho':<32} put: {after[0] / before[0]:>8.2f}x        status: {after[1] / before[1]:>8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
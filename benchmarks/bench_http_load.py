@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+Teste de carga HTTP do ciclo de vida dos pedidos. Sobe create_app() em um
+servidor local (werkzeug, uma thread por conexão) com um banco temporário e
+dispara, com N clientes concorrentes, uma mistura de operações:
+
+    put     POST /order/put, com os payloads de tests/testE2E/mock.py
+    get     GET /order/get, o pedido retirado fica disponível para o finish
+    finish  POST /order/finish de um pedido retirado (sem nenhum, vira um get)
+    cancel  POST /order/cancel de um pedido criado no teste
+    status  GET /order/status de um pedido criado no teste
+
+O resultado (p50/p95/p99 em ms e requests/s por rota, mais o commit atual)
+é gravado em JSON, para comparar execuções entre commits. Os logs da
+aplicação vão para o stdout:
+
+    python benchmarks/bench_http_load.py --requests 20000 --concurrency 16 --output results.json > /dev/null
+    python benchmarks/bench_http_load.py --mix put=1,get=1,status=8 --log-level WARNING
+"""
+import argparse
+import itertools
+import json
+import logging
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict, deque
+from pathlib import Path
+from typing import Dict, List, Optional
+
+root_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(root_dir))
+
+import requests
+
+from tests.testE2E.mock import create_order_with_multiple_products, create_simple_order
+
+
+DEFAULT_MIX = "put=4,get=3,finish=2,cancel=1,status=4"
+OPERATIONS = ("put", "get", "finish", "cancel", "status")
+
+
+def parse_mix(spec: str) -> Dict[str, int]:
+    """Lê "put=4,get=3,..." em {operação: peso}"""
+    mix = {}
+    for item in spec.split(','):
+        name, _, weight = item.partition('=')
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise argparse.ArgumentTypeError(f"Operação desconhecida: {name}. Opções: {', '.join(OPERATIONS)}")
+        mix[name] = int(weight)
+    if not any(mix.values()):
+        raise argparse.ArgumentTypeError("A mistura precisa de ao menos uma operação com peso positivo")
+    return mix
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Percentil pelo método nearest-rank"""
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def current_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=str(root_dir), capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class LoadGenerator:
+    """
+    Estado compartilhado entre os clientes: os ids a criar, os pedidos
+    criados (alvos de status e cancel) e os retirados da fila (alvos do finish).
+    """
+    
+    RECENT_ORDERS = 10000
+    
+    def __init__(self, base_url: str, mix: Dict[str, int], first_id: int, seed: int):
+        self.base_url = base_url
+        self.operations = [name for name, weight in mix.items() if weight > 0]
+        self.weights = [mix[name] for name in self.operations]
+        self.seed = seed
+        
+        self._ids = itertools.count(first_id)
+        self._created: deque = deque(maxlen=self.RECENT_ORDERS)
+        self._in_production: deque = deque()
+    
+    def order_payload(self, rng: random.Random) -> dict:
+        order_id = next(self._ids)
+        box = rng.randint(1, 8)
+        if rng.random() < 0.25:
+            return create_order_with_multiple_products(order_id=order_id, box=box)
+        return create_simple_order(order_id=order_id, box=box)
+    
+    def worker(self, index: int, count: int, samples: Dict[str, List[float]], errors: Dict[str, int]) -> None:
+        rng = random.Random(self.seed + index)
+        session = requests.Session()
+        
+        for operation in rng.choices(self.operations, self.weights, k=count):
+            route, call = self._request(operation, rng, session)
+            start = time.perf_counter()
+            try:
+                response = call()
+            except requests.RequestException:
+                errors[route] += 1
+                continue
+            samples[route].append(time.perf_counter() - start)
+            
+            if response.status_code >= 500:
+                errors[route] += 1
+            elif route == "GET /order/get":
+                self._track_retrieved(response)
+        
+        session.close()
+    
+    def _request(self, operation: str, rng: random.Random, session: requests.Session):
+        if operation == "finish":
+            try:
+                order = self._in_production.popleft()
+                return "POST /order/finish", lambda: session.post(f"{self.base_url}/order/finish", json=order)
+            except IndexError:
+                operation = "get"
+        
+        if operation == "get":
+            return "GET /order/get", lambda: session.get(f"{self.base_url}/order/get")
+        
+        if operation == "put" or not self._created:
+            payload = self.order_payload(rng)
+            self._created.append(payload)
+            return "POST /order/put", lambda: session.post(f"{self.base_url}/order/put", json=payload)
+        
+        target = self._created[rng.randrange(len(self._created))]
+        if operation == "cancel":
+            return "POST /order/cancel", lambda: session.post(f"{self.base_url}/order/cancel", json=target)
+        return "GET /order/status", lambda: session.get(
+            f"{self.base_url}/order/status", params={"id": target["id"]}
+        )
+    
+    def _track_retrieved(self, response: requests.Response) -> None:
+        if response.status_code != 200:
+            return
+        order = response.json().get("order")
+        if order:
+            self._in_production.append(order)
+
+
+def summarize(samples: Dict[str, List[float]], errors: Dict[str, int], elapsed: float) -> Dict[str, dict]:
+    routes = {}
+    for route in sorted(set(samples) | set(errors)):
+        latencies = sorted(samples.get(route, []))
+        routes[route] = {
+            "requests": len(latencies),
+            "errors": errors.get(route, 0),
+            "requests_per_second": round(len(latencies) / elapsed, 1),
+            "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+            "p95_ms": round(percentile(latencies, 0.95) * 1000, 3),
+            "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        }
+    return routes
+
+
+def run(args: argparse.Namespace, workdir: str) -> dict:
+    # A configuração de log é lida na primeira importação dos módulos da aplicação
+    if args.log_level:
+        os.environ["ORDERS_API_LOG_LEVEL"] = args.log_level
+    from werkzeug.serving import make_server
+    from api.app import create_app
+    from database.database import Database
+    from models.models import Order
+    
+    database_path = str(Path(workdir) / "bench.db")
+    if args.preload:
+        database = Database(database_path)
+        database.insert_many([
+            Order.model_validate(create_simple_order(order_id=i, box=i % 8 + 1)) for i in range(1, args.preload + 1)
+        ])
+        database.close()
+    
+    app = create_app(scheduler=args.scheduler, database_path=database_path)
+    # O log de acesso do werkzeug (uma linha por requisição, no stderr) distorceria a medição
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    server_thread = threading.Thread(target=server.serve_forever, name="bench-http-server", daemon=True)
+    server_thread.start()
+    
+    generator = LoadGenerator(
+        f"http://127.0.0.1:{server.server_port}", args.mix, first_id=args.preload + 1, seed=args.seed
+    )
+    per_worker = args.requests // args.concurrency
+    samples: Dict[str, List[float]] = defaultdict(list)
+    errors: Dict[str, int] = defaultdict(int)
+    workers = [
+        threading.Thread(target=generator.worker, args=(i, per_worker, samples, errors))
+        for i in range(args.concurrency)
+    ]
+    
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+    
+    server.shutdown()
+    server_thread.join()
+    
+    total = sum(len(latencies) for latencies in samples.values())
+    all_latencies = sorted(latency for latencies in samples.values() for latency in latencies)
+    return {
+        "commit": current_commit(),
+        "config": {
+            "requests": per_worker * args.concurrency,
+            "concurrency": args.concurrency,
+            "mix": args.mix,
+            "preload": args.preload,
+            "scheduler": args.scheduler or "fifo",
+            "seed": args.seed,
+        },
+        "elapsed_seconds": round(elapsed, 3),
+        "total": {
+            "requests": total,
+            "errors": sum(errors.values()),
+            "requests_per_second": round(total / elapsed, 1),
+            "p50_ms": round(percentile(all_latencies, 0.50) * 1000, 3),
+            "p95_ms": round(percentile(all_latencies, 0.95) * 1000, 3),
+            "p99_ms": round(percentile(all_latencies, 0.99) * 1000, 3),
+        },
+        "routes": summarize(samples, errors, elapsed),
+    }
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        "--requests", type=int, default=5000, help="total de requisições, divididas entre os clientes"
+    )
+    parser.add_argument("--concurrency", type=int, default=8, help="clientes simultâneos")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX), help=f"pesos (padrão {DEFAULT_MIX})")
+    parser.add_argument("--preload", type=int, default=1000, help="pedidos pendentes no banco antes de subir a API")
+    parser.add_argument("--scheduler", default=None, help="política da fila (fifo, priority, sjf, box_lanes)")
+    parser.add_argument("--log-level", default=None, help="ORDERS_API_LOG_LEVEL da aplicação durante o teste")
+    parser.add_argument("--seed", type=int, default=1607)
+    parser.add_argument("--output", default=None, help="arquivo JSON do resultado (padrão: stderr)")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    
+    with tempfile.TemporaryDirectory() as workdir:
+        result = run(args, workdir)
+    
+    report = json.dumps(result, indent=2, ensure_ascii=False)
+    if args.output:
+        Path(args.output).write_text(report + "\n", encoding="utf-8")
+        print(
+            f"{result['total']['requests_per_second']:,.0f} req/s, p99 {result['total']['p99_ms']} ms "
+            f"-> {args.output}",
+            file=sys.stderr
+        )
+    else:
+        print(report, file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
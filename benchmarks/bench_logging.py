@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Mede requests/s de GET /order/get com o logging da aplicação ativo
+(console e arquivo em logs/), para comparar configurações de log.
+
+As mensagens do console vão para o stdout; redirecione-o para isolar o
+resultado, que é impresso no stderr:
+
+    python benchmarks/bench_logging.py --requests 5000 --threads 4 > /dev/null
+    python benchmarks/bench_logging.py --no-logging
+"""
+import argparse
+import logging
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+root_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(root_dir))
+
+from flask import Flask
+
+from database.database import Database
+from database.queue_manager import QueueManager
+from models.models import Order
+from services.order_service import OrderService
+from api.http.order_controller import OrderController
+from api.http.routes import register_routes
+from tests.testE2E.mock import create_simple_order
+
+
+def build_app(database: Database, total: int) -> Flask:
+    queue = QueueManager()
+    orders = [Order.model_validate(create_simple_order(order_id=i)) for i in range(1, total + 1)]
+    database.insert_many(orders)
+    queue.enqueue_many(orders)
+    
+    app = Flask(__name__)
+    register_routes(app, OrderController(OrderService(database, queue)))
+    return app
+
+
+def run(app: Flask, total: int, threads: int) -> float:
+    per_thread = total // threads
+    
+    def worker():
+        client = app.test_client()
+        for _ in range(per_thread):
+            client.get("/order/get")
+    
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    start = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    return (per_thread * threads) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--threads", type=int, default=1)
+    parser.add_argument("--no-logging", action="store_true", help="desliga todo o logging (referência sem custo de log)")
+    args = parser.parse_args()
+    
+    if args.no_logging:
+        logging.disable(logging.CRITICAL)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        database = Database(str(Path(tmp) / "bench.db"))
+        app = build_app(database, args.requests)
+        rate = run(app, args.requests, args.threads)
+        database.close()
+    
+    print(f"GET /order/get: {rate:,.0f} req/s ({args.requests} requisições, {args.threads} thread(s))", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Compara o custo de montar as respostas de pedido (order_created e
+order_retrieved) com o caminho anterior (model_dump + jsonify) e com o
+atual (JSON do pedido guardado no Order e emendado no corpo), para pedidos
+com muitos produtos, caldas e coberturas.
+
+Cenários, como no ciclo de um pedido:
+  - criado: produtos validados na entrada, já serializados pela gravação no banco;
+  - retirado: o mesmo pedido com o status trocado para 'production';
+  - lido do banco: Order.from_storage, produtos ainda não decodificados.
+
+Uso:
+    python benchmarks/bench_order_serialization.py --orders 2000 --products 20 --syrups 5 --toppings 5
+"""
+import argparse
+import logging
+import sys
+import time
+from pathlib import Path
+
+root_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(root_dir))
+
+from flask import Flask, jsonify
+from models.models import Order
+from tests.testE2E.mock import create_order_data, create_product_data
+from utils.responses import OrderResponse
+
+
+def legacy_response(order: Order, message=None):
+    body = {"status": "success"}
+    if message:
+        body["message"] = message
+    body["order"] = order.model_dump()
+    return jsonify(body)
+
+
+def build_orders(count: int, products: int, syrups: int, toppings: int) -> list:
+    product_list = [
+        create_product_data(
+            product_id=p,
+            cup=p,
+            flavour=f"flavour-{p}",
+            syrups=[{"name": f"syrup-{s}", "qtd": s} for s in range(syrups)],
+            toppings=[{"name": f"topping-{t}", "qtd": t} for t in range(toppings)],
+        )
+        for p in range(products)
+    ]
+    return [
+        Order.model_validate(create_order_data(order_id=i, size=products, products=product_list))
+        for i in range(1, count + 1)
+    ]
+
+
+def timed(label: str, orders: list, build) -> float:
+    start = time.perf_counter()
+    for order in orders:
+        build(order)
+    per_order = (time.perf_counter() - start) / len(orders)
+    print(f"{label:<46} {per_order * 1e6:>9.1f} µs/resposta")
+    return per_order
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=2000)
+    parser.add_argument("--products", type=int, default=20)
+    parser.add_argument("--syrups", type=int, default=5)
+    parser.add_argument("--toppings", type=int, default=5)
+    args = parser.parse_args()
+    
+    logging.disable(logging.CRITICAL)
+    app = Flask(__name__)
+    
+    with app.app_context():
+        print(
+            f"{args.orders} pedidos com {args.products} produtos, "
+            f"{args.syrups} caldas e {args.toppings} coberturas cada"
+        )
+        
+        orders = build_orders(args.orders, args.products, args.syrups, args.toppings)
+        for order in orders:
+            order.products_json()
+        before = timed(
+            "criado, anterior (model_dump + jsonify)", orders, lambda order: legacy_response(order, "Order received")
+        )
+        after = timed("criado, atual (bytes emendados)", orders, OrderResponse.order_created)
+        print(f"{'':<46} {before / after:>9.1f}x")
+        
+        for order in orders:
+            order.status = "production"
+        before = timed("retirado, anterior", orders, legacy_response)
+        for order in orders:
+            order.status = "production"
+        after = timed("retirado, atual", orders, OrderResponse.order_retrieved)
+        print(f"{'':<46} {before / after:>9.1f}x")
+        
+        rows = [(o.id, o.box, o.status, o.size, o.priority, o.products_json()) for o in orders]
+        before = timed("lido do banco, anterior", [Order.from_storage(*row) for row in rows], legacy_response)
+        after = timed(
+            "lido do banco, atual", [Order.from_storage(*row) for row in rows], OrderResponse.order_retrieved
+        )
+        print(f"{'':<46} {before / after:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Mede a latência de cancelamento (QueueManager.remove) com a fila cheia,
+comparando com a remoção linear por deque.remove usada anteriormente.
+
+Uso:
+    python benchmarks/bench_queue_cancel.py --sizes 1000 10000 100000 --cancels 1000
+"""
+import argparse
+import logging
+import random
+import sys
+import time
+from collections import deque
+from pathlib import Path
+
+root_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(root_dir))
+
+from database.queue_manager import QueueManager
+from models.models import Order
+
+
+def build_orders(count: int):
+    return [Order(id=i, box=i % 4, size=1) for i in range(1, count + 1)]
+
+
+def bench_queue_manager(orders, cancel_ids) -> float:
+    queue = QueueManager()
+    for order in orders:
+        queue.enqueue(order)
+    
+    targets = [orders[order_id - 1] for order_id in cancel_ids]
+    start = time.perf_counter()
+    for order in targets:
+        queue.remove(order)
+    return (time.perf_counter() - start) / len(targets)
+
+
+def bench_linear_deque(orders, cancel_ids) -> float:
+    queue = deque(orders)
+    targets = [orders[order_id - 1] for order_id in cancel_ids]
+    start = time.perf_counter()
+    for order in targets:
+        queue.remove(order)
+    return (time.perf_counter() - start) / len(targets)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--cancels", type=int, default=1000)
+    parser.add_argument("--skip-linear", action="store_true", help="não executa a referência deque.remove")
+    args = parser.parse_args()
+    
+    logging.disable(logging.INFO)
+    random.seed(1607)
+    
+    print(f"{'pedidos na fila':>16} {'QueueManager (us)':>18} {'deque.remove (us)':>18}")
+    for size in args.sizes:
+        orders = build_orders(size)
+        cancel_ids = random.sample(range(1, size + 1), min(args.cancels, size))
+        
+        manager_us = bench_queue_manager(orders, cancel_ids) * 1e6
+        linear = "-" if args.skip_linear else f"{bench_linear_deque(orders, cancel_ids) * 1e6:.2f}"
+        print(f"{size:>16} {manager_us:>18.2f} {linear:>18}")
+
+
+if __name__ == "__main__":
+    main()
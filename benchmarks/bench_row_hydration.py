@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Compara o custo de Database.get_pending com a hidratação anterior
+(json.loads + Product(**p) + Order(...) por linha) e com a atual
+(Order.from_storage, produtos decodificados sob demanda).
+
+Uso:
+    python benchmarks/bench_row_hydration.py --rows 100000
+"""
+import argparse
+import gc
+import json
+import logging
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+root_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(root_dir))
+
+from database.database import Database, SQL_GET_PENDING
+from models.models import Order, Product
+from tests.testE2E.mock import create_order_with_multiple_products
+
+
+def legacy_row_to_order(row) -> Order:
+    order_id, box, status, size, products_json, priority = row
+    products = [Product(**p) for p in json.loads(products_json)]
+    return Order(id=order_id, box=box, status=status, size=size, products=products, priority=priority)
+
+
+def timed(label: str, func):
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<44} {elapsed * 1000:>9.1f} ms")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--no-gc", action="store_true", help="desliga o coletor cíclico para isolar o custo de CPU")
+    args = parser.parse_args()
+    
+    logging.disable(logging.INFO)
+    if args.no_gc:
+        gc.disable()
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        database = Database(str(Path(tmp) / "bench.db"))
+        template = create_order_with_multiple_products()
+        database.insert_many([
+            Order.model_validate({**template, "id": i}) for i in range(1, args.rows + 1)
+        ])
+        
+        with database._get_connection() as conn:
+            rows = timed("leitura das linhas (fetchall)", lambda: conn.execute(SQL_GET_PENDING).fetchall())
+        
+        print(f"{args.rows} pedidos pendentes com {len(template['products'])} produtos cada")
+        timed("anterior: json.loads + Product(**p)", lambda: [legacy_row_to_order(row) for row in rows])
+        orders = timed("get_pending (produtos sob demanda)", database.get_pending)
+        timed("  + acesso a products de todos os pedidos", lambda: [order.products for order in orders])
+        timed("  + products_json() sem decodificar", lambda: [
+            order.products_json() for order in database.get_pending()
+        ])
+        database.close()
+
+
+if __name__ == "__main__":
+    main()
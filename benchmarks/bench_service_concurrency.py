@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Mede a vazão do OrderService com várias threads retirando e cancelando
+pedidos ao mesmo tempo (o padrão do servidor Flask multi-thread), e o custo
+de um enqueue + dequeue sem disputa no QueueManager.
+
+A retirada da fila é serializada pelo lock da fila, mantido só pelo trabalho
+no heap; as transições de pedidos diferentes não se bloqueiam (locks por
+pedido). Ainda assim o GIL e o escritor único do SQLite limitam a vazão: o
+esperado é que ela se mantenha estável com mais threads, sem cair.
+
+Uso:
+    python benchmarks/bench_service_concurrency.py --orders 4000 --threads 1 2 4 8
+"""
+import argparse
+import logging
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+root_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(root_dir))
+
+from database.database import Database
+from database.queue_manager import QueueManager
+from models.models import Order
+from services.order_service import OrderService
+from tests.testE2E.mock import create_simple_order
+
+
+def bench_uncontended_queue(operations: int) -> float:
+    queue = QueueManager()
+    orders = [Order(id=i) for i in range(1, operations + 1)]
+    start = time.perf_counter()
+    for order in orders:
+        queue.enqueue(order)
+        queue.dequeue()
+    return (time.perf_counter() - start) / operations
+
+
+def bench_service(workdir: str, orders: int, threads: int) -> float:
+    database = Database(str(Path(workdir) / f"bench_{threads}.db"), pool_size=max(5, threads))
+    service = OrderService(database, QueueManager())
+    service.create_orders([create_simple_order(order_id=i) for i in range(1, orders + 1)])
+    barrier = threading.Barrier(threads + 1)
+    
+    def worker(index):
+        barrier.wait()
+        # Uma em cada oito operações cancela um pedido qualquer, que pode estar sendo retirado
+        operation = 0
+        while True:
+            operation += 1
+            if operation % 8 == 0:
+                service.cancel_order_by_id((index * 7919 + operation) % orders + 1)
+            elif service.get_next_order() is None:
+                return
+    
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for w in workers:
+        w.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - start
+    database.close()
+    return orders / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=4000)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--queue-operations", type=int, default=100000)
+    args = parser.parse_args()
+    
+    logging.disable(logging.CRITICAL)
+    
+    per_operation = bench_uncontended_queue(args.queue_operations)
+    print(f"QueueManager enqueue + dequeue sem disputa: {per_operation * 1e6:.2f} µs")
+    
+    with tempfile.TemporaryDirectory() as workdir:
+        baseline = None
+        for threads in args.threads:
+            rate = bench_service(workdir, args.orders, threads)
+            baseline = baseline or rate
+            print(f"{threads:>3} thread(s): {rate:>8,.0f} pedidos/s ({rate / baseline:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Mede a vazão de retirada (GET /order/get) com a fila compartilhada SQLite
+(ORDERS_API_QUEUE_BACKEND=sqlite) e de 1 a N processos consumindo o mesmo
+banco, e confere que nenhum pedido é entregue duas vezes.
+
+Cada processo monta o próprio OrderService sobre um SQLiteQueueManager e
+retira pedidos até a fila esvaziar. A reivindicação é um único UPDATE ...
+RETURNING e o SQLite serializa os escritores: o ganho com mais processos vem
+do trabalho fora da transação (montar o pedido, serializar, HTTP), não de
+escritas em paralelo.
+
+Uso:
+    python benchmarks/bench_sqlite_queue.py --orders 4000 --processes 1 2 4 8
+"""
+import argparse
+import logging
+import multiprocessing
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+root_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(root_dir))
+
+from database.database import Database
+from database.sqlite_queue import SQLiteQueueManager
+from models.models import Order
+from services.order_service import OrderService
+from services.status_cache import PassThroughStatusCache
+from tests.testE2E.mock import create_simple_order
+
+
+def consume(database_path: str, batch: int, start_event) -> list:
+    logging.disable(logging.CRITICAL)
+    database = Database(database_path)
+    service = OrderService(database, SQLiteQueueManager(database), PassThroughStatusCache())
+    claimed = []
+    start_event.wait()
+    while True:
+        if batch > 1:
+            orders = service.get_next_orders(batch)
+        else:
+            order = service.get_next_order()
+            orders = [order] if order is not None else []
+        if not orders:
+            break
+        claimed.extend(order.id for order in orders)
+    database.close()
+    return claimed
+
+
+def bench_processes(workdir: str, orders: int, processes: int, batch: int) -> float:
+    database_path = str(Path(workdir) / f"bench_{processes}.db")
+    database = Database(database_path)
+    database.insert_many([Order.model_validate(create_simple_order(order_id=i)) for i in range(1, orders + 1)])
+    database.close()
+    
+    context = multiprocessing.get_context("spawn")
+    with context.Manager() as manager, context.Pool(processes) as pool:
+        start_event = manager.Event()
+        pending = pool.starmap_async(consume, [(database_path, batch, start_event)] * processes)
+        # Espera os processos subirem para não medir o custo do spawn
+        time.sleep(1.0)
+        start = time.perf_counter()
+        start_event.set()
+        results = pending.get()
+        elapsed = time.perf_counter() - start
+    
+    claimed = [order_id for ids in results for order_id in ids]
+    if sorted(claimed) != list(range(1, orders + 1)):
+        raise SystemExit(f"Entrega duplicada ou perdida com {processes} processo(s)")
+    return orders / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=4000)
+    parser.add_argument("--processes", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--batch", type=int, default=1, help="Pedidos por retirada (1 = get_next_order)")
+    args = parser.parse_args()
+    
+    logging.disable(logging.CRITICAL)
+    
+    with tempfile.TemporaryDirectory() as workdir:
+        baseline = None
+        for processes in args.processes:
+            rate = bench_processes(workdir, args.orders, processes, args.batch)
+            baseline = baseline or rate
+            print(f"{processes:>3} processo(s): {rate:>8,.0f} pedidos/s ({rate / baseline:.2f}x), sem duplicatas")
+
+
+if __name__ == "__main__":
+    main()
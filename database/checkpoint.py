@@ -0,0 +1,102 @@
+import mmap
+import os
+import struct
+import zlib
+from typing import List
+from models.models import Order
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+# Formato (little-endian):
+#   cabeçalho: magic, versão, reservado, nº de entradas, change_seq, tamanho do blob, crc32
+#   entradas:  id, box, size, priority, offset no blob, tamanho do status, tamanho dos produtos
+#   blob:      para cada entrada, o status seguido do JSON dos produtos, ambos em UTF-8
+# O crc32 cobre tudo o que vem depois do cabeçalho.
+CHECKPOINT_MAGIC = b'OQCK'
+CHECKPOINT_VERSION = 1
+
+_HEADER = struct.Struct('<4sHHIQQI')
+_ENTRY = struct.Struct('<qqqqQHI')
+
+
+class CheckpointError(Exception):
+    """Checkpoint ausente, corrompido ou de versão incompatível"""
+
+
+class QueueCheckpoint:
+
+    def __init__(self, change_seq: int, orders: List[Order]):
+        self.change_seq = change_seq
+        self.orders = orders
+
+
+def write_checkpoint(path: str, orders: List[Order], change_seq: int) -> None:
+    """
+    Grava os pedidos, na ordem recebida, junto com o change_seq do banco no
+    momento do snapshot. Escreve em um arquivo temporário e o renomeia, então
+    quem lê nunca vê um checkpoint pela metade.
+    """
+    entries = bytearray()
+    blob = bytearray()
+    for order in orders:
+        status = order.status.encode()
+        products = order.products_json().encode()
+        entries += _ENTRY.pack(
+            order.id, order.box, order.size, order.priority, len(blob), len(status), len(products)
+        )
+        blob += status
+        blob += products
+    
+    crc = zlib.crc32(blob, zlib.crc32(entries))
+    header = _HEADER.pack(CHECKPOINT_MAGIC, CHECKPOINT_VERSION, 0, len(orders), change_seq, len(blob), crc)
+    
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'wb') as f:
+        f.write(header)
+        f.write(entries)
+        f.write(blob)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+    logger.debug("Checkpoint gravado em %s: %s pedidos, change_seq=%s", path, len(orders), change_seq)
+
+
+def read_checkpoint(path: str) -> QueueCheckpoint:
+    """Mapeia o checkpoint em memória e reconstrói os pedidos sem decodificar os produtos"""
+    try:
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return _parse(mm)
+    except (OSError, ValueError, struct.error) as e:
+        raise CheckpointError(f"Checkpoint ilegível em {path}: {str(e)}") from e
+
+
+def _parse(mm: mmap.mmap) -> QueueCheckpoint:
+    if len(mm) < _HEADER.size:
+        raise CheckpointError("Checkpoint truncado")
+    
+    magic, version, _, count, change_seq, blob_size, crc = _HEADER.unpack_from(mm, 0)
+    if magic != CHECKPOINT_MAGIC:
+        raise CheckpointError("Arquivo não é um checkpoint da fila")
+    if version != CHECKPOINT_VERSION:
+        raise CheckpointError(f"Versão de checkpoint {version} incompatível (esperada {CHECKPOINT_VERSION})")
+    
+    blob_start = _HEADER.size + count * _ENTRY.size
+    if len(mm) != blob_start + blob_size:
+        raise CheckpointError("Tamanho do checkpoint não confere com o cabeçalho")
+    
+    with memoryview(mm) as view:
+        if zlib.crc32(view[_HEADER.size:]) != crc:
+            raise CheckpointError("Checksum do checkpoint não confere")
+    
+    orders = []
+    for order_id, box, size, priority, offset, status_size, products_size in _ENTRY.iter_unpack(
+        mm[_HEADER.size:blob_start]
+    ):
+        start = blob_start + offset
+        status = mm[start:start + status_size].decode()
+        products_json = mm[start + status_size:start + status_size + products_size].decode()
+        orders.append(Order.from_storage(order_id, box, status, size, priority, products_json))
+    
+    return QueueCheckpoint(change_seq, orders)
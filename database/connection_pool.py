@@ -0,0 +1,147 @@
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from queue import LifoQueue, Empty, Full
+from typing import Dict, Optional, Any
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+DEFAULT_PRAGMAS: Dict[str, Any] = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "mmap_size": 64 * 1024 * 1024,
+    "cache_size": -16000,
+    "busy_timeout": 5000,
+}
+
+
+class ConnectionPool:
+    """
+    Pool de conexões SQLite com reaproveitamento por thread.
+
+    Uma thread que já possui uma conexão recebe a mesma conexão em chamadas
+    aninhadas; ao sair do bloco mais externo a conexão volta para o pool.
+    Conexões ociosas há mais de `health_check_interval` segundos são testadas
+    com `SELECT 1` antes de serem reutilizadas.
+    """
+
+    def __init__(
+        self,
+        database_name: str,
+        size: int = 5,
+        pragmas: Optional[Dict[str, Any]] = None,
+        timeout: float = 10.0,
+        health_check_interval: float = 30.0,
+    ):
+        self.database_name = database_name
+        self.size = size
+        self.pragmas = dict(DEFAULT_PRAGMAS if pragmas is None else pragmas)
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+
+        self._idle: LifoQueue = LifoQueue(maxsize=max(size, 1))
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._created = 0
+        self._closed = False
+        logger.debug("ConnectionPool criado: arquivo=%s, tamanho=%s", database_name, size)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.database_name, timeout=self.timeout, check_same_thread=False)
+        for name, value in self.pragmas.items():
+            conn.execute(f"PRAGMA {name} = {value}")
+        return conn
+
+    def _is_healthy(self, conn: sqlite3.Connection) -> bool:
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def _discard(self, conn: sqlite3.Connection) -> None:
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+        with self._lock:
+            self._created -= 1
+
+    def _acquire(self) -> sqlite3.Connection:
+        if self.size <= 0:
+            return self._connect()
+
+        while True:
+            try:
+                conn, last_used = self._idle.get_nowait()
+            except Empty:
+                with self._lock:
+                    can_create = self._created < self.size
+                    if can_create:
+                        self._created += 1
+                if can_create:
+                    try:
+                        return self._connect()
+                    except sqlite3.Error:
+                        with self._lock:
+                            self._created -= 1
+                        raise
+                try:
+                    conn, last_used = self._idle.get(timeout=self.timeout)
+                except Empty:
+                    raise sqlite3.OperationalError("Tempo esgotado aguardando conexão livre no pool")
+
+            if time.monotonic() - last_used < self.health_check_interval or self._is_healthy(conn):
+                return conn
+
+            logger.warning("Conexão inválida descartada do pool")
+            self._discard(conn)
+
+    def _release(self, conn: sqlite3.Connection) -> None:
+        if self.size <= 0 or self._closed:
+            conn.close()
+            return
+
+        if conn.in_transaction:
+            conn.rollback()
+
+        try:
+            self._idle.put_nowait((conn, time.monotonic()))
+        except Full:
+            self._discard(conn)
+
+    @contextmanager
+    def connection(self):
+        """Fornece uma conexão do pool, reutilizando a da thread atual se houver"""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            self._local.depth += 1
+            try:
+                yield conn
+            finally:
+                self._local.depth -= 1
+            return
+
+        conn = self._acquire()
+        self._local.conn = conn
+        self._local.depth = 1
+        try:
+            yield conn
+        finally:
+            self._local.conn = None
+            self._local.depth = 0
+            self._release(conn)
+
+    def close(self) -> None:
+        """Fecha todas as conexões ociosas e impede novos retornos ao pool"""
+        self._closed = True
+        while True:
+            try:
+                conn, _ = self._idle.get_nowait()
+            except Empty:
+                break
+            self._discard(conn)
+        logger.debug("ConnectionPool fechado")
@@ -1,163 +1,764 @@
 import sqlite3
-from typing import List, Optional
-from models.models import Order, Product
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Union
+from models.models import Order
+from database.connection_pool import ConnectionPool, DEFAULT_PRAGMAS
+from database.migrations import apply_migrations
+from database.write_behind import WriteBehindConfig, WriteBehindWriter
 from utils.logger import get_logger
+from utils.metrics import DB_QUERY_SECONDS
 
 logger = get_logger(__name__)
 
 
+# Pedidos com id -1 não são endereçáveis; o termo "id != -1" permite ao SQLite
+# usar o índice único parcial idx_orders_id nas buscas por id.
+# Toda escrita atribui à linha o próximo change_seq, usado pela sincronização.
+NEXT_CHANGE_SEQ = '(SELECT IFNULL(MAX(change_seq), 0) + 1 FROM Orders)'
+
+# Um id já gravado nunca é sobrescrito: o OrderService recusa o pedido antes (ver existing_ids)
+SQL_INSERT = f'''
+    INSERT INTO Orders (id, box, status, size, products, priority, is_synced, change_seq)
+    VALUES (?, ?, ?, ?, ?, ?, 0, {NEXT_CHANGE_SEQ})
+    ON CONFLICT(id) WHERE id != -1 DO NOTHING
+'''
+
+SQL_GET_EXISTING_IDS = '''
+    SELECT id
+    FROM Orders
+    WHERE id IN ({ids}) AND id != -1
+'''
+
+SQL_UPDATE = f'''
+    UPDATE Orders
+    SET box = ?, status = ?, size = ?, products = ?, priority = ?, is_synced = 0,
+        change_seq = {NEXT_CHANGE_SEQ}
+    WHERE id = ? AND id != -1
+'''
+
+# Transição de status com compare-and-set: só altera a linha se o status atual é um dos esperados
+SQL_SET_STATUS = f'''
+    UPDATE Orders
+    SET status = ?, is_synced = 0, change_seq = {NEXT_CHANGE_SEQ}
+    WHERE id = ? AND id != -1 AND status IN ({{expected}})
+'''
+
+SQL_GET_BY_ID = '''
+    SELECT id, box, status, size, products, priority
+    FROM Orders
+    WHERE id = ? AND id != -1
+'''
+
+SQL_GET_STATUS = '''
+    SELECT status
+    FROM Orders
+    WHERE id = ? AND id != -1
+'''
+
+SQL_GET_PENDING = '''
+    SELECT id, box, status, size, products, priority
+    FROM Orders
+    WHERE status = 'pending'
+    ORDER BY timestamp, rowid
+'''
+
+SQL_COUNT_PENDING = '''
+    SELECT COUNT(*)
+    FROM Orders
+    WHERE status = 'pending'
+'''
+
+# Paginação por keyset sobre o índice (status, timestamp), que já termina em rowid.
+# A chave (timestamp, rowid) é dividida em duas buscas: com "(timestamp, rowid) > (?, ?)"
+# o SQLite só usa timestamp no índice e relê todas as linhas do mesmo segundo a cada bloco.
+SQL_GET_PENDING_SAME_TIMESTAMP = '''
+    SELECT timestamp, rowid, id, box, status, size, products, priority
+    FROM Orders
+    WHERE status = 'pending' AND timestamp = ? AND rowid > ?
+    ORDER BY rowid
+    LIMIT ?
+'''
+
+SQL_GET_PENDING_AFTER_TIMESTAMP = '''
+    SELECT timestamp, rowid, id, box, status, size, products, priority
+    FROM Orders
+    WHERE status = 'pending' AND timestamp > ?
+    ORDER BY timestamp, rowid
+    LIMIT ?
+'''
+
+SQL_MAX_CHANGE_SEQ = '''
+    SELECT IFNULL(MAX(change_seq), 0)
+    FROM Orders
+'''
+
+SQL_GET_CHANGED_SINCE = '''
+    SELECT change_seq, id, box, status, size, products, priority
+    FROM Orders
+    WHERE change_seq > ?
+    ORDER BY change_seq
+    LIMIT ?
+'''
+
+SQL_GET_UNSYNCED = '''
+    SELECT rowid, id, box, status, size, priority, timestamp, products, change_seq
+    FROM Orders
+    WHERE is_synced = 0
+    ORDER BY timestamp
+    LIMIT ?
+'''
+
+# Só marca a linha se ela não mudou desde que foi lida para sincronização
+SQL_MARK_SYNCED = '''
+    UPDATE Orders SET is_synced = 1
+    WHERE rowid = ? AND change_seq = ?
+'''
+
+# is_synced = 2: recusado pelo sistema central; sai da fila de sincronização até a próxima alteração do pedido
+SQL_MARK_SYNC_REJECTED = '''
+    UPDATE Orders SET is_synced = 2
+    WHERE rowid = ? AND change_seq = ?
+'''
+
+
+# Layout normalizado (normalized_products=True): cada pedido gravado tem as suas linhas em
+# Products, Syrups e Toppings substituídas junto com a linha de Orders.
+PRODUCT_TABLES = ('Products', 'Syrups', 'Toppings')
+
+SQL_INSERT_PRODUCT = '''
+    INSERT INTO Products (order_id, position, product_id, cup, type, status, flavour)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+'''
+
+SQL_INSERT_SYRUP = 'INSERT INTO Syrups (order_id, position, name, qtd) VALUES (?, ?, ?, ?)'
+
+SQL_INSERT_TOPPING = 'INSERT INTO Toppings (order_id, position, name, qtd) VALUES (?, ?, ?, ?)'
+
+# Preenche as tabelas normalizadas com os pedidos gravados antes de o layout ser ligado.
+# Products vem por último: as duas primeiras consultas usam a ausência dele para achar esses pedidos.
+SQL_BACKFILL_EXTRAS = '''
+    INSERT INTO {table} (order_id, position, name, qtd)
+    SELECT o.id, p.key, json_extract(e.value, '$.name'), json_extract(e.value, '$.qtd')
+    FROM Orders o, json_each(o.products) p, json_each(p.value, '$.{field}') e
+    WHERE o.id != -1 AND NOT EXISTS (SELECT 1 FROM Products WHERE order_id = o.id)
+'''
+
+SQL_BACKFILL_PRODUCTS = '''
+    INSERT INTO Products (order_id, position, product_id, cup, type, status, flavour)
+    SELECT o.id, p.key, json_extract(p.value, '$.id'), json_extract(p.value, '$.cup'),
+        json_extract(p.value, '$.type'), json_extract(p.value, '$.status'), json_extract(p.value, '$.flavour')
+    FROM Orders o, json_each(o.products) p
+    WHERE o.id != -1 AND NOT EXISTS (SELECT 1 FROM Products WHERE order_id = o.id)
+'''
+
+SQL_FIND_PRODUCT = '''
+    SELECT position
+    FROM Products
+    WHERE order_id = ? AND product_id = ?
+    ORDER BY position
+    LIMIT 1
+'''
+
+# Sem o layout normalizado, a posição do produto é procurada no JSON do próprio pedido
+SQL_FIND_PRODUCT_IN_JSON = '''
+    SELECT p.key
+    FROM Orders o, json_each(o.products) p
+    WHERE o.id = ? AND o.id != -1 AND json_extract(p.value, '$.id') = ?
+    ORDER BY p.key
+    LIMIT 1
+'''
+
+# Altera só os campos do produto dentro do JSON, sem decodificá-lo em Python
+SQL_UPDATE_PRODUCT_JSON = f'''
+    UPDATE Orders
+    SET products = json_set(products, {{paths}}), is_synced = 0, change_seq = {NEXT_CHANGE_SEQ}
+    WHERE id = ? AND id != -1
+    RETURNING json_extract(products, ?)
+'''
+
+SQL_UPDATE_PRODUCT_ROW = '''
+    UPDATE Products
+    SET {columns}
+    WHERE order_id = ? AND position = ?
+'''
+
+SQL_COUNT_PRODUCTS_BY_FLAVOUR = '''
+    SELECT flavour, COUNT(*)
+    FROM Products
+    WHERE status = ?
+    GROUP BY flavour
+    ORDER BY COUNT(*) DESC, flavour
+'''
+
+SQL_COUNT_PRODUCTS_BY_FLAVOUR_IN_JSON = '''
+    SELECT json_extract(p.value, '$.flavour') AS flavour, COUNT(*)
+    FROM Orders o, json_each(o.products) p
+    WHERE json_extract(p.value, '$.status') = ?
+    GROUP BY flavour
+    ORDER BY COUNT(*) DESC, flavour
+'''
+
+SQL_EXPORT_PAGE = '''
+    SELECT rowid, id, box, status, size, priority, timestamp, products
+    FROM Orders
+    WHERE {conditions}
+    ORDER BY rowid
+    LIMIT ?
+'''
+
+# Campos de um produto que podem ser alterados no lugar (PATCH /order/<id>/product/<pid>)
+PRODUCT_UPDATABLE_FIELDS = ('cup', 'type', 'status', 'flavour')
+
+
 class Database:
     
     DATABASE_NAME = 'order_log.db'
+    POOL_SIZE = 5
     
-    def __init__(self):
-        logger.debug(f"Inicializando Database com arquivo: {self.DATABASE_NAME}")
+    def __init__(
+        self,
+        database_name: Optional[str] = None,
+        pool_size: Optional[int] = None,
+        pragmas: Optional[Dict[str, Any]] = None,
+        write_behind: Optional[WriteBehindConfig] = None,
+        normalized_products: bool = False
+    ):
+        """
+        `normalized_products` mantém, além do JSON em Orders.products, uma cópia
+        dos produtos em Products, Syrups e Toppings, indexada por pedido e por
+        (status, sabor). Ao ligar, os pedidos já gravados são copiados; o layout
+        deve continuar ligado depois disso, pois gravações feitas com ele
+        desligado não chegam às tabelas normalizadas.
+        """
+        self.database_name = database_name or self.DATABASE_NAME
+        self.normalized_products = normalized_products
+        self._pool = ConnectionPool(
+            self.database_name,
+            size=self.POOL_SIZE if pool_size is None else pool_size,
+            pragmas=pragmas
+        )
+        logger.debug("Inicializando Database com arquivo: %s", self.database_name)
         self._ensure_table_exists()
         logger.debug("Tabela Orders verificada/criada com sucesso")
+        if normalized_products:
+            self._backfill_products()
+        
+        self._writer = None
+        if write_behind is not None:
+            self._writer = WriteBehindWriter(
+                self.database_name,
+                write_behind,
+                DEFAULT_PRAGMAS if pragmas is None else pragmas
+            )
     
     def _get_connection(self):
-        conn = sqlite3.connect(self.DATABASE_NAME)
-        return conn
+        """Retorna um context manager com uma conexão do pool"""
+        return self._pool.connection()
+    
+    def close(self) -> None:
+        """Grava as escritas pendentes do write-behind e fecha as conexões"""
+        if self._writer is not None:
+            self._writer.close()
+        self._pool.close()
+    
+    def flush(self) -> None:
+        """Aguarda a gravação das escritas pendentes do write-behind"""
+        if self._writer is not None:
+            self._writer.flush()
+    
+    def _execute_write(self, sql: str, params: List[tuple]) -> Optional[int]:
+        """
+        Executa a escrita em uma transação. No modo write-behind a escrita vai
+        para o journal e o retorno é None, pois as linhas afetadas não são conhecidas.
+        """
+        if self._writer is not None:
+            self._writer.submit(sql, params)
+            return None
+        
+        with self._get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.executemany(sql, params)
+            rows_affected = cursor.rowcount
+            conn.commit()
+        return rows_affected
+    
+    def _execute_writes(self, statements: List[tuple]) -> None:
+        """
+        Executa vários (sql, params) na mesma transação. No modo write-behind
+        eles viram uma única mutação do journal, gravada inteira ou descartada.
+        """
+        if self._writer is not None:
+            self._writer.submit_many(statements)
+            return
+        
+        with self._get_connection() as conn:
+            for sql, params in statements:
+                conn.executemany(sql, params)
+            conn.commit()
+    
+    def _write_orders(self, sql: str, params: List[tuple], orders: List[Order]) -> Optional[int]:
+        """Grava as linhas de Orders e, no layout normalizado, substitui as linhas dos produtos"""
+        if not self.normalized_products:
+            return self._execute_write(sql, params)
+        
+        self._execute_writes([(sql, params)] + self._product_statements(orders))
+        return None
+    
+    def _product_statements(self, orders: List[Order]) -> List[tuple]:
+        ids = [(order.id,) for order in orders if order.id != -1]
+        products, syrups, toppings = [], [], []
+        for order in orders:
+            if order.id == -1:
+                continue
+            for position, product in enumerate(order.products):
+                products.append((
+                    order.id, position, product.id, product.cup, product.type, product.status, product.flavour
+                ))
+                syrups.extend((order.id, position, syrup.name, syrup.qtd) for syrup in product.syrups)
+                toppings.extend((order.id, position, topping.name, topping.qtd) for topping in product.toppings)
+        
+        statements = [(f'DELETE FROM {table} WHERE order_id = ?', ids) for table in PRODUCT_TABLES]
+        statements.append((SQL_INSERT_PRODUCT, products))
+        if syrups:
+            statements.append((SQL_INSERT_SYRUP, syrups))
+        if toppings:
+            statements.append((SQL_INSERT_TOPPING, toppings))
+        return statements
+    
+    def _backfill_products(self) -> None:
+        with self._get_connection() as conn:
+            conn.execute(SQL_BACKFILL_EXTRAS.format(table='Syrups', field='syrups'))
+            conn.execute(SQL_BACKFILL_EXTRAS.format(table='Toppings', field='toppings'))
+            copied = conn.execute(SQL_BACKFILL_PRODUCTS).rowcount
+            conn.commit()
+        if copied > 0:
+            logger.info("Copiados %s produtos para as tabelas normalizadas", copied)
     
     def _ensure_table_exists(self):
-        logger.debug("Verificando existência da tabela Orders")
-        conn = self._get_connection()
-        cursor = conn.cursor()
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS Orders (
-                id INTEGER DEFAULT -1,
-                box INTEGER NOT NULL,
-                status TEXT NOT NULL,
-                size INTEGER NOT NULL,
-                products TEXT NOT NULL,
-                timestamp TEXT DEFAULT (datetime('now', 'localtime')),
-                is_synced INTEGER DEFAULT 0
-            )
-        ''')
-        conn.commit()
-        conn.close()
+        logger.debug("Aplicando migrações do schema")
+        with self._get_connection() as conn:
+            self.schema_version = apply_migrations(conn)
         logger.debug("Tabela Orders garantida")
     
+    @DB_QUERY_SECONDS.time("insert")
     def insert(self, order: Order) -> None:
-        logger.debug(f"Inserindo pedido no banco: ID={order.id}, Box={order.box}, Status={order.status}")
+        logger.debug("Inserindo pedido no banco: ID=%s, Box=%s, Status=%s", order.id, order.box, order.status)
         
         try:
-            conn = self._get_connection()
-            cursor = conn.cursor()
-            
-            products_json = self._serialize_products(order.products)
-            cursor.execute(
-                'INSERT INTO Orders (id, box, status, size, products, is_synced) VALUES (?, ?, ?, ?, ?, 0)',
-                (order.id, order.box, order.status, order.size, products_json)
-            )
-            conn.commit()
-            conn.close()
-            logger.info(f"Pedido inserido no banco com sucesso: ID={order.id}")
+            self._write_orders(SQL_INSERT, [self._insert_params(order)], [order])
+            logger.info("Pedido inserido no banco com sucesso: ID=%s", order.id)
         except sqlite3.Error as e:
-            logger.error(f"Erro ao inserir pedido {order.id} no banco: {str(e)}", exc_info=True)
+            logger.error("Erro ao inserir pedido %s no banco: %s", order.id, e, exc_info=True)
             raise
     
+    @DB_QUERY_SECONDS.time("insert_many")
+    def insert_many(self, orders: List[Order]) -> None:
+        """Insere vários pedidos em uma única transação"""
+        if not orders:
+            return
+        
+        logger.debug("Inserindo lote de %s pedidos no banco", len(orders))
+        
+        try:
+            self._write_orders(SQL_INSERT, [self._insert_params(order) for order in orders], orders)
+            logger.info("Lote de %s pedidos inserido no banco com sucesso", len(orders))
+        except sqlite3.Error as e:
+            logger.error("Erro ao inserir lote de %s pedidos no banco: %s", len(orders), e, exc_info=True)
+            raise
+    
+    @DB_QUERY_SECONDS.time("update")
     def update(self, order: Order) -> None:
-        logger.debug(f"Atualizando pedido no banco: ID={order.id}, Status={order.status}")
+        logger.debug("Atualizando pedido no banco: ID=%s, Status=%s", order.id, order.status)
         
         try:
-            conn = self._get_connection()
-            cursor = conn.cursor()
-            
-            products_json = self._serialize_products(order.products)
-            cursor.execute('''
-                UPDATE Orders
-                SET box = ?, status = ?, size = ?, products = ?, is_synced = 0
-                WHERE id = ?
-            ''', (order.box, order.status, order.size, products_json, order.id))
+            rows_affected = self._write_orders(SQL_UPDATE, [self._update_params(order)], [order])
             
-            rows_affected = cursor.rowcount
-            conn.commit()
-            conn.close()
-            
-            if rows_affected > 0:
-                logger.debug(f"Pedido atualizado no banco: ID={order.id}, Linhas afetadas={rows_affected}")
+            if rows_affected is None:
+                logger.debug("Atualização do pedido enviada: ID=%s", order.id)
+            elif rows_affected > 0:
+                logger.debug("Pedido atualizado no banco: ID=%s, Linhas afetadas=%s", order.id, rows_affected)
             else:
-                logger.warning(f"Nenhuma linha afetada ao atualizar pedido: ID={order.id}")
+                logger.warning("Nenhuma linha afetada ao atualizar pedido: ID=%s", order.id)
         except sqlite3.Error as e:
-            logger.error(f"Erro ao atualizar pedido {order.id} no banco: {str(e)}", exc_info=True)
+            logger.error("Erro ao atualizar pedido %s no banco: %s", order.id, e, exc_info=True)
             raise
     
-    def get_by_id(self, order_id: int) -> Optional[Order]:
-        logger.debug(f"Buscando pedido no banco: ID={order_id}")
+    @DB_QUERY_SECONDS.time("update_many")
+    def update_many(self, orders: List[Order]) -> None:
+        """Atualiza vários pedidos em uma única transação"""
+        if not orders:
+            return
         
-        conn = self._get_connection()
-        cursor = conn.cursor()
+        logger.debug("Atualizando lote de %s pedidos no banco", len(orders))
         
         try:
-            cursor.execute('''
-                SELECT id, box, status, size, products 
-                FROM Orders 
-                WHERE id = ?
-            ''', (order_id,))
+            self._write_orders(SQL_UPDATE, [self._update_params(order) for order in orders], orders)
+            logger.debug("Lote de %s pedidos atualizado no banco", len(orders))
+        except sqlite3.Error as e:
+            logger.error("Erro ao atualizar lote de %s pedidos no banco: %s", len(orders), e, exc_info=True)
+            raise
+    
+    @DB_QUERY_SECONDS.time("set_status")
+    def set_status(
+        self,
+        ids: Iterable[int],
+        new_status: str,
+        expected_old_status: Union[str, Sequence[str]],
+        known_statuses: Optional[Mapping[int, str]] = None
+    ) -> List[int]:
+        """
+        Troca o status dos pedidos `ids` para `new_status`, mas só dos que estão
+        em `expected_old_status` (um status ou uma lista deles), sem tocar em
+        box, size e products. Um UPDATE indexado por pedido, todos na mesma
+        transação, para que cada linha receba o seu change_seq. Retorna os ids
+        que mudaram.
+        
+        `known_statuses` é o status atual dos pedidos segundo quem chama (o
+        índice de status do OrderService, sob o lock dos pedidos). No modo
+        write-behind, se todos os ids estão nele, o compare-and-set é decidido
+        em memória e a troca vai para o journal como uma única mutação, sem
+        esperar o commit; o UPDATE mantém a condição de status, então um índice
+        desatualizado não sobrescreve outro status. Faltando algum id, o journal
+        é esvaziado e a transição é gravada direto.
+        """
+        expected = [expected_old_status] if isinstance(expected_old_status, str) else list(expected_old_status)
+        sql = SQL_SET_STATUS.format(expected=", ".join("?" * len(expected)))
+        ids = list(ids)
+        if not ids:
+            return []
+        
+        if self._writer is not None and known_statuses is not None and all(i in known_statuses for i in ids):
+            changed = [order_id for order_id in ids if known_statuses[order_id] in expected]
+            if changed:
+                self._writer.submit(sql, [(new_status, order_id, *expected) for order_id in changed])
+        else:
+            changed = self._set_status_now(sql, ids, new_status, expected)
+        
+        if len(changed) < len(ids):
+            logger.debug(
+                "Transição para '%s' recusada para %s de %s pedidos (status diferente de %s)",
+                new_status, len(ids) - len(changed), len(ids), expected
+            )
+        return changed
+    
+    def _set_status_now(self, sql: str, ids: List[int], new_status: str, expected: List[str]) -> List[int]:
+        self.flush()
+        changed = []
+        try:
+            with self._get_connection() as conn:
+                for order_id in ids:
+                    if conn.execute(sql, (new_status, order_id, *expected)).rowcount:
+                        changed.append(order_id)
+                conn.commit()
+        except sqlite3.Error as e:
+            logger.error("Erro ao trocar status de %s pedidos para '%s': %s", len(ids), new_status, e, exc_info=True)
+            raise
+        return changed
+    
+    @DB_QUERY_SECONDS.time("update_product")
+    def update_product(self, order_id: int, product_id: int, fields: Dict[str, Any]) -> Optional[tuple]:
+        """
+        Altera `fields` (ver PRODUCT_UPDATABLE_FIELDS) do primeiro produto com
+        id `product_id` do pedido, no JSON de Orders (via json_set, sem ler e
+        regravar a lista em Python) e, no layout normalizado, na sua linha de
+        Products. Retorna (posição do produto, JSON do produto alterado), ou
+        None se o pedido ou o produto não existe. Esvazia o journal e grava
+        direto, pois o resultado depende do conteúdo atual da linha.
+        """
+        unknown = set(fields) - set(PRODUCT_UPDATABLE_FIELDS)
+        if not fields or unknown:
+            raise ValueError(f"Campos de produto inválidos: {sorted(unknown) or 'nenhum'}")
+        
+        self.flush()
+        try:
+            with self._get_connection() as conn:
+                find = SQL_FIND_PRODUCT if self.normalized_products else SQL_FIND_PRODUCT_IN_JSON
+                row = conn.execute(find, (order_id, product_id)).fetchone()
+                if row is None:
+                    return None
+                
+                position = row[0]
+                paths = ", ".join("?, ?" for _ in fields)
+                path_params = [value for name, field in fields.items() for value in (f'$[{position}].{name}', field)]
+                product_json = conn.execute(
+                    SQL_UPDATE_PRODUCT_JSON.format(paths=paths), (*path_params, order_id, f'$[{position}]')
+                ).fetchone()[0]
+                if self.normalized_products:
+                    columns = ", ".join(f"{name} = ?" for name in fields)
+                    conn.execute(
+                        SQL_UPDATE_PRODUCT_ROW.format(columns=columns), (*fields.values(), order_id, position)
+                    )
+                conn.commit()
+        except sqlite3.Error as e:
+            logger.error("Erro ao alterar produto %s do pedido %s: %s", product_id, order_id, e, exc_info=True)
+            raise
+        
+        logger.debug("Produto %s do pedido %s alterado: %s", product_id, order_id, fields)
+        return position, product_json
+    
+    @DB_QUERY_SECONDS.time("count_products_by_flavour")
+    def count_products_by_flavour(self, status: str) -> List[tuple]:
+        """
+        Sabores dos produtos com o `status` dado, com a quantidade de cada um,
+        do mais frequente para o menos. Sem o layout normalizado a consulta
+        decodifica o JSON de todos os pedidos.
+        """
+        self.flush()
+        sql = SQL_COUNT_PRODUCTS_BY_FLAVOUR if self.normalized_products else SQL_COUNT_PRODUCTS_BY_FLAVOUR_IN_JSON
+        
+        with self._get_connection() as conn:
+            return conn.execute(sql, (status,)).fetchall()
+    
+    @DB_QUERY_SECONDS.time("get_by_id")
+    def get_by_id(self, order_id: int) -> Optional[Order]:
+        logger.debug("Buscando pedido no banco: ID=%s", order_id)
+        self.flush()
+        
+        try:
+            with self._get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(SQL_GET_BY_ID, (order_id,))
+                row = cursor.fetchone()
             
-            row = cursor.fetchone()
             if row:
                 order = self._row_to_order(row)
-                logger.debug(f"Pedido encontrado no banco: ID={order_id}, Status={order.status if order else 'None'}")
+                logger.debug(
+                    "Pedido encontrado no banco: ID=%s, Status=%s", order_id, order.status if order else 'None'
+                )
                 return order
             else:
-                logger.debug(f"Pedido não encontrado no banco: ID={order_id}")
+                logger.debug("Pedido não encontrado no banco: ID=%s", order_id)
                 return None
         except sqlite3.Error as e:
-            logger.error(f"Erro ao buscar pedido {order_id} no banco: {str(e)}", exc_info=True)
+            logger.error("Erro ao buscar pedido %s no banco: %s", order_id, e, exc_info=True)
             return None
-        finally:
-            conn.close()
     
+    @DB_QUERY_SECONDS.time("existing_ids")
+    def existing_ids(self, ids: Iterable[int], chunk_size: int = 500) -> set:
+        """
+        Ids de `ids` já gravados em Orders. Não esvazia o journal do
+        write-behind: os pedidos que ainda estão nele foram criados por este
+        processo e já estão no índice de status, consultado antes pelo OrderService.
+        """
+        ids = [order_id for order_id in ids if order_id != -1]
+        found = set()
+        with self._get_connection() as conn:
+            for start in range(0, len(ids), chunk_size):
+                chunk = ids[start:start + chunk_size]
+                sql = SQL_GET_EXISTING_IDS.format(ids=", ".join("?" * len(chunk)))
+                found.update(row[0] for row in conn.execute(sql, chunk))
+        return found
+    
+    @DB_QUERY_SECONDS.time("get_status")
+    def get_status(self, order_id: int) -> Optional[str]:
+        """Consulta apenas o status do pedido, sem decodificar os produtos"""
+        logger.debug("Buscando status do pedido no banco: ID=%s", order_id)
+        self.flush()
+        
+        try:
+            with self._get_connection() as conn:
+                row = conn.execute(SQL_GET_STATUS, (order_id,)).fetchone()
+            return row[0] if row else None
+        except sqlite3.Error as e:
+            logger.error("Erro ao buscar status do pedido %s no banco: %s", order_id, e, exc_info=True)
+            return None
+    
+    @DB_QUERY_SECONDS.time("get_pending")
     def get_pending(self) -> List[Order]:
         logger.debug("Buscando pedidos pendentes no banco de dados")
-        
-        conn = self._get_connection()
-        cursor = conn.cursor()
+        self.flush()
         
         try:
-            cursor.execute('''
-                SELECT id, box, status, size, products 
-                FROM Orders 
-                WHERE status = 'pending'
-            ''')
+            with self._get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(SQL_GET_PENDING)
+                rows = cursor.fetchall()
             
             orders = []
-            for row in cursor.fetchall():
+            for row in rows:
                 order = self._row_to_order(row)
                 if order:
                     orders.append(order)
             
-            logger.info(f"Encontrados {len(orders)} pedidos pendentes no banco")
+            logger.info("Encontrados %s pedidos pendentes no banco", len(orders))
             return orders
         except sqlite3.Error as e:
-            logger.error(f"Erro ao buscar pedidos pendentes: {str(e)}", exc_info=True)
+            logger.error("Erro ao buscar pedidos pendentes: %s", e, exc_info=True)
             return []
-        finally:
-            conn.close()
     
-    def _row_to_order(self, row) -> Optional[Order]:
+    @DB_QUERY_SECONDS.time("count_pending")
+    def count_pending(self) -> int:
+        self.flush()
+        
         try:
-            import json
-            from models.models import Product, Order
+            with self._get_connection() as conn:
+                return conn.execute(SQL_COUNT_PENDING).fetchone()[0]
+        except sqlite3.Error as e:
+            logger.error("Erro ao contar pedidos pendentes: %s", e, exc_info=True)
+            return 0
+    
+    def iter_pending(self, chunk_size: int = 1000) -> Iterator[List[Order]]:
+        """
+        Percorre os pedidos pendentes em ordem de chegada (timestamp, rowid),
+        em blocos de até `chunk_size` pedidos. Cada bloco é uma consulta
+        própria, então nenhuma conexão fica presa entre um bloco e outro.
+        """
+        self.flush()
+        last_timestamp, last_rowid = '', 0
+        
+        while True:
+            with self._get_connection() as conn:
+                rows = conn.execute(
+                    SQL_GET_PENDING_SAME_TIMESTAMP, (last_timestamp, last_rowid, chunk_size)
+                ).fetchall()
+                if len(rows) < chunk_size:
+                    rows += conn.execute(
+                        SQL_GET_PENDING_AFTER_TIMESTAMP, (last_timestamp, chunk_size - len(rows))
+                    ).fetchall()
+            if not rows:
+                return
             
-            order_id, box, status, size, products_json = row
-            products_data = json.loads(products_json)
-            products = [Product(**p) for p in products_data]
+            last_timestamp, last_rowid = rows[-1][:2]
+            orders = [self._row_to_order(row[2:]) for row in rows]
+            yield [order for order in orders if order]
             
-            return Order(
-                id=order_id,
-                box=box,
-                status=status,
-                size=size,
-                products=products
-            )
+            if len(rows) < chunk_size:
+                return
+    
+    @DB_QUERY_SECONDS.time("get_change_seq")
+    def get_change_seq(self) -> int:
+        """Maior change_seq gravado: marca a posição do banco para um checkpoint"""
+        self.flush()
+        
+        with self._get_connection() as conn:
+            return conn.execute(SQL_MAX_CHANGE_SEQ).fetchone()[0]
+    
+    def iter_changed_since(self, change_seq: int, chunk_size: int = 1000) -> Iterator[List[Order]]:
+        """Percorre, em ordem de alteração e em blocos, os pedidos gravados depois de `change_seq`"""
+        self.flush()
+        
+        while True:
+            with self._get_connection() as conn:
+                rows = conn.execute(SQL_GET_CHANGED_SINCE, (change_seq, chunk_size)).fetchall()
+            if not rows:
+                return
+            
+            change_seq = rows[-1][0]
+            orders = [self._row_to_order(row[1:]) for row in rows]
+            yield [order for order in orders if order]
+            
+            if len(rows) < chunk_size:
+                return
+    
+    @DB_QUERY_SECONDS.time("get_unsynced")
+    def get_unsynced(self, limit: int) -> List[tuple]:
+        """
+        Retorna até `limit` linhas com is_synced = 0, das mais antigas para as mais
+        novas: (rowid, id, box, status, size, priority, timestamp, products_json, change_seq).
+        """
+        self.flush()
+        
+        try:
+            with self._get_connection() as conn:
+                return conn.execute(SQL_GET_UNSYNCED, (limit,)).fetchall()
+        except sqlite3.Error as e:
+            logger.error("Erro ao buscar pedidos não sincronizados: %s", e, exc_info=True)
+            return []
+    
+    @DB_QUERY_SECONDS.time("mark_synced")
+    def mark_synced(self, rows: List[tuple]) -> None:
+        """Marca como sincronizadas as linhas (rowid, change_seq) que não mudaram desde a leitura"""
+        if not rows:
+            return
+        
+        try:
+            self._execute_write(SQL_MARK_SYNCED, [(rowid, change_seq) for rowid, change_seq in rows])
+            logger.debug("%s pedidos marcados como sincronizados", len(rows))
+        except sqlite3.Error as e:
+            logger.error("Erro ao marcar %s pedidos como sincronizados: %s", len(rows), e, exc_info=True)
+            raise
+    
+    @DB_QUERY_SECONDS.time("mark_sync_rejected")
+    def mark_sync_rejected(self, rows: List[tuple]) -> None:
+        """
+        Tira da sincronização as linhas (rowid, change_seq) recusadas pelo sistema
+        central; uma alteração posterior do pedido volta a enviá-lo.
+        """
+        if not rows:
+            return
+        
+        try:
+            self._execute_write(SQL_MARK_SYNC_REJECTED, [(rowid, change_seq) for rowid, change_seq in rows])
+            logger.debug("%s pedidos marcados como recusados na sincronização", len(rows))
+        except sqlite3.Error as e:
+            logger.error("Erro ao marcar %s pedidos como recusados: %s", len(rows), e, exc_info=True)
+            raise
+    
+    def iter_orders(
+        self,
+        status: Optional[str] = None,
+        box: Optional[int] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        after: Optional[int] = None,
+        limit: Optional[int] = None,
+        chunk_size: int = 500
+    ) -> Iterator[tuple]:
+        """
+        Percorre Orders em ordem de rowid (paginação por keyset com `after`).
+        Cada bloco de até `chunk_size` linhas é uma consulta própria que
+        continua do último rowid lido, então nenhuma conexão do pool nem
+        transação de leitura fica presa enquanto o cliente consome o stream.
+        Com `status`, o índice idx_orders_status (status, rowid) já entrega as
+        linhas em ordem, sem ordenação temporária. Cada item é a tupla
+        (rowid, id, box, status, size, priority, timestamp, products_json).
+        """
+        conditions = ["rowid > ?"]
+        params: List[Any] = []
+        if status is not None:
+            conditions.append("status = ?")
+            params.append(status)
+        if box is not None:
+            conditions.append("box = ?")
+            params.append(box)
+        if since is not None:
+            conditions.append("timestamp >= ?")
+            params.append(since)
+        if until is not None:
+            conditions.append("timestamp < ?")
+            params.append(until)
+        
+        sql = SQL_EXPORT_PAGE.format(conditions=" AND ".join(conditions))
+        
+        logger.debug("Exportando pedidos: filtros=%s, limite=%s", conditions[1:], limit)
+        self.flush()
+        
+        last_rowid = -1 if after is None else after
+        remaining = limit
+        while remaining is None or remaining > 0:
+            page_size = chunk_size if remaining is None else min(chunk_size, remaining)
+            with self._get_connection() as conn:
+                rows = conn.execute(sql, (last_rowid, *params, page_size)).fetchall()
+            if not rows:
+                return
+            
+            yield from rows
+            last_rowid = rows[-1][0]
+            if remaining is not None:
+                remaining -= len(rows)
+            if len(rows) < page_size:
+                return
+    
+    def _row_to_order(self, row) -> Optional[Order]:
+        # Dados gravados por este serviço já foram validados na entrada
+        try:
+            order_id, box, status, size, products_json, priority = row
+            return Order.from_storage(order_id, box, status, size, priority, products_json)
         except Exception as e:
-            logger.error(f"Erro ao converter row para Order: {str(e)}", exc_info=True)
+            logger.error("Erro ao converter row para Order: %s", e, exc_info=True)
             return None
     
-    def _serialize_products(self, products: List[Product]) -> str:
-        import json
-        return json.dumps([product.model_dump() for product in products])
-
+    def _insert_params(self, order: Order) -> tuple:
+        return (order.id, order.box, order.status, order.size, order.products_json(), order.priority)
+    
+    def _update_params(self, order: Order) -> tuple:
+        return (order.box, order.status, order.size, order.products_json(), order.priority, order.id)
@@ -0,0 +1,152 @@
+import sqlite3
+from typing import Callable, List
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class Migration:
+
+    def __init__(self, version: int, description: str, apply: Callable[[sqlite3.Cursor], None]):
+        self.version = version
+        self.description = description
+        self.apply = apply
+
+
+def _create_orders_table(cursor: sqlite3.Cursor) -> None:
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS Orders (
+            id INTEGER DEFAULT -1,
+            box INTEGER NOT NULL,
+            status TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            products TEXT NOT NULL,
+            timestamp TEXT DEFAULT (datetime('now', 'localtime')),
+            is_synced INTEGER DEFAULT 0
+        )
+    ''')
+
+
+def _add_orders_indexes(cursor: sqlite3.Cursor) -> None:
+    # Bancos antigos podem ter o mesmo id gravado várias vezes; mantém a linha mais recente
+    cursor.execute('''
+        DELETE FROM Orders
+        WHERE id != -1 AND rowid NOT IN (
+            SELECT MAX(rowid) FROM Orders WHERE id != -1 GROUP BY id
+        )
+    ''')
+    if cursor.rowcount > 0:
+        logger.warning("Removidas %s linhas duplicadas de Orders durante a migração", cursor.rowcount)
+    
+    # Pedidos com id -1 não têm identificador e não são endereçáveis por id
+    cursor.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_orders_id ON Orders(id) WHERE id != -1')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_orders_status_timestamp ON Orders(status, timestamp)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_orders_unsynced ON Orders(timestamp) WHERE is_synced = 0')
+
+
+def _add_orders_priority(cursor: sqlite3.Cursor) -> None:
+    cursor.execute('ALTER TABLE Orders ADD COLUMN priority INTEGER NOT NULL DEFAULT 0')
+
+
+def _add_orders_change_seq(cursor: sqlite3.Cursor) -> None:
+    # Número de sequência global de alterações; muda a cada escrita na linha
+    cursor.execute('ALTER TABLE Orders ADD COLUMN change_seq INTEGER NOT NULL DEFAULT 0')
+    cursor.execute('UPDATE Orders SET change_seq = rowid')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_orders_change_seq ON Orders(change_seq)')
+
+
+def _create_products_tables(cursor: sqlite3.Cursor) -> None:
+    # Cópia normalizada de Orders.products, preenchida só com Database(normalized_products=True).
+    # `position` é o índice do produto na lista do pedido; caldas e coberturas apontam para ele.
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS Products (
+            order_id INTEGER NOT NULL,
+            position INTEGER NOT NULL,
+            product_id INTEGER NOT NULL,
+            cup INTEGER NOT NULL,
+            type TEXT NOT NULL,
+            status TEXT NOT NULL,
+            flavour TEXT NOT NULL,
+            PRIMARY KEY (order_id, position)
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_products_order_product ON Products(order_id, product_id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_products_status_flavour ON Products(status, flavour)')
+    for table in ('Syrups', 'Toppings'):
+        cursor.execute(f'''
+            CREATE TABLE IF NOT EXISTS {table} (
+                order_id INTEGER NOT NULL,
+                position INTEGER NOT NULL,
+                name TEXT NOT NULL,
+                qtd INTEGER NOT NULL
+            )
+        ''')
+        cursor.execute(f'CREATE INDEX IF NOT EXISTS idx_{table.lower()}_order ON {table}(order_id, position)')
+        cursor.execute(f'CREATE INDEX IF NOT EXISTS idx_{table.lower()}_name ON {table}(name)')
+
+
+def _add_orders_status_index(cursor: sqlite3.Cursor) -> None:
+    # As entradas terminam em rowid: a exportação filtrada por status pagina por (status, rowid) sem ordenar
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_orders_status ON Orders(status)')
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, "Cria tabela Orders", _create_orders_table),
+    Migration(2, "Índice único em id, índice (status, timestamp) e índice parcial de is_synced", _add_orders_indexes),
+    Migration(3, "Coluna priority em Orders", _add_orders_priority),
+    Migration(4, "Coluna change_seq em Orders", _add_orders_change_seq),
+    Migration(5, "Tabelas normalizadas Products, Syrups e Toppings", _create_products_tables),
+    Migration(6, "Índice de status em Orders para a exportação", _add_orders_status_index),
+]
+
+
+def _ensure_version_table(conn: sqlite3.Connection) -> None:
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            description TEXT NOT NULL,
+            applied_at TEXT DEFAULT (datetime('now', 'localtime'))
+        )
+    ''')
+    conn.commit()
+
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    row = conn.execute('SELECT MAX(version) FROM schema_version').fetchone()
+    return row[0] or 0
+
+
+def apply_migrations(conn: sqlite3.Connection, migrations: List[Migration] = MIGRATIONS) -> int:
+    """
+    Aplica, em ordem e cada uma em sua própria transação, as migrações
+    ainda não registradas em schema_version. Retorna a versão final.
+    """
+    _ensure_version_table(conn)
+    
+    for migration in sorted(migrations, key=lambda m: m.version):
+        if get_schema_version(conn) >= migration.version:
+            continue
+        
+        cursor = conn.cursor()
+        cursor.execute('BEGIN IMMEDIATE')
+        try:
+            # Relido dentro da transação: outro processo pode ter migrado antes
+            if get_schema_version(conn) >= migration.version:
+                conn.rollback()
+                continue
+            
+            logger.info("Aplicando migração %s: %s", migration.version, migration.description)
+            migration.apply(cursor)
+            cursor.execute(
+                'INSERT INTO schema_version (version, description) VALUES (?, ?)',
+                (migration.version, migration.description)
+            )
+            conn.commit()
+        except sqlite3.Error as e:
+            conn.rollback()
+            logger.error("Erro ao aplicar migração %s: %s", migration.version, e, exc_info=True)
+            raise
+    
+    version = get_schema_version(conn)
+    logger.debug("Schema do banco na versão %s", version)
+    return version
@@ -1,97 +1,504 @@
-from typing import Optional, List
+import heapq
+import itertools
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Optional, List, Tuple, Union
 from collections import deque
 from models.models import Order
+from database.checkpoint import write_checkpoint
 from utils.logger import get_logger
+from utils.metrics import QUEUE_WAIT_SECONDS
 
 logger = get_logger(__name__)
 
 
+class SchedulingPolicy:
+    """
+    Define a ordem de atendimento da fila: pedidos com a menor chave saem
+    primeiro. A chave é calculada uma única vez no enqueue.
+    
+    O envelhecimento (aging) subtrai `aging_rate` pontos por segundo de
+    espera. Como todos os pedidos envelhecem na mesma taxa, isso equivale a
+    somar `aging_rate * enqueued_at` à chave, que então não muda mais.
+    """
+    
+    name = "fifo"
+    
+    def __init__(self, aging_rate: float = 0.0):
+        self.aging_rate = aging_rate
+    
+    def cost(self, order: Order) -> float:
+        return 0
+    
+    def key(self, order: Order, enqueued_at: float) -> float:
+        return self.cost(order) + self.aging_rate * enqueued_at
+    
+    def lane(self, order: Order) -> Optional[Hashable]:
+        return None
+
+
+class FifoPolicy(SchedulingPolicy):
+    name = "fifo"
+
+
+class PriorityPolicy(SchedulingPolicy):
+    """Maior `Order.priority` primeiro; empates em ordem de chegada"""
+    
+    name = "priority"
+    
+    def cost(self, order: Order) -> float:
+        return -order.priority
+
+
+class ShortestJobFirstPolicy(SchedulingPolicy):
+    """Menor `Order.size` (quantidade de copos) primeiro; empates em ordem de chegada"""
+    
+    name = "sjf"
+    
+    def cost(self, order: Order) -> float:
+        return order.size
+
+
+class BoxLanesPolicy(SchedulingPolicy):
+    """Uma faixa por box, atendidas em round-robin; dentro de cada faixa vale a política interna"""
+    
+    name = "box_lanes"
+    
+    def __init__(self, inner: Optional[SchedulingPolicy] = None):
+        self.inner = inner or FifoPolicy()
+        super().__init__(self.inner.aging_rate)
+    
+    def key(self, order: Order, enqueued_at: float) -> float:
+        return self.inner.key(order, enqueued_at)
+    
+    def lane(self, order: Order) -> Optional[Hashable]:
+        return order.box
+
+
+SCHEDULING_POLICIES = {
+    policy.name: policy
+    for policy in (FifoPolicy, PriorityPolicy, ShortestJobFirstPolicy, BoxLanesPolicy)
+}
+
+
+def create_policy(policy: Union[str, SchedulingPolicy, None] = None, aging_rate: float = 0.0) -> SchedulingPolicy:
+    """Cria a política a partir do nome (ex.: "sjf", "box_lanes") ou devolve a instância recebida"""
+    if isinstance(policy, SchedulingPolicy):
+        return policy
+    
+    name = policy or FifoPolicy.name
+    if name not in SCHEDULING_POLICIES:
+        raise ValueError(f"Política de fila desconhecida: {name}. Opções: {', '.join(SCHEDULING_POLICIES)}")
+    
+    if name == BoxLanesPolicy.name:
+        return BoxLanesPolicy(FifoPolicy(aging_rate))
+    return SCHEDULING_POLICIES[name](aging_rate)
+
+
+class _QueueEntry:
+    __slots__ = ("order", "lane", "removed", "enqueued_at")
+    
+    def __init__(self, order: Order, lane: Optional[Hashable], enqueued_at: float):
+        self.order = order
+        self.lane = lane
+        self.removed = False
+        self.enqueued_at = enqueued_at
+
+
+class _Waiter:
+    """Um `dequeue(wait=...)` estacionado; recebe a entrada diretamente de quem enfileira"""
+    __slots__ = ("ready", "entry")
+    
+    def __init__(self, lock: threading.Lock):
+        self.ready = threading.Condition(lock)
+        self.entry: Optional[_QueueEntry] = None
+
+
 class QueueManager:
+    """
+    Fila de pedidos com política de atendimento plugável (FIFO por padrão).
+    
+    Cada faixa é um heap de (chave, sequência, entrada), com enqueue e dequeue
+    em O(log n). Cancelar um pedido apenas marca sua entrada como removida
+    (tombstone); as entradas marcadas são descartadas ao chegarem ao topo do
+    heap ou numa compactação, quando passam a ser maioria.
+    
+    Pedidos recuperados do banco na inicialização entram por `enqueue_backlog`,
+    com sequências negativas: mesmo carregados em segundo plano, saem antes
+    dos pedidos que chegaram durante a carga.
+    
+    A fila é compartilhada pelas threads do servidor: as operações que a
+    alteram ficam sob um único lock, mantido só pelo trabalho no heap. Logs,
+    métricas e a ordenação do snapshot de `get_all_orders` ficam fora dele.
+    Leituras pontuais (`get_by_id`, `size`) não usam o lock.
     
-    def __init__(self):
+    `dequeue(wait=...)` estaciona a thread numa Condition própria quando a fila
+    está vazia. Quem enfileira entrega o próximo pedido direto ao waiter mais
+    antigo (handoff, em ordem de chegada), então um `dequeue` sem espera nunca
+    passa à frente de quem já aguarda.
+    
+    Os totais de `totals` (profundidade, copos, pedidos por box e idade do mais
+    antigo) são mantidos a cada entrada e saída. O mais antigo é o primeiro
+    vivo de `_arrivals`, as entradas em ordem de chegada; as que já saíram
+    são descartadas do início dessa fila ou numa compactação.
+    
+    Todo pedido que sai da fila (`dequeue`, `dequeue_many`, `remove`) fica
+    em trânsito até quem o retirou chamar `settle`, depois de entregar ao
+    banco a transição de status. O checkpoint só é gravado sem pedidos em
+    trânsito: um pedido fora da fila cuja transição ainda não chegou ao banco
+    não estaria nem no snapshot nem nas alterações reaplicadas na carga.
+    """
+    
+    COMPACTION_MIN_TOMBSTONES = 1024
+    # A retirada só tira o pedido da memória; quem o marca como 'production' no banco é o OrderService
+    persists_claims = False
+    
+    def __init__(self, policy: Union[str, SchedulingPolicy, None] = None):
         logger.debug("Inicializando QueueManager")
-        self._queue: deque = deque()
-        self._orders_by_id: dict[int, Order] = {}
-        logger.debug("QueueManager inicializado")
+        self.policy = create_policy(policy)
+        self._lanes: Dict[Any, list] = {}
+        self._lane_sizes: Dict[Any, int] = {}
+        self._lane_cycle: deque = deque()
+        self._orders_by_id: dict[int, _QueueEntry] = {}
+        self._sequence = itertools.count()
+        self._backlog_sequence = itertools.count(-(1 << 62))
+        self._lock = threading.Lock()
+        self._settled = threading.Condition(self._lock)
+        self._in_flight = 0
+        self._waiters: deque = deque()
+        self._arrivals: deque = deque()
+        self._box_counts: Dict[int, int] = {}
+        self._cups = 0
+        self._size = 0
+        self._tombstones = 0
+        logger.debug("QueueManager inicializado com política '%s'", self.policy.name)
     
     def enqueue(self, order: Order) -> None:
         if not isinstance(order, Order):
             logger.error("Tentativa de adicionar objeto que não é Order à fila")
             raise ValueError("Apenas objetos Order podem ser adicionados à fila")
         
+        with self._lock:
+            added = self._push(order, time.monotonic(), next(self._sequence))
+            self._hand_off()
+            size = self._size
+        
+        if added:
+            logger.debug("Pedido adicionado à fila: ID=%s, Box=%s, Tamanho da fila=%s", order.id, order.box, size)
+        else:
+            logger.debug("Pedido %s já está na fila, ignorando adição duplicada", order.id)
+    
+    def enqueue_backlog(self, orders: List[Order], enqueued_at: float) -> int:
+        """
+        Adiciona pedidos recuperados do banco à frente dos enfileirados ao vivo,
+        preservando a ordem entre os pedidos do backlog. `enqueued_at`
+        (time.monotonic) é o início da carga. Retorna quantos foram adicionados;
+        os que já estavam na fila são ignorados.
+        """
+        if not all(isinstance(order, Order) for order in orders):
+            logger.error("Tentativa de adicionar lote com objeto que não é Order à fila")
+            raise ValueError("Apenas objetos Order podem ser adicionados à fila")
+        
+        added = 0
+        with self._lock:
+            for order in orders:
+                added += self._push(order, enqueued_at, next(self._backlog_sequence))
+            self._hand_off()
+        
+        logger.debug("%s pedidos do backlog adicionados à fila, Tamanho da fila=%s", added, self._size)
+        return added
+    
+    def _push(self, order: Order, enqueued_at: float, sequence: int) -> bool:
         if order.id != -1 and order.id in self._orders_by_id:
-            logger.debug(f"Pedido {order.id} já está na fila, ignorando adição duplicada")
-            return
+            return False
         
-        self._queue.append(order)
+        lane = self.policy.lane(order)
+        entry = _QueueEntry(order, lane, enqueued_at)
+        key = self.policy.key(order, enqueued_at)
+        
+        heap = self._lanes.get(lane)
+        if heap is None:
+            heap = self._lanes[lane] = []
+            self._lane_sizes[lane] = 0
+            self._lane_cycle.append(lane)
+        heapq.heappush(heap, (key, sequence, entry))
+        self._lane_sizes[lane] += 1
+        self._size += 1
+        self._cups += order.size
+        self._box_counts[order.box] = self._box_counts.get(order.box, 0) + 1
+        # O backlog entra com o instante do início da carga, anterior ao de qualquer pedido ao vivo
+        if sequence < 0:
+            self._arrivals.appendleft(entry)
+        else:
+            self._arrivals.append(entry)
         if order.id != -1:
-            self._orders_by_id[order.id] = order
+            self._orders_by_id[order.id] = entry
+        return True
+    
+    def enqueue_many(self, orders: List[Order]) -> None:
+        """Adiciona um lote de pedidos à fila; nenhum é adicionado se algum for inválido"""
+        if not all(isinstance(order, Order) for order in orders):
+            logger.error("Tentativa de adicionar lote com objeto que não é Order à fila")
+            raise ValueError("Apenas objetos Order podem ser adicionados à fila")
+        
+        enqueued_at = time.monotonic()
+        with self._lock:
+            added = sum(self._push(order, enqueued_at, next(self._sequence)) for order in orders)
+            self._hand_off()
         
-        logger.debug(f"Pedido adicionado à fila: ID={order.id}, Box={order.box}, Tamanho da fila={len(self._queue)}")
+        logger.debug("%s pedidos adicionados à fila, Tamanho da fila=%s", added, self._size)
     
-    def dequeue(self) -> Optional[Order]:
-        if len(self._queue) == 0:
+    def _hand_off(self) -> None:
+        """Chamado sob o lock: entrega pedidos aos waiters estacionados, do mais antigo ao mais novo"""
+        while self._waiters and self._size > 0:
+            waiter = self._waiters.popleft()
+            waiter.entry = self._pop()
+            waiter.ready.notify()
+    
+    def dequeue(self, wait: float = 0.0) -> Optional[Order]:
+        """
+        Retira o próximo pedido. Com `wait` > 0 e a fila vazia, aguarda até
+        `wait` segundos por um pedido, sem consumir CPU; retorna None no timeout.
+        """
+        with self._lock:
+            entry = self._pop() if self._size > 0 else None
+            if entry is None and wait > 0:
+                entry = self._park(wait)
+            size = self._size
+        
+        if entry is None:
             logger.debug("Tentativa de remover pedido de fila vazia")
             return None
         
-        order = self._queue.popleft()
-        if order.id != -1 and order.id in self._orders_by_id:
-            del self._orders_by_id[order.id]
-        
-        logger.debug(f"Pedido removido da fila: ID={order.id}, Box={order.box}, Tamanho restante={len(self._queue)}")
+        order = entry.order
+        QUEUE_WAIT_SECONDS.observe(time.monotonic() - entry.enqueued_at)
+        logger.debug("Pedido removido da fila: ID=%s, Box=%s, Tamanho restante=%s", order.id, order.box, size)
         return order
     
+    def _park(self, wait: float) -> Optional[_QueueEntry]:
+        """Chamado sob o lock, com a fila vazia; o lock é liberado enquanto a thread aguarda"""
+        waiter = _Waiter(self._lock)
+        self._waiters.append(waiter)
+        waiter.ready.wait_for(lambda: waiter.entry is not None, wait)
+        if waiter.entry is None:
+            self._waiters.remove(waiter)
+        return waiter.entry
+    
+    def waiting(self) -> int:
+        """Quantidade de `dequeue(wait=...)` aguardando um pedido"""
+        return len(self._waiters)
+    
+    def _pop(self) -> _QueueEntry:
+        """Retira a próxima entrada; chamado sob o lock, com a fila não vazia"""        
+        # Round-robin entre as faixas; faixas esvaziadas por cancelamentos são descartadas aqui
+        while True:
+            lane = self._lane_cycle.popleft()
+            if self._lane_sizes[lane] > 0:
+                break
+            self._drop_lane(lane)
+        
+        heap = self._lanes[lane]
+        entry = heapq.heappop(heap)[2]
+        while entry.removed:
+            self._tombstones -= 1
+            entry = heapq.heappop(heap)[2]
+        
+        self._lane_sizes[lane] -= 1
+        if self._lane_sizes[lane] > 0:
+            self._lane_cycle.append(lane)
+        else:
+            self._drop_lane(lane)
+        
+        self._size -= 1
+        if entry.order.id != -1:
+            self._orders_by_id.pop(entry.order.id, None)
+        entry.removed = True
+        self._in_flight += 1
+        self._leave(entry.order)
+        return entry
+    
+    def _leave(self, order: Order) -> None:
+        """Chamado sob o lock, com a entrada do pedido já marcada como removida: atualiza os totais"""
+        self._cups -= order.size
+        remaining = self._box_counts[order.box] - 1
+        if remaining:
+            self._box_counts[order.box] = remaining
+        else:
+            del self._box_counts[order.box]
+        
+        arrivals = self._arrivals
+        while arrivals and arrivals[0].removed:
+            arrivals.popleft()
+        if len(arrivals) > 2 * self._size + self.COMPACTION_MIN_TOMBSTONES:
+            self._arrivals = deque(entry for entry in arrivals if not entry.removed)
+    
+    def dequeue_many(self, count: int) -> List[Order]:
+        """Remove até `count` pedidos da fila, na ordem de atendimento"""
+        entries = []
+        with self._lock:
+            while len(entries) < count and self._size > 0:
+                entries.append(self._pop())
+        
+        now = time.monotonic()
+        for entry in entries:
+            QUEUE_WAIT_SECONDS.observe(now - entry.enqueued_at)
+        return [entry.order for entry in entries]
+    
     def remove(self, order: Order) -> bool:
-        logger.debug(f"Tentando remover pedido da fila: ID={order.id}")
-        
-        try:
-            self._queue.remove(order)
-            if order.id != -1 and order.id in self._orders_by_id:
-                del self._orders_by_id[order.id]
-            logger.debug(f"Pedido removido da fila: ID={order.id}, Tamanho restante={len(self._queue)}")
-            return True
-        except ValueError:
-            logger.debug(f"Pedido não encontrado na fila para remoção: ID={order.id}")
-            return False
+        logger.debug("Tentando remover pedido da fila: ID=%s", order.id)
+        
+        with self._lock:
+            entry = self._orders_by_id.pop(order.id, None) if order.id != -1 else None
+            if entry is None:
+                logger.debug("Pedido não encontrado na fila para remoção: ID=%s", order.id)
+                return False
+            
+            entry.removed = True
+            self._in_flight += 1
+            self._lane_sizes[entry.lane] -= 1
+            self._size -= 1
+            self._leave(entry.order)
+            entry.order = None
+            self._tombstones += 1
+            if self._tombstones >= self.COMPACTION_MIN_TOMBSTONES and self._tombstones > self._size:
+                self._compact()
+            size = self._size
+        
+        logger.debug("Pedido removido da fila: ID=%s, Tamanho restante=%s", order.id, size)
+        return True
+    
+    def settle(self, count: int = 1) -> None:
+        """Informa que a transição de `count` pedidos retirados da fila já foi entregue ao banco"""
+        with self._lock:
+            self._in_flight = max(0, self._in_flight - count)
+            if self._in_flight == 0:
+                self._settled.notify_all()
+    
+    def _drop_lane(self, lane: Hashable) -> None:
+        self._tombstones -= len(self._lanes.pop(lane))
+        del self._lane_sizes[lane]
+    
+    def _compact(self) -> None:
+        logger.debug("Compactando fila: %s entradas removidas, %s ativas", self._tombstones, self._size)
+        for lane, heap in self._lanes.items():
+            live = [item for item in heap if not item[2].removed]
+            heapq.heapify(live)
+            self._lanes[lane] = live
+        self._tombstones = 0
     
     def get_by_id(self, order_id: int) -> Optional[Order]:
-        order = self._orders_by_id.get(order_id)
-        return order
+        entry = self._orders_by_id.get(order_id)
+        return entry.order if entry else None
     
     def is_empty(self) -> bool:
-        return len(self._queue) == 0
+        return self._size == 0
     
     def size(self) -> int:
-        return len(self._queue)
+        return self._size
     
-    def get_all_orders(self) -> List[Order]:
-        """Retorna uma lista com todos os pedidos na fila na ordem atual"""
-        return list(self._queue)
+    def totals(self) -> Dict[str, Any]:
+        """
+        Profundidade, copos pendentes (soma de `size`), pedidos por box e idade
+        em segundos do pedido há mais tempo na fila, sem percorrê-la. Pedidos do
+        backlog contam a idade a partir do início da carga.
+        """
+        with self._lock:
+            oldest = self._arrivals[0].enqueued_at if self._arrivals else None
+            totals = {"depth": self._size, "cups": self._cups, "boxes": dict(self._box_counts)}
+        
+        totals["oldest_age_seconds"] = time.monotonic() - oldest if oldest is not None else None
+        return totals
+    
+    def get_page(self, offset: int, limit: int) -> List[Order]:
+        """Os pedidos nas posições [offset, offset + limit) da ordem de atendimento"""
+        return self.get_all_orders(limit=offset + limit)[offset:]
+    
+    def get_all_orders(self, limit: Optional[int] = None) -> List[Order]:
+        """
+        Retorna uma lista com todos os pedidos na fila na ordem de atendimento,
+        ou só os `limit` primeiros (sem ordenar a fila inteira).
+        """
+        # Sob o lock só a cópia das entradas vivas; a ordenação é feita fora dele
+        with self._lock:
+            cycle, snapshot = self._copy_lanes()
+        return self._ordered(cycle, snapshot, limit)
+    
+    def _copy_lanes(self) -> Tuple[list, Dict[Any, list]]:
+        """Chamado sob o lock: as faixas na ordem do round-robin e suas entradas vivas"""
+        cycle = list(self._lane_cycle)
+        snapshot = {
+            lane: [(key, sequence, entry.order) for key, sequence, entry in self._lanes[lane] if not entry.removed]
+            for lane in cycle
+        }
+        return cycle, snapshot
+    
+    @staticmethod
+    def _ordered(cycle: list, snapshot: Dict[Any, list], limit: Optional[int] = None) -> List[Order]:
+        def ordered(items):
+            if limit is None:
+                return sorted(items, key=lambda item: item[:2])
+            return heapq.nsmallest(limit, items, key=lambda item: item[:2])
+        
+        lanes = {lane: deque(order for _, _, order in ordered(items)) for lane, items in snapshot.items()}
+        orders = []
+        cycle = deque(lane for lane in cycle if lanes[lane])
+        while cycle and (limit is None or len(orders) < limit):
+            lane = cycle.popleft()
+            orders.append(lanes[lane].popleft())
+            if lanes[lane]:
+                cycle.append(lane)
+        return orders
+    
+    def write_checkpoint(
+        self, path: str, read_change_seq: Callable[[], int], timeout: float
+    ) -> Optional[Tuple[int, int]]:
+        """
+        Grava um checkpoint binário da fila (ver database.checkpoint). Aguarda
+        até `timeout` segundos por um instante sem pedidos em trânsito e, ainda
+        sob o lock, chama `read_change_seq` (que deve descarregar as escritas
+        pendentes do banco) e copia a fila. Retorna (change_seq, pedidos
+        gravados), ou None se sempre houve pedidos em trânsito.
+        """
+        with self._lock:
+            if not self._settled.wait_for(lambda: self._in_flight == 0, timeout):
+                return None
+            change_seq = read_change_seq()
+            cycle, snapshot = self._copy_lanes()
+        
+        orders = self._ordered(cycle, snapshot)
+        write_checkpoint(path, orders, change_seq)
+        return change_seq, len(orders)
     
     def get_queue_state(self) -> str:
         """
         Retorna uma representação visual do estado atual da fila.
         Mostra posição, ID, Box e Status de cada pedido.
         """
-        if len(self._queue) == 0:
-            return "\n" + "="*60 + "\n  FILA VAZIA - Nenhum pedido aguardando\n" + "="*60 + "\n"
-        
-        lines = []
-        lines.append("\n" + "="*60)
-        lines.append(f"  ESTADO DA FILA - Total: {len(self._queue)} pedido(s)")
-        lines.append("="*60)
-        lines.append(f"{'Pos.':<6} {'ID':<8} {'Box':<6} {'Status':<12} {'Produtos':<10}")
-        lines.append("-"*60)
-        
-        for position, order in enumerate(self._queue, start=1):
-            order_id = order.id if order.id != -1 else "N/A"
-            box = order.box if order.box != -1 else "N/A"
-            status = order.status
-            products_count = len(order.products)
-            
-            lines.append(f"{position:<6} {order_id:<8} {box:<6} {status:<12} {products_count:<10}")
-        
-        lines.append("="*60 + "\n")
-        
-        return "\n".join(lines)
+        if self._size == 0:
+            return format_queue_state(self.policy.name, [])
+        return format_queue_state(self.policy.name, self.get_all_orders())
 
+
+def format_queue_state(policy_name: str, orders: List[Order]) -> str:
+    """Tabela de texto com posição, ID, Box, Status e produtos dos pedidos na ordem de atendimento"""
+    if not orders:
+        return "\n" + "="*60 + "\n  FILA VAZIA - Nenhum pedido aguardando\n" + "="*60 + "\n"
+    
+    lines = []
+    lines.append("\n" + "="*60)
+    lines.append(f"  ESTADO DA FILA ({policy_name}) - Total: {len(orders)} pedido(s)")
+    lines.append("="*60)
+    lines.append(f"{'Pos.':<6} {'ID':<8} {'Box':<6} {'Status':<12} {'Produtos':<10}")
+    lines.append("-"*60)
+    
+    for position, order in enumerate(orders, start=1):
+        order_id = order.id if order.id != -1 else "N/A"
+        box = order.box if order.box != -1 else "N/A"
+        status = order.status
+        products_count = len(order.products)
+        
+        lines.append(f"{position:<6} {order_id:<8} {box:<6} {status:<12} {products_count:<10}")
+    
+    lines.append("="*60 + "\n")
+    
+    return "\n".join(lines)
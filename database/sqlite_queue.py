@@ -0,0 +1,275 @@
+import threading
+import time
+from typing import Any, Dict, List, Optional, Union
+from models.models import Order
+from database.database import Database, NEXT_CHANGE_SEQ
+from database.queue_manager import (
+    FifoPolicy,
+    PriorityPolicy,
+    SchedulingPolicy,
+    ShortestJobFirstPolicy,
+    create_policy,
+    format_queue_state,
+)
+from utils.logger import get_logger
+from utils.metrics import DB_QUERY_SECONDS, QUEUE_WAIT_SECONDS
+
+logger = get_logger(__name__)
+
+
+# Custo de cada política como expressão SQL sobre a linha; menor sai primeiro
+_POLICY_COST_SQL = {
+    SchedulingPolicy: None,
+    FifoPolicy: None,
+    PriorityPolicy: "-priority",
+    ShortestJobFirstPolicy: "size",
+}
+
+_ORDER_COLUMNS = "id, box, status, size, products, priority"
+_WAIT_SECONDS_SQL = "(julianday('now', 'localtime') - julianday(timestamp)) * 86400.0"
+
+SQL_CLAIM = f'''
+    UPDATE Orders
+    SET status = 'production', is_synced = 0, change_seq = {NEXT_CHANGE_SEQ}
+    WHERE rowid = (
+        SELECT rowid FROM Orders
+        WHERE status = 'pending'
+        ORDER BY {{order_by}}
+        LIMIT 1
+    )
+    RETURNING {_ORDER_COLUMNS}, {_WAIT_SECONDS_SQL}
+'''
+
+SQL_CANCEL_PENDING = f'''
+    UPDATE Orders
+    SET status = 'cancelled', is_synced = 0, change_seq = {NEXT_CHANGE_SEQ}
+    WHERE id = ? AND id != -1 AND status = 'pending'
+'''
+
+SQL_GET_PENDING_BY_ID = f'''
+    SELECT {_ORDER_COLUMNS}
+    FROM Orders
+    WHERE id = ? AND id != -1 AND status = 'pending'
+'''
+
+SQL_HAS_PENDING = '''
+    SELECT EXISTS (SELECT 1 FROM Orders WHERE status = 'pending')
+'''
+
+SQL_GET_ALL_PENDING = f'''
+    SELECT {_ORDER_COLUMNS}
+    FROM Orders
+    WHERE status = 'pending'
+    ORDER BY {{order_by}}
+    LIMIT ? OFFSET ?
+'''
+
+SQL_PENDING_TOTALS_BY_BOX = f'''
+    SELECT box, COUNT(*), COALESCE(SUM(size), 0), MAX({_WAIT_SECONDS_SQL})
+    FROM Orders
+    WHERE status = 'pending'
+    GROUP BY box
+'''
+
+
+def _order_by(policy: SchedulingPolicy) -> str:
+    if type(policy) not in _POLICY_COST_SQL:
+        raise ValueError(
+            f"Política de fila não suportada pela fila SQLite: {policy.name}. "
+            f"Opções: {', '.join(sorted({cls.name for cls in _POLICY_COST_SQL}))}"
+        )
+    
+    terms = []
+    cost = _POLICY_COST_SQL[type(policy)]
+    if policy.aging_rate:
+        # Mesma chave da fila em memória: custo + aging_rate * instante de entrada (em segundos)
+        terms.append(f"{cost or 0} + {float(policy.aging_rate)!r} * julianday(timestamp) * 86400.0")
+    elif cost:
+        terms.append(cost)
+    return ", ".join(terms + ["timestamp", "rowid"])
+
+
+def _row_to_order(row) -> Order:
+    order_id, box, status, size, products_json, priority = row
+    return Order.from_storage(order_id, box, status, size, priority, products_json)
+
+
+class SQLiteQueueManager:
+    """
+    Fila compartilhada entre processos, com a mesma interface do QueueManager.
+    
+    A fila são as próprias linhas 'pending' de Orders: um pedido entra nela
+    quando o Database o grava (por isso `enqueue` não escreve nada) e sai
+    quando é reivindicado por um único `UPDATE ... RETURNING`, que o marca
+    como 'production' e o devolve. O SQLite serializa os escritores, então
+    dois processos nunca reivindicam o mesmo pedido. `remove` é a troca
+    atômica de 'pending' para 'cancelled'.
+    
+    A ordem segue a política (fifo, priority ou sjf, com aging); box_lanes
+    não é suportada. O checkpoint da fila não se aplica: ela já é durável.
+    
+    `dequeue(wait=...)` aguarda numa Condition avisada pelos enqueues deste
+    processo; pedidos gravados por outros processos são vistos a cada
+    `POLL_INTERVAL` segundos. Entre processos a ordem de atendimento dos
+    waiters não é garantida.
+    """
+    
+    persists_claims = True
+    POLL_INTERVAL = 0.25
+    
+    def __init__(self, database: Database, policy: Union[str, SchedulingPolicy, None] = None):
+        self.database = database
+        self.policy = create_policy(policy)
+        order_by = _order_by(self.policy)
+        self._sql_claim = SQL_CLAIM.format(order_by=order_by)
+        self._sql_get_all = SQL_GET_ALL_PENDING.format(order_by=order_by)
+        self._available = threading.Condition()
+        self._waiting = 0
+        self._generation = 0
+        logger.debug("SQLiteQueueManager inicializado com política '%s'", self.policy.name)
+    
+    def enqueue(self, order: Order) -> None:
+        """Só avisa os waiters; deve ser chamado depois que o pedido foi gravado no Database"""
+        if not isinstance(order, Order):
+            logger.error("Tentativa de adicionar objeto que não é Order à fila")
+            raise ValueError("Apenas objetos Order podem ser adicionados à fila")
+        self._notify(1)
+    
+    def enqueue_many(self, orders: List[Order]) -> None:
+        if not all(isinstance(order, Order) for order in orders):
+            logger.error("Tentativa de adicionar lote com objeto que não é Order à fila")
+            raise ValueError("Apenas objetos Order podem ser adicionados à fila")
+        self._notify(len(orders))
+    
+    def _notify(self, count: int) -> None:
+        with self._available:
+            self._generation += 1
+            self._available.notify(count)
+    
+    def enqueue_backlog(self, orders: List[Order], enqueued_at: float) -> int:
+        """Os pedidos pendentes do banco já estão na fila"""
+        return 0
+    
+    def dequeue(self, wait: float = 0.0) -> Optional[Order]:
+        """
+        Reivindica o próximo pedido. Com `wait` > 0 e a fila vazia, aguarda até
+        `wait` segundos por um pedido; a conexão volta ao pool durante a espera.
+        """
+        deadline = time.monotonic() + wait
+        while True:
+            # Um enqueue entre a reivindicação vazia e a espera muda a geração e não é perdido
+            generation = self._generation
+            row = self._claim()
+            remaining = deadline - time.monotonic()
+            if row is not None or remaining <= 0:
+                break
+            with self._available:
+                if generation == self._generation:
+                    self._waiting += 1
+                    self._available.wait(min(remaining, self.POLL_INTERVAL))
+                    self._waiting -= 1
+        
+        if row is None:
+            logger.debug("Tentativa de remover pedido de fila vazia")
+            return None
+        
+        order = self._claimed(row)
+        logger.debug("Pedido reivindicado na fila SQLite: ID=%s, Box=%s", order.id, order.box)
+        return order
+    
+    @DB_QUERY_SECONDS.time("queue_claim")
+    def _claim(self):
+        self.database.flush()
+        with self.database._get_connection() as conn:
+            rows = conn.execute(self._sql_claim).fetchall()
+            conn.commit()
+        return rows[0] if rows else None
+    
+    def waiting(self) -> int:
+        """Quantidade de `dequeue(wait=...)` aguardando neste processo"""
+        return self._waiting
+    
+    @DB_QUERY_SECONDS.time("queue_claim_many")
+    def dequeue_many(self, count: int) -> List[Order]:
+        """Reivindica até `count` pedidos em uma única transação, na ordem de atendimento"""
+        self.database.flush()
+        rows = []
+        with self.database._get_connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                while len(rows) < count:
+                    claimed = conn.execute(self._sql_claim).fetchall()
+                    if not claimed:
+                        break
+                    rows.extend(claimed)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+        
+        return [self._claimed(row) for row in rows]
+    
+    def _claimed(self, row) -> Order:
+        QUEUE_WAIT_SECONDS.observe(max(0.0, row[-1]))
+        return _row_to_order(row[:-1])
+    
+    def remove(self, order: Order) -> bool:
+        logger.debug("Tentando remover pedido da fila SQLite: ID=%s", order.id)
+        if order.id == -1:
+            return False
+        
+        self.database.flush()
+        with self.database._get_connection() as conn:
+            removed = conn.execute(SQL_CANCEL_PENDING, (order.id,)).rowcount > 0
+            conn.commit()
+        
+        if not removed:
+            logger.debug("Pedido não encontrado na fila para remoção: ID=%s", order.id)
+        return removed
+    
+    def settle(self, count: int = 1) -> None:
+        """Nada a fazer: a retirada já gravou a transição no banco"""
+    
+    def get_by_id(self, order_id: int) -> Optional[Order]:
+        self.database.flush()
+        with self.database._get_connection() as conn:
+            row = conn.execute(SQL_GET_PENDING_BY_ID, (order_id,)).fetchone()
+        return _row_to_order(row) if row else None
+    
+    def is_empty(self) -> bool:
+        self.database.flush()
+        with self.database._get_connection() as conn:
+            return not conn.execute(SQL_HAS_PENDING).fetchone()[0]
+    
+    def size(self) -> int:
+        return self.database.count_pending()
+    
+    def totals(self) -> Dict[str, Any]:
+        """Os mesmos totais do QueueManager, agregados pelo SQLite sobre os pedidos pendentes"""
+        self.database.flush()
+        with self.database._get_connection() as conn:
+            rows = conn.execute(SQL_PENDING_TOTALS_BY_BOX).fetchall()
+        
+        return {
+            "depth": sum(row[1] for row in rows),
+            "cups": sum(row[2] for row in rows),
+            "boxes": {row[0]: row[1] for row in rows},
+            "oldest_age_seconds": max((max(0.0, row[3]) for row in rows), default=None),
+        }
+    
+    def get_page(self, offset: int, limit: int) -> List[Order]:
+        """Os pedidos nas posições [offset, offset + limit) da ordem de atendimento"""
+        return self._get_pending(limit, offset)
+    
+    def get_all_orders(self, limit: Optional[int] = None) -> List[Order]:
+        """Retorna os pedidos pendentes na ordem de atendimento, ou só os `limit` primeiros"""
+        return self._get_pending(-1 if limit is None else limit, 0)
+    
+    def _get_pending(self, limit: int, offset: int) -> List[Order]:
+        self.database.flush()
+        with self.database._get_connection() as conn:
+            rows = conn.execute(self._sql_get_all, (limit, offset)).fetchall()
+        return [_row_to_order(row) for row in rows]
+    
+    def get_queue_state(self) -> str:
+        return format_queue_state(self.policy.name, self.get_all_orders())
@@ -0,0 +1,180 @@
+import os
+import sqlite3
+import threading
+import time
+from queue import Queue, Empty
+from typing import Any, Dict, List, Optional, Sequence
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class WriteBehindConfig:
+    """
+    Parâmetros do modo write-behind.
+    
+    - max_batch_size: máximo de mutações agrupadas em uma transação
+    - max_delay: tempo máximo (s) que uma mutação espera por outras antes do commit
+    - max_pending: tamanho do journal em memória; quando cheio, quem escreve aguarda
+    - fsync_before_ack: a escrita só retorna após o commit do seu grupo (synchronous=FULL)
+    """
+    
+    def __init__(
+        self,
+        max_batch_size: int = 256,
+        max_delay: float = 0.005,
+        max_pending: int = 10000,
+        fsync_before_ack: bool = False
+    ):
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay
+        self.max_pending = max_pending
+        self.fsync_before_ack = fsync_before_ack
+    
+    @classmethod
+    def from_env(cls) -> Optional["WriteBehindConfig"]:
+        """Lê ORDERS_API_WRITE_BEHIND* do ambiente; retorna None se o modo estiver desligado"""
+        if os.environ.get("ORDERS_API_WRITE_BEHIND", "0").lower() not in ("1", "true", "yes"):
+            return None
+        return cls(
+            max_batch_size=int(os.environ.get("ORDERS_API_WRITE_BEHIND_MAX_BATCH", 256)),
+            max_delay=float(os.environ.get("ORDERS_API_WRITE_BEHIND_MAX_DELAY_MS", 5)) / 1000,
+            max_pending=int(os.environ.get("ORDERS_API_WRITE_BEHIND_MAX_PENDING", 10000)),
+            fsync_before_ack=os.environ.get("ORDERS_API_WRITE_BEHIND_FSYNC", "0").lower() in ("1", "true", "yes")
+        )
+
+
+class _Mutation:
+    """Uma ou mais instruções (sql, params) aplicadas juntas, na mesma transação"""
+    
+    __slots__ = ("statements", "done")
+    
+    def __init__(self, statements: Sequence[tuple], done: Optional[threading.Event]):
+        self.statements = statements
+        self.done = done
+    
+    def apply(self, conn: sqlite3.Connection) -> None:
+        for sql, params in self.statements:
+            conn.executemany(sql, params)
+
+
+_STOP = object()
+
+
+class WriteBehindWriter:
+    """
+    Journal limitado em memória drenado por uma thread escritora, que agrupa
+    várias mutações em uma única transação (group commit).
+    """
+    
+    def __init__(self, database_name: str, config: WriteBehindConfig, pragmas: Dict[str, Any]):
+        self.config = config
+        self._database_name = database_name
+        self._pragmas = dict(pragmas)
+        if config.fsync_before_ack:
+            self._pragmas["synchronous"] = "FULL"
+        
+        self._journal: Queue = Queue(maxsize=config.max_pending)
+        self._progress = threading.Condition()
+        self._submitted = 0
+        self._completed = 0
+        self._closed = False
+        
+        self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self._thread.start()
+        logger.info(
+            "Write-behind ativo: lote=%s, atraso=%.1fms, "
+            "journal=%s, fsync_before_ack=%s",
+            config.max_batch_size, config.max_delay * 1000, config.max_pending, config.fsync_before_ack
+        )
+    
+    def submit(self, sql: str, params: Sequence[tuple]) -> None:
+        self.submit_many([(sql, params)])
+    
+    def submit_many(self, statements: Sequence[tuple]) -> None:
+        """Submete várias instruções (sql, params) como uma única mutação: gravadas todas ou nenhuma"""
+        if self._closed:
+            raise sqlite3.OperationalError("Write-behind encerrado")
+        
+        done = threading.Event() if self.config.fsync_before_ack else None
+        with self._progress:
+            self._submitted += 1
+        self._journal.put(_Mutation(statements, done))
+        
+        if done is not None:
+            done.wait()
+    
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Aguarda até que tudo o que foi submetido até agora esteja gravado"""
+        with self._progress:
+            target = self._submitted
+            return self._progress.wait_for(lambda: self._completed >= target, timeout)
+    
+    def pending(self) -> int:
+        with self._progress:
+            return self._submitted - self._completed
+    
+    def close(self) -> None:
+        """Grava o que resta no journal e encerra a thread escritora"""
+        if self._closed:
+            return
+        self._closed = True
+        self._journal.put(_STOP)
+        self._thread.join()
+        logger.info("Write-behind encerrado, journal drenado")
+    
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self._database_name, check_same_thread=False)
+        for name, value in self._pragmas.items():
+            conn.execute(f"PRAGMA {name} = {value}")
+        return conn
+    
+    def _collect_batch(self, first: _Mutation) -> List[Any]:
+        batch = [first]
+        deadline = time.monotonic() + self.config.max_delay
+        while len(batch) < self.config.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._journal.get_nowait() if remaining <= 0 else self._journal.get(timeout=remaining)
+            except Empty:
+                break
+            batch.append(item)
+            if item is _STOP:
+                break
+        return batch
+    
+    def _run(self) -> None:
+        conn = self._connect()
+        stopping = False
+        while not stopping:
+            batch = self._collect_batch(self._journal.get())
+            if batch[-1] is _STOP:
+                stopping = True
+                batch.pop()
+            if batch:
+                self._commit(conn, batch)
+        conn.close()
+    
+    def _commit(self, conn: sqlite3.Connection, batch: List[_Mutation]) -> None:
+        try:
+            for mutation in batch:
+                mutation.apply(conn)
+            conn.commit()
+        except sqlite3.Error as e:
+            conn.rollback()
+            logger.error("Erro no commit em grupo de %s mutações, aplicando uma a uma: %s", len(batch), e)
+            for mutation in batch:
+                try:
+                    mutation.apply(conn)
+                    conn.commit()
+                except sqlite3.Error as error:
+                    conn.rollback()
+                    logger.error("Mutação descartada pelo write-behind: %s", error, exc_info=True)
+        
+        for mutation in batch:
+            if mutation.done is not None:
+                mutation.done.set()
+        with self._progress:
+            self._completed += len(batch)
+            self._progress.notify_all()
+        logger.debug("Write-behind gravou %s mutações em uma transação", len(batch))
@@ -1,5 +1,6 @@
-from typing import List
-from pydantic import BaseModel, ConfigDict
+import json
+from typing import Any, List, Optional
+from pydantic import BaseModel, ConfigDict, PrivateAttr, TypeAdapter
 
 
 class Syrup(BaseModel):
@@ -30,16 +31,115 @@ class Product(BaseModel):
         return False
 
 
+class ProductUpdate(BaseModel):
+    """Campos de um produto alteráveis no lugar (PATCH /order/<id>/product/<pid>)"""
+    model_config = ConfigDict(extra='forbid')
+    
+    cup: Optional[int] = None
+    type: Optional[str] = None
+    status: Optional[str] = None
+    flavour: Optional[str] = None
+
+
+PRODUCTS_ADAPTER = TypeAdapter(List[Product])
+
+_STORAGE_FIELDS = frozenset({'id', 'box', 'status', 'size', 'priority', 'products'})
+
+
 class Order(BaseModel):
     id: int = -1
     box: int = -1
     status: str = "pending"
     size: int = 0
+    priority: int = 0
     products: List[Product] = []
 
+    # JSON dos produtos: o lido do banco ou o último serializado; descartado quando `products` é atribuído
+    _products_json: Optional[str] = PrivateAttr(default=None)
+    # JSON do pedido inteiro (ver json_bytes); descartado quando qualquer campo é atribuído
+    _json: Optional[bytes] = PrivateAttr(default=None)
+
     def __eq__(self, other):
         if isinstance(other, Order):
             if self.id != -1 and other.id != -1:
                 return self.id == other.id
         return False
 
+    @classmethod
+    def from_storage(
+        cls, id: int, box: int, status: str, size: int, priority: int, products_json: str
+    ) -> "Order":
+        """
+        Monta um Order a partir de dados já validados na entrada, sem revalidá-los.
+        Os produtos só são decodificados quando `products` é acessado.
+        """
+        # Equivalente a model_construct, sem o processamento de defaults
+        order = cls.__new__(cls)
+        object.__setattr__(order, '__dict__', {
+            'id': id, 'box': box, 'status': status, 'size': size, 'priority': priority
+        })
+        object.__setattr__(order, '__pydantic_fields_set__', set(_STORAGE_FIELDS))
+        object.__setattr__(order, '__pydantic_extra__', None)
+        object.__setattr__(order, '__pydantic_private__', {'_products_json': products_json, '_json': None})
+        return order
+
+    def __getattr__(self, name: str) -> Any:
+        if name == 'products':
+            products_json = self.__pydantic_private__.get('_products_json')
+            if products_json is not None:
+                products = PRODUCTS_ADAPTER.validate_json(products_json)
+                self.__dict__['products'] = products
+                return products
+        return super().__getattr__(name)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        super().__setattr__(name, value)
+        if name in _ORDER_FIELDS:
+            self.invalidate_json(products=name == 'products')
+
+    def invalidate_json(self, products: bool = True) -> None:
+        """
+        Descarta o JSON guardado. Atribuições aos campos já chamam este método;
+        quem alterar produtos no lugar (ex.: `order.products[0].status = ...`)
+        deve chamá-lo.
+        """
+        private = self.__pydantic_private__
+        private['_json'] = None
+        if products:
+            private['_products_json'] = None
+
+    def products_json(self) -> str:
+        """JSON dos produtos para gravação e respostas; serializado uma vez e reaproveitado"""
+        products_json = self.__pydantic_private__.get('_products_json')
+        if products_json is None:
+            products_json = PRODUCTS_ADAPTER.dump_json(self.products).decode()
+            self.__pydantic_private__['_products_json'] = products_json
+        return products_json
+
+    def json_bytes(self) -> bytes:
+        """
+        JSON do pedido, igual ao de `model_dump_json()`, montado uma vez a partir
+        do JSON dos produtos (sem decodificá-los, se vieram do banco) e guardado
+        até a próxima atribuição a um campo.
+        """
+        cached = self.__pydantic_private__.get('_json')
+        if cached is None:
+            cached = b'{"id":%d,"box":%d,"status":%s,"size":%d,"priority":%d,"products":%s}' % (
+                self.id, self.box, json.dumps(self.status, ensure_ascii=False).encode(),
+                self.size, self.priority, self.products_json().encode()
+            )
+            self.__pydantic_private__['_json'] = cached
+        return cached
+
+    def model_dump(self, **kwargs) -> dict:
+        self.products
+        return super().model_dump(**kwargs)
+
+    def model_dump_json(self, **kwargs) -> str:
+        if not kwargs:
+            return self.json_bytes().decode()
+        self.products
+        return super().model_dump_json(**kwargs)
+
+
+_ORDER_FIELDS = frozenset(Order.model_fields)
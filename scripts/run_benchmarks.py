@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+import subprocess
+import sys
+from pathlib import Path
+
+
+def run_benchmarks():
+    project_root = Path(__file__).parent.parent
+    venv_path = project_root / ".venv"
+    
+    print("=" * 60)
+    print("Executando benchmark de carga HTTP")
+    print("=" * 60)
+    
+    python_cmd = [sys.executable]
+    if venv_path.exists():
+        if sys.platform == "win32":
+            python_path = venv_path / "Scripts" / "python.exe"
+        else:
+            python_path = venv_path / "bin" / "python"
+        
+        if python_path.exists():
+            python_cmd = [str(python_path)]
+    
+    benchmark_args = sys.argv[1:]
+    
+    print(f"Comando: {' '.join(python_cmd)} benchmarks/bench_http_load.py {' '.join(benchmark_args)}")
+    print()
+    
+    result = subprocess.run(
+        python_cmd + ["benchmarks/bench_http_load.py"] + benchmark_args,
+        cwd=str(project_root)
+    )
+    
+    return result.returncode == 0
+
+
+if __name__ == "__main__":
+    success = run_benchmarks()
+    sys.exit(0 if success else 1)
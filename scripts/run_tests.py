@@ -29,12 +29,14 @@ def run_tests():
         if python_path.exists():
             pytest_cmd = [str(python_path), "-m", "pytest"]
     
+    test_paths = ["tests/testIntegration", "tests/testE2E/test_e2e.py"]
+    
     print(f"\nExecutando pytest...")
-    print(f"Comando: {' '.join(pytest_cmd)} tests/testE2E/test_e2e.py -v")
+    print(f"Comando: {' '.join(pytest_cmd)} {' '.join(test_paths)} -v")
     print()
     
     result = subprocess.run(
-        pytest_cmd + ["tests/testE2E/test_e2e.py", "-v"],
+        pytest_cmd + test_paths + ["-v"],
         cwd=str(project_root)
     )
     
@@ -0,0 +1,178 @@
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional
+from models.models import Order
+
+BUCKET_SECONDS = 3600
+
+
+class _HourBucket:
+    """Contadores de uma hora; alterados só sob o lock do OrderAnalytics"""
+    
+    __slots__ = (
+        "created", "started", "completed", "cancelled",
+        "wait_total", "wait_count", "production_total", "production_count",
+        "flavours", "syrups", "toppings"
+    )
+    
+    def __init__(self):
+        self.created = 0
+        self.started = 0
+        self.completed = 0
+        self.cancelled = 0
+        self.wait_total = 0.0
+        self.wait_count = 0
+        self.production_total = 0.0
+        self.production_count = 0
+        self.flavours = Counter()
+        self.syrups = Counter()
+        self.toppings = Counter()
+    
+    def merge(self, other: "_HourBucket") -> None:
+        for name in ("created", "started", "completed", "cancelled", "wait_count", "production_count"):
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        self.wait_total += other.wait_total
+        self.production_total += other.production_total
+        self.flavours.update(other.flavours)
+        self.syrups.update(other.syrups)
+        self.toppings.update(other.toppings)
+    
+    def summary(self, top: int) -> Dict[str, Any]:
+        return {
+            "created": self.created,
+            "started": self.started,
+            "completed": self.completed,
+            "cancelled": self.cancelled,
+            "avg_wait_seconds": _average(self.wait_total, self.wait_count),
+            "avg_production_seconds": _average(self.production_total, self.production_count),
+            "flavours": _ranking(self.flavours, top),
+            "syrups": _ranking(self.syrups, top),
+            "toppings": _ranking(self.toppings, top),
+        }
+
+
+def _average(total: float, count: int) -> Optional[float]:
+    return round(total / count, 3) if count else None
+
+
+def _ranking(counter: Counter, top: int) -> List[Dict[str, Any]]:
+    return [{"name": name, "count": count} for name, count in counter.most_common(top)]
+
+
+class OrderAnalytics:
+    """
+    Agregados operacionais mantidos a cada transição do OrderService, em
+    buckets de uma hora: pedidos criados, retirados, finalizados e
+    cancelados, tempo médio de espera (pending -> production) e de produção
+    (production -> completed) e popularidade de sabores, caldas e coberturas.
+    
+    Cada transição custa um acesso a um dicionário sob o lock; `stats` junta
+    no máximo `retention_hours` buckets, sem depender do tamanho do histórico.
+    Os instantes de entrada e de retirada ficam guardados enquanto o pedido
+    está vivo, no máximo até a sua hora sair da retenção: uma espera mais
+    longa que a janela não seria contada em nenhum bucket visível. Os
+    agregados são do processo e começam vazios a cada início; pedidos
+    carregados do banco na partida não têm tempo de espera medido.
+    """
+    
+    def __init__(self, retention_hours: int = 168, clock: Callable[[], float] = time.time):
+        self.retention_hours = retention_hours
+        self._clock = clock
+        self._buckets: Dict[int, _HourBucket] = {}
+        self._created_at: Dict[int, float] = {}
+        self._started_at: Dict[int, float] = {}
+        self._lock = threading.Lock()
+    
+    def _bucket(self, now: float) -> _HourBucket:
+        """
+        Chamado sob o lock: bucket da hora de `now`. Na primeira transição de
+        cada hora, descarta os buckets e os instantes de pedidos que saíram da retenção.
+        """
+        start = int(now // BUCKET_SECONDS) * BUCKET_SECONDS
+        bucket = self._buckets.get(start)
+        if bucket is None:
+            bucket = self._buckets[start] = _HourBucket()
+            oldest = start - (self.retention_hours - 1) * BUCKET_SECONDS
+            for expired in [key for key in self._buckets if key < oldest]:
+                del self._buckets[expired]
+            self._prune(self._created_at, oldest)
+            self._prune(self._started_at, oldest)
+        return bucket
+    
+    @staticmethod
+    def _prune(instants: Dict[int, float], oldest: float) -> None:
+        for order_id in [order_id for order_id, instant in instants.items() if instant < oldest]:
+            del instants[order_id]
+    
+    def record_created(self, orders: Iterable[Order]) -> None:
+        now = self._clock()
+        with self._lock:
+            bucket = self._bucket(now)
+            for order in orders:
+                bucket.created += 1
+                if order.id != -1:
+                    self._created_at[order.id] = now
+                for product in order.products:
+                    if product.flavour:
+                        bucket.flavours[product.flavour] += 1
+                    for syrup in product.syrups:
+                        bucket.syrups[syrup.name] += syrup.qtd
+                    for topping in product.toppings:
+                        bucket.toppings[topping.name] += topping.qtd
+    
+    def record_started(self, order_ids: Iterable[int]) -> None:
+        now = self._clock()
+        with self._lock:
+            bucket = self._bucket(now)
+            for order_id in order_ids:
+                bucket.started += 1
+                created_at = self._created_at.pop(order_id, None)
+                if created_at is not None:
+                    bucket.wait_total += now - created_at
+                    bucket.wait_count += 1
+                if order_id != -1:
+                    self._started_at[order_id] = now
+    
+    def record_completed(self, order_id: int) -> None:
+        now = self._clock()
+        with self._lock:
+            bucket = self._bucket(now)
+            bucket.completed += 1
+            started_at = self._started_at.pop(order_id, None)
+            if started_at is not None:
+                bucket.production_total += now - started_at
+                bucket.production_count += 1
+    
+    def record_cancelled(self, order_id: int) -> None:
+        now = self._clock()
+        with self._lock:
+            self._bucket(now).cancelled += 1
+            self._created_at.pop(order_id, None)
+            self._started_at.pop(order_id, None)
+    
+    def stats(self, hours: int = 24, top: int = 10) -> Dict[str, Any]:
+        """
+        As últimas `hours` horas (a atual inclusive), da mais antiga para a mais
+        recente, e o total da janela; as listas de popularidade trazem os `top`
+        itens mais pedidos.
+        """
+        hours = max(1, min(hours, self.retention_hours))
+        now = self._clock()
+        current = int(now // BUCKET_SECONDS) * BUCKET_SECONDS
+        starts = [current - offset * BUCKET_SECONDS for offset in range(hours - 1, -1, -1)]
+        
+        total = _HourBucket()
+        buckets = []
+        with self._lock:
+            for start in starts:
+                bucket = self._buckets.get(start)
+                buckets.append({
+                    "start": datetime.fromtimestamp(start).strftime("%Y-%m-%d %H:%M:%S"),
+                    **(bucket or _HourBucket()).summary(top)
+                })
+                if bucket:
+                    total.merge(bucket)
+        
+        return {"bucket_seconds": BUCKET_SECONDS, "hours": buckets, "totals": total.summary(top)}
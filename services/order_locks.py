@@ -0,0 +1,32 @@
+import threading
+from contextlib import contextmanager
+from typing import Iterable, Iterator
+
+
+class OrderLocks:
+    """
+    Locks por pedido, distribuídos em `stripes` locks fixos pelo id: pedidos
+    diferentes raramente disputam o mesmo lock e a memória não cresce com o
+    número de pedidos. Vários pedidos são travados em ordem crescente de
+    stripe, o que evita deadlock entre lotes.
+    """
+    
+    def __init__(self, stripes: int = 64):
+        self._locks = [threading.Lock() for _ in range(stripes)]
+    
+    def _index(self, order_id: int) -> int:
+        return hash(order_id) % len(self._locks)
+    
+    def for_order(self, order_id: int) -> threading.Lock:
+        return self._locks[self._index(order_id)]
+    
+    @contextmanager
+    def for_orders(self, order_ids: Iterable[int]) -> Iterator[None]:
+        locks = [self._locks[index] for index in sorted({self._index(order_id) for order_id in order_ids})]
+        for lock in locks:
+            lock.acquire()
+        try:
+            yield
+        finally:
+            for lock in reversed(locks):
+                lock.release()
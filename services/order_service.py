@@ -1,120 +1,389 @@
-from typing import Optional
-from models.models import Order
+import time
+from typing import Any, Dict, Iterator, List, Optional
+from pydantic import ValidationError
+from models.models import Order, ProductUpdate
 from database.database import Database
 from database.queue_manager import QueueManager
+from services.analytics import OrderAnalytics
+from services.order_locks import OrderLocks
+from services.queue_events import QueueEventBroker, order_summary
+from services.status_cache import OrderStatusCache
 from utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+# Status de origem aceitos por cada transição (compare-and-set em Database.set_status)
+FINISHABLE_STATUSES = ("production",)
+CANCELLABLE_STATUSES = ("pending", "production")
+
+
+class DuplicateOrderError(ValueError):
+    """O id do pedido já existe; o pedido gravado e o da fila não são alterados"""
+
 
 class OrderService:
+    """
+    Transições de estado dos pedidos, seguras para o servidor multi-thread.
+    
+    Cada transição de um pedido (fila, banco e índice de status) acontece sob
+    o lock do seu id em `order_locks` e grava só o status, com compare-and-set
+    (`Database.set_status`). A retirada da fila é atômica, então dois `get`
+    nunca recebem o mesmo pedido; quem retira ainda espera o lock do pedido e
+    o troca de 'pending' para 'production'. Se um cancelamento chega nesse
+    intervalo (o pedido já saiu da fila, mas continua 'pending'), ele vence:
+    a troca do `get` falha e ele segue para o próximo pedido. Um cancelamento
+    depois da marcação cancela o pedido em produção.
+    
+    Com uma fila que já grava 'production' na retirada (`queue.persists_claims`,
+    ver SQLiteQueueManager), o OrderService não repete essa escrita: ela poderia
+    sobrescrever um cancelamento feito por outro processo logo após a retirada.
+    
+    Cada transição é publicada em `events` ainda sob o lock do pedido, então os
+    assinantes recebem os eventos de um mesmo pedido na ordem em que aconteceram.
+    """
     
-    def __init__(self, database: Database, queue: QueueManager):
+    def __init__(
+        self,
+        database: Database,
+        queue: QueueManager,
+        status_cache: Optional[OrderStatusCache] = None,
+        order_locks: Optional[OrderLocks] = None,
+        events: Optional[QueueEventBroker] = None,
+        analytics: Optional[OrderAnalytics] = None
+    ):
         self.database = database
         self.queue = queue
+        self.status_cache = status_cache or OrderStatusCache()
+        self.order_locks = order_locks or OrderLocks()
+        self.events = events or QueueEventBroker()
+        self.analytics = analytics or OrderAnalytics()
     
     def create_order(self, order_data: dict) -> Order:
-        logger.debug(f"Criando pedido a partir dos dados: box={order_data.get('box')}, size={order_data.get('size')}")
+        logger.debug(
+            "Criando pedido a partir dos dados: box=%s, size=%s", order_data.get('box'), order_data.get('size')
+        )
         order = Order.model_validate(order_data)
         
-        logger.debug(f"Adicionando pedido {order.id} à fila")
-        self.queue.enqueue(order)
-        
-        logger.debug(f"Inserindo pedido {order.id} no banco de dados")
-        self.database.insert(order)
+        # Um get que retire o pedido antes do insert espera o lock para marcá-lo como 'production'
+        with self.order_locks.for_order(order.id):
+            if self._existing_ids([order.id]):
+                logger.warning("Pedido recusado: ID=%s já existe", order.id)
+                raise DuplicateOrderError(f"Order {order.id} already exists")
+            
+            if self.queue.persists_claims:
+                # A fila SQLite são as linhas de Orders: o enqueue só acorda os waiters, então vem depois do insert
+                logger.debug("Inserindo pedido %s no banco de dados", order.id)
+                self.database.insert(order)
+                self.queue.enqueue(order)
+            else:
+                logger.debug("Adicionando pedido %s à fila", order.id)
+                self.queue.enqueue(order)
+                
+                logger.debug("Inserindo pedido %s no banco de dados", order.id)
+                self.database.insert(order)
+            self.status_cache.set(order.id, order.status)
+            self.events.publish("enqueue", order_summary(order))
+            self.analytics.record_created([order])
         
-        logger.info(f"Pedido criado: ID={order.id}, Box={order.box}, Status={order.status}, Produtos={len(order.products)}")
+        logger.info(
+            "Pedido criado: ID=%s, Box=%s, Status=%s, Produtos=%s",
+            order.id, order.box, order.status, len(order.products)
+        )
         return order
     
-    def get_next_order(self) -> Optional[Order]:
+    def create_orders(self, orders_data: List[Any]) -> List[Dict[str, Any]]:
+        """
+        Cria um lote de pedidos. Itens inválidos ou com id repetido são
+        reportados individualmente; os válidos são gravados em uma única
+        transação e enfileirados juntos.
+        """
+        logger.debug("Criando lote de %s pedidos", len(orders_data))
+        results: List[Dict[str, Any]] = []
+        valid_orders: List[Order] = []
+        batch_ids = set()
+        
+        for index, order_data in enumerate(orders_data):
+            try:
+                if not isinstance(order_data, dict):
+                    raise ValueError("Invalid order format")
+                order = Order.model_validate(order_data)
+                if order.id in batch_ids:
+                    raise DuplicateOrderError(f"Order {order.id} already exists")
+                if order.id != -1:
+                    batch_ids.add(order.id)
+                valid_orders.append(order)
+                results.append({"index": index, "status": "created", "order": order})
+            except (ValidationError, ValueError) as e:
+                logger.warning("Pedido inválido no lote: índice=%s, erro=%s", index, e)
+                results.append({"index": index, "status": "error", "message": str(e)})
+        
+        if valid_orders:
+            with self.order_locks.for_orders(order.id for order in valid_orders):
+                existing = self._existing_ids([order.id for order in valid_orders])
+                if existing:
+                    logger.warning("Pedidos do lote recusados: IDs %s já existem", sorted(existing))
+                    valid_orders = [order for order in valid_orders if order.id not in existing]
+                    for result in results:
+                        if result["status"] == "created" and result["order"].id in existing:
+                            order_id = result.pop("order").id
+                            result.update(status="error", message=f"Order {order_id} already exists")
+                if valid_orders:
+                    self.database.insert_many(valid_orders)
+                    self.queue.enqueue_many(valid_orders)
+                    for order in valid_orders:
+                        self.status_cache.set(order.id, order.status)
+                        self.events.publish("enqueue", order_summary(order))
+                    self.analytics.record_created(valid_orders)
+        
+        logger.info(
+            "Lote processado: %s criados, %s com erro", len(valid_orders), len(orders_data) - len(valid_orders)
+        )
+        return results
+    
+    def get_next_order(self, wait: float = 0.0) -> Optional[Order]:
+        """
+        Retira o próximo pedido e o marca como 'production'. Com `wait` > 0 e a
+        fila vazia, aguarda até `wait` segundos por um pedido (long polling).
+        """
         logger.debug("Buscando próximo pedido da fila")
-        queue_size_before = self.queue.size()
         
-        order = self.queue.dequeue()
+        deadline = time.monotonic() + wait
+        while True:
+            order = self.queue.dequeue(wait=max(0.0, deadline - time.monotonic()))
+            if order is None:
+                logger.debug("Nenhum pedido disponível na fila")
+                return None
+            
+            with self.order_locks.for_order(order.id):
+                if not self.queue.persists_claims:
+                    if not self._claim([order.id]):
+                        continue
+                    order.status = "production"
+                self.status_cache.set(order.id, order.status)
+                self.events.publish("dequeue", {"id": order.id})
+                self.analytics.record_started([order.id])
+            
+            logger.info("Pedido %s removido da fila e marcado como 'production'", order.id)
+            logger.debug("Pedidos restantes na fila: %s", self.queue.size())
+            return order
+    
+    def get_next_orders(self, count: int) -> List[Order]:
+        """Retira até `count` pedidos da fila e os marca como 'production' em uma única transação"""
+        logger.debug("Buscando até %s pedidos da fila", count)
+        
+        orders: List[Order] = []
+        while len(orders) < count:
+            claimed = self.queue.dequeue_many(count - len(orders))
+            if not claimed:
+                break
+            
+            with self.order_locks.for_orders(order.id for order in claimed):
+                if not self.queue.persists_claims:
+                    accepted = self._claim([order.id for order in claimed])
+                    claimed = [order for order in claimed if order.id in accepted]
+                    for order in claimed:
+                        order.status = "production"
+                for order in claimed:
+                    self.status_cache.set(order.id, order.status)
+                    self.events.publish("dequeue", {"id": order.id})
+                self.analytics.record_started(order.id for order in claimed)
+            orders.extend(claimed)
         
-        if order:
-            logger.info(f"Pedido {order.id} removido da fila e marcado como 'production'")
-            order.status = "production"
-            self.database.update(order)
-            logger.debug(f"Pedidos restantes na fila: {queue_size_before - 1}")
+        if orders:
+            logger.info(
+                "%s pedidos removidos da fila e marcados como 'production': IDs=%s",
+                len(orders), [o.id for o in orders]
+            )
         else:
             logger.debug("Nenhum pedido disponível na fila")
         
-        return order
+        return orders
+    
+    def _existing_ids(self, order_ids: List[int]) -> set:
+        """Chamado sob o lock dos pedidos: ids já registrados no índice de status ou gravados no banco"""
+        ids = [order_id for order_id in order_ids if order_id != -1]
+        existing = {order_id for order_id in ids if self.status_cache.contains(order_id)}
+        existing.update(self.database.existing_ids(order_id for order_id in ids if order_id not in existing))
+        return existing
+    
+    def _known_statuses(self, order_ids: List[int]) -> Dict[int, str]:
+        """
+        Chamado sob o lock dos pedidos: status atual dos que estão no índice.
+        Toda transição passa por esse lock e atualiza o índice, então é com ele
+        que o banco decide o compare-and-set no modo write-behind.
+        """
+        known = {}
+        for order_id in order_ids:
+            status = self.status_cache.peek(order_id)
+            if status is not None:
+                known[order_id] = status
+        return known
+    
+    def _claim(self, order_ids: List[int]) -> set:
+        """
+        Chamado sob o lock dos pedidos retirados: troca 'pending' por 'production'
+        no banco e retorna os ids aceitos. Um pedido cancelado durante a retirada
+        não está mais 'pending' e é descartado. Pedidos com id -1 não são
+        endereçáveis no banco e são sempre aceitos.
+        """
+        addressable = [order_id for order_id in order_ids if order_id != -1]
+        try:
+            accepted = set(self.database.set_status(
+                addressable, "production", "pending", self._known_statuses(addressable)
+            ))
+        finally:
+            self.queue.settle(len(order_ids))
+        for order_id in addressable:
+            if order_id not in accepted:
+                logger.info("Pedido %s cancelado durante a retirada da fila; descartado", order_id)
+        accepted.update(order_id for order_id in order_ids if order_id == -1)
+        return accepted
     
     def finish_order(self, order_data: dict) -> bool:
-        order_id = order_data.get('id', 'desconhecido')
-        logger.debug(f"Finalizando pedido: ID={order_id}")
+        """
+        Variante de `finish_order_by_id` que recebe o pedido inteiro: o corpo
+        ainda é validado, mas só o id é usado. Retorna o resultado da
+        transição; corpo inválido levanta ValueError.
+        """
+        logger.debug("Finalizando pedido: ID=%s", order_data.get('id', 'desconhecido'))
+        order = Order.model_validate(order_data)
+        return self.finish_order_by_id(order.id)
+    
+    def finish_order_by_id(self, order_id: int) -> bool:
+        """Troca 'production' por 'completed'; False se o pedido não existe ou não está em produção"""
+        logger.debug("Finalizando pedido por ID: %s", order_id)
         
-        try:
-            order = Order.model_validate(order_data)
-            order.status = "completed"
-            self.database.update(order)
-            logger.info(f"Pedido finalizado com sucesso: ID={order.id}, Box={order.box}")
-            return True
-        except Exception as e:
-            logger.error(f"Erro ao finalizar pedido {order_id}: {str(e)}", exc_info=True)
-            return False
+        with self.order_locks.for_order(order_id):
+            if not self.database.set_status(
+                [order_id], "completed", FINISHABLE_STATUSES, self._known_statuses([order_id])
+            ):
+                logger.warning("Pedido não pode ser finalizado: ID=%s", order_id)
+                return False
+            self.status_cache.set(order_id, "completed")
+            self.events.publish("finish", {"id": order_id})
+            self.analytics.record_completed(order_id)
+        
+        logger.info("Pedido finalizado com sucesso: ID=%s", order_id)
+        return True
     
     def cancel_order(self, order_data: dict) -> bool:
-        order_id = order_data.get('id', 'desconhecido')
-        logger.debug(f"Cancelando pedido: ID={order_id}")
-        
-        try:
-            order = Order.model_validate(order_data)
-            
-            removed_from_queue = self.queue.remove(order)
-            if removed_from_queue:
-                logger.debug(f"Pedido {order.id} removido da fila")
-            else:
-                logger.debug(f"Pedido {order.id} não estava na fila")
-            
-            order.status = "cancelled"
-            self.database.update(order)
-            logger.info(f"Pedido cancelado com sucesso: ID={order.id}, Box={order.box}")
-            return True
-        except Exception as e:
-            logger.error(f"Erro ao cancelar pedido {order_id}: {str(e)}", exc_info=True)
-            return False
+        """
+        Variante de `cancel_order_by_id` que recebe o pedido inteiro: o corpo
+        ainda é validado, mas só o id é usado. Retorna o resultado da
+        transição; corpo inválido levanta ValueError.
+        """
+        logger.debug("Cancelando pedido: ID=%s", order_data.get('id', 'desconhecido'))
+        order = Order.model_validate(order_data)
+        return self.cancel_order_by_id(order.id)
     
     def cancel_order_by_id(self, order_id: int) -> bool:
-        logger.debug(f"Cancelando pedido por ID: {order_id}")
+        """
+        Cancela um pedido 'pending' (tirando-o da fila) ou 'production'; False se
+        o pedido não existe ou já terminou.
+        """
+        logger.debug("Cancelando pedido por ID: %s", order_id)
         
-        order = self.queue.get_by_id(order_id)
+        with self.order_locks.for_order(order_id):
+            removed_from_queue = self.queue.remove(Order(id=order_id))
+            if removed_from_queue:
+                logger.debug("Pedido %s removido da fila", order_id)
+            
+            # Uma fila que grava as transições (SQLite) já trocou 'pending' por 'cancelled' no remove
+            try:
+                cancelled = (removed_from_queue and self.queue.persists_claims) or bool(
+                    self.database.set_status(
+                        [order_id], "cancelled", CANCELLABLE_STATUSES, self._known_statuses([order_id])
+                    )
+                )
+            finally:
+                if removed_from_queue:
+                    self.queue.settle()
+            if not cancelled:
+                logger.warning("Pedido não encontrado ou já finalizado para cancelamento: ID=%s", order_id)
+                return False
+            self.status_cache.set(order_id, "cancelled")
+            self.events.publish("cancel", {"id": order_id})
+            self.analytics.record_cancelled(order_id)
         
-        if not order:
-            logger.debug(f"Pedido {order_id} não encontrado na fila, buscando no banco de dados")
-            order = self.database.get_by_id(order_id)
+        logger.info("Pedido cancelado com sucesso por ID: %s", order_id)
+        return True
+    
+    def update_product(self, order_id: int, product_id: int, product_data: dict) -> Optional[str]:
+        """
+        Altera campos de um produto do pedido (ver ProductUpdate) sem regravar o
+        pedido inteiro. Retorna o JSON do produto alterado, ou None se o pedido
+        ou o produto não existe. Corpo inválido levanta ValueError.
+        """
+        fields = ProductUpdate.model_validate(product_data).model_dump(exclude_unset=True, exclude_none=True)
+        if not fields:
+            raise ValueError("No product fields to update")
         
-        if order:
-            removed_from_queue = self.queue.remove(order)
-            if removed_from_queue:
-                logger.debug(f"Pedido {order.id} removido da fila")
+        with self.order_locks.for_order(order_id):
+            updated = self.database.update_product(order_id, product_id, fields)
+            if updated is None:
+                logger.warning("Produto %s não encontrado no pedido %s", product_id, order_id)
+                return None
             
-            order.status = "cancelled"
-            self.database.update(order)
-            logger.info(f"Pedido cancelado com sucesso por ID: {order.id}, Box={order.box}")
-            return True
+            position, product_json = updated
+            # O pedido ainda na fila em memória é o que o próximo get entrega
+            queued = None if self.queue.persists_claims else self.queue.get_by_id(order_id)
+            if queued is not None:
+                product = queued.products[position]
+                for name, value in fields.items():
+                    setattr(product, name, value)
+                queued.invalidate_json()
         
-        logger.warning(f"Pedido não encontrado para cancelamento: ID={order_id}")
-        return False
+        logger.info("Produto %s do pedido %s alterado: %s", product_id, order_id, fields)
+        return product_json
+    
+    def get_stats(self, hours: int) -> Dict[str, Any]:
+        return self.analytics.stats(hours)
     
     def get_order_status(self, order_id: int) -> Optional[str]:
-        logger.debug(f"Consultando status do pedido: ID={order_id}")
+        logger.debug("Consultando status do pedido: ID=%s", order_id)
+        
+        status = self.status_cache.get(order_id)
+        if status:
+            logger.debug("Status do pedido %s (cache): %s", order_id, status)
+            return status
         
         try:
-            order = self.database.get_by_id(order_id)
+            status = self.database.get_status(order_id)
             
-            if order:
-                logger.debug(f"Status do pedido {order_id}: {order.status}")
-                return order.status
+            if status:
+                # observe: uma transição concorrente pode ter registrado um status mais novo
+                self.status_cache.observe(order_id, status)
+                logger.debug("Status do pedido %s: %s", order_id, status)
+                return status
             else:
-                logger.debug(f"Pedido não encontrado: ID={order_id}")
+                logger.debug("Pedido não encontrado: ID=%s", order_id)
                 return None
         except Exception as e:
-            logger.error(f"Erro ao consultar status do pedido {order_id}: {str(e)}", exc_info=True)
+            logger.error("Erro ao consultar status do pedido %s: %s", order_id, e, exc_info=True)
             return None
     
+    def export_orders(self, **filters) -> Iterator[tuple]:
+        """Itera o histórico de pedidos direto do cursor do banco, sem carregá-lo em memória"""
+        return self.database.iter_orders(**filters)
+    
+    def queue_snapshot(self) -> Dict[str, Any]:
+        """Estado compacto da fila, enviado a cada novo assinante de eventos"""
+        return {
+            "policy": self.queue.policy.name,
+            "totals": self.queue.totals(),
+            "orders": [order_summary(order) for order in self.queue.get_all_orders()],
+        }
+    
+    def get_queue_page(self, offset: int, limit: int) -> Dict[str, Any]:
+        """Uma página dos pedidos na ordem de atendimento, com os totais da fila"""
+        return {
+            "policy": self.queue.policy.name,
+            "totals": self.queue.totals(),
+            "offset": offset,
+            "limit": limit,
+            "orders": self.queue.get_page(offset, limit),
+        }
+    
     def get_queue_state(self) -> str:
         """Retorna a representação visual do estado atual da fila"""
         return self.queue.get_queue_state()
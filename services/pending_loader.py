@@ -0,0 +1,179 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+from database.checkpoint import CheckpointError, read_checkpoint
+from database.database import Database
+from database.queue_manager import QueueManager
+from models.models import Order
+from services.status_cache import OrderStatusCache
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class PendingOrderLoader:
+    """
+    Carrega na fila os pedidos pendentes do banco, em blocos lidos em ordem
+    de chegada (timestamp, rowid) e enfileirados assim que chegam.
+    
+    Os pedidos entram por QueueManager.enqueue_backlog, à frente dos criados
+    durante a carga; por isso `start` pode carregar em segundo plano enquanto
+    a API já atende. Um pedido que uma requisição já registrou no índice de
+    status (criado de novo, cancelado...) não é enfileirado pela carga.
+    
+    Com `checkpoint_path`, a fila é reconstruída a partir do checkpoint binário
+    e só as linhas alteradas depois dele são lidas do banco. Se o checkpoint
+    faltar ou não for válido, a carga completa é usada.
+    """
+    
+    PROGRESS_LOG_INTERVAL = 10000
+    
+    def __init__(
+        self,
+        database: Database,
+        queue: QueueManager,
+        status_cache: Optional[OrderStatusCache] = None,
+        chunk_size: int = 1000,
+        checkpoint_path: Optional[str] = None
+    ):
+        self.database = database
+        self.queue = queue
+        self.status_cache = status_cache
+        self.chunk_size = chunk_size
+        self.checkpoint_path = checkpoint_path
+        
+        self.source: Optional[str] = None
+        self.total = 0
+        self.loaded = 0
+        self.skipped = 0
+        self.elapsed = 0.0
+        self.failed = False
+        self._done = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+    
+    def start(self) -> None:
+        """Inicia a carga em uma thread em segundo plano"""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self.run, name="pending-loader", daemon=True)
+        self._thread.start()
+    
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Aguarda o fim da carga; retorna False se o tempo esgotou antes"""
+        return self._done.wait(timeout)
+    
+    def is_done(self) -> bool:
+        return self._done.is_set()
+    
+    def is_complete(self) -> bool:
+        """A carga terminou e a fila reflete todo o backlog do banco"""
+        return self._done.is_set() and not self.failed
+    
+    def run(self) -> int:
+        """Executa a carga e retorna quantos pedidos foram enfileirados"""
+        started_at = time.monotonic()
+        enqueued = 0
+        next_report = self.PROGRESS_LOG_INTERVAL
+        
+        try:
+            restored = self._restore_checkpoint() if self.checkpoint_path else None
+            if restored is not None:
+                self.source = "checkpoint"
+                self.total = len(restored)
+                for start in range(0, len(restored), self.chunk_size):
+                    chunk = restored[start:start + self.chunk_size]
+                    enqueued += self._enqueue(chunk, started_at)
+                    self.loaded += len(chunk)
+            else:
+                self.source = "database"
+                self.total = self.database.count_pending()
+                logger.info("Carregando %s pedidos pendentes para a fila", self.total)
+                
+                for chunk in self.database.iter_pending(self.chunk_size):
+                    enqueued += self._enqueue(chunk, started_at)
+                    self.loaded += len(chunk)
+                    if self.loaded >= next_report:
+                        logger.info("Carga de pendentes: %s/%s pedidos lidos", self.loaded, self.total)
+                        next_report += self.PROGRESS_LOG_INTERVAL
+        except sqlite3.Error as e:
+            self.failed = True
+            logger.error("Erro ao carregar pedidos pendentes: %s", e, exc_info=True)
+        finally:
+            self.elapsed = time.monotonic() - started_at
+            self._done.set()
+        
+        logger.info(
+            "Carga de pendentes concluída em %.2fs: %s enfileirados, "
+            "%s ignorados, %s pedidos na fila",
+            self.elapsed, enqueued, self.skipped, self.queue.size()
+        )
+        return enqueued
+    
+    def _enqueue(self, orders: List[Order], started_at: float) -> int:
+        if self.status_cache is not None:
+            fresh = [order for order in orders if self.status_cache.seed(order.id, order.status)]
+        else:
+            fresh = orders
+        
+        enqueued = self.queue.enqueue_backlog(fresh, started_at)
+        self.skipped += len(orders) - enqueued
+        return enqueued
+    
+    def _restore_checkpoint(self) -> Optional[List[Order]]:
+        """
+        Lê o checkpoint e aplica sobre ele as linhas alteradas depois do seu
+        change_seq: pendentes novos entram no fim, pendentes já presentes são
+        trocados pela linha atual e os demais saem da fila.
+        Retorna None se for preciso cair para a carga completa.
+        """
+        if not os.path.exists(self.checkpoint_path):
+            logger.info("Checkpoint %s não encontrado, usando carga completa", self.checkpoint_path)
+            return None
+        
+        try:
+            checkpoint = read_checkpoint(self.checkpoint_path)
+        except CheckpointError as e:
+            logger.warning("%s; usando carga completa", e)
+            return None
+        
+        if self.database.get_change_seq() < checkpoint.change_seq:
+            logger.warning("Checkpoint mais novo que o banco de dados; usando carga completa")
+            return None
+        
+        orders: List[Optional[Order]] = list(checkpoint.orders)
+        positions = {order.id: index for index, order in enumerate(orders) if order.id != -1}
+        replayed = 0
+        for chunk in self.database.iter_changed_since(checkpoint.change_seq, self.chunk_size):
+            replayed += len(chunk)
+            for order in chunk:
+                index = positions.get(order.id) if order.id != -1 else None
+                if order.status == "pending":
+                    if index is None:
+                        if order.id != -1:
+                            positions[order.id] = len(orders)
+                        orders.append(order)
+                    else:
+                        # Ainda na fila, mas alterado depois do checkpoint (ex.: PATCH de um produto)
+                        orders[index] = order
+                elif index is not None:
+                    orders[index] = None
+                    del positions[order.id]
+        
+        logger.info(
+            "Checkpoint %s carregado: %s pedidos, "
+            "%s alterações reaplicadas do banco",
+            self.checkpoint_path, len(checkpoint.orders), replayed
+        )
+        return [order for order in orders if order is not None]
+    
+    def progress(self) -> Dict[str, Any]:
+        return {
+            "source": self.source,
+            "total": self.total,
+            "loaded": self.loaded,
+            "skipped": self.skipped,
+            "done": self.is_done(),
+            "elapsed": self.elapsed,
+        }
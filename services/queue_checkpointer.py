@@ -0,0 +1,90 @@
+import threading
+from typing import Optional
+from database.database import Database
+from database.queue_manager import QueueManager
+from services.pending_loader import PendingOrderLoader
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class QueueCheckpointer:
+    """
+    Grava periodicamente, e uma última vez ao encerrar, o checkpoint binário
+    da fila usado por PendingOrderLoader para reiniciar sem ler todo o banco.
+    
+    O change_seq do banco é lido sob o lock da fila, junto com o snapshot,
+    depois de descarregar as escritas pendentes e sem pedidos em trânsito
+    (retirados da fila, mas com a transição ainda não entregue ao banco): toda
+    retirada anterior ao snapshot já está gravada, e toda alteração ainda não
+    refletida nele tem change_seq maior e é reaplicada na carga. Se nada mudou
+    no banco desde o último checkpoint, o ciclo é pulado, assim como enquanto
+    `loader` não tiver terminado de montar a fila ou se os pedidos em trânsito
+    não se resolverem em `settle_timeout` segundos.
+    """
+    
+    def __init__(
+        self,
+        queue: QueueManager,
+        database: Database,
+        path: str,
+        interval: float = 30.0,
+        loader: Optional[PendingOrderLoader] = None,
+        settle_timeout: float = 1.0
+    ):
+        self.queue = queue
+        self.database = database
+        self.path = path
+        self.interval = interval
+        self.loader = loader
+        self.settle_timeout = settle_timeout
+        
+        self._last_change_seq: Optional[int] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.written = 0
+    
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="queue-checkpointer", daemon=True)
+        self._thread.start()
+        logger.info("Checkpoint da fila ativo: arquivo=%s, intervalo=%ss", self.path, self.interval)
+    
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Encerra a thread e grava o checkpoint final"""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join(timeout)
+            self._thread = None
+        self.run_once()
+    
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.run_once()
+    
+    def run_once(self) -> bool:
+        """Grava o checkpoint se o banco mudou desde o último; retorna se gravou"""
+        # Uma fila carregada pela metade geraria um checkpoint sem parte do backlog
+        if self.loader is not None and not self.loader.is_complete():
+            return False
+        
+        try:
+            if self.database.get_change_seq() == self._last_change_seq:
+                return False
+            
+            result = self.queue.write_checkpoint(self.path, self.database.get_change_seq, self.settle_timeout)
+        except Exception as e:
+            logger.error("Erro ao gravar checkpoint da fila: %s", e, exc_info=True)
+            return False
+        
+        if result is None:
+            logger.warning("Checkpoint da fila adiado: pedidos retirados ainda sem transição gravada no banco")
+            return False
+        
+        change_seq, count = result
+        self._last_change_seq = change_seq
+        self.written += 1
+        logger.debug("Checkpoint da fila gravado: %s pedidos, change_seq=%s", count, change_seq)
+        return True
@@ -0,0 +1,130 @@
+import json
+import threading
+from collections import deque
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from models.models import Order
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class Subscription:
+    """Buffer limitado de um assinante; preenchido pelo QueueEventBroker e lido pelo stream SSE"""
+    
+    def __init__(self, max_buffer: int):
+        self.max_buffer = max_buffer
+        self.events: deque = deque()
+        self.dropped = False
+        self.closed = False
+        self.ready = threading.Condition()
+    
+    def _offer(self, event: tuple) -> bool:
+        """Chamado sob o lock do broker; False se o buffer está cheio (assinante lento)"""
+        with self.ready:
+            if len(self.events) >= self.max_buffer:
+                self.dropped = True
+                self.ready.notify()
+                return False
+            self.events.append(event)
+            self.ready.notify()
+            return True
+    
+    def next_events(self, timeout: float) -> List[tuple]:
+        """Retira os eventos do buffer, aguardando até `timeout` segundos se estiver vazio"""
+        with self.ready:
+            if not self.events and not self.dropped and not self.closed:
+                self.ready.wait(timeout)
+            events = list(self.events)
+            self.events.clear()
+            return events
+
+
+class QueueEventBroker:
+    """
+    Distribui as mudanças da fila (enqueue, dequeue, finish, cancel) aos
+    assinantes de GET /queue/events.
+    
+    `publish` nunca bloqueia quem transiciona o pedido: cada assinante tem um
+    buffer de até `max_buffer` eventos e, se ele estiver cheio, o assinante é
+    desligado (o cliente reconecta e recebe um novo snapshot). Os eventos têm
+    uma sequência global; sem assinantes, publicar não custa nada além de um
+    teste.
+    """
+    
+    def __init__(self, max_buffer: int = 1024):
+        self.max_buffer = max_buffer
+        self._subscribers: List[Subscription] = []
+        self._lock = threading.Lock()
+        self._sequence = 0
+    
+    def subscribe(self, max_buffer: Optional[int] = None) -> tuple:
+        """Registra um assinante; retorna (assinatura, sequência do último evento publicado)"""
+        subscription = Subscription(max_buffer or self.max_buffer)
+        with self._lock:
+            self._subscribers.append(subscription)
+            sequence = self._sequence
+            count = len(self._subscribers)
+        logger.info("Novo assinante de eventos da fila, total=%s", count)
+        return subscription, sequence
+    
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            if subscription in self._subscribers:
+                self._subscribers.remove(subscription)
+            count = len(self._subscribers)
+        with subscription.ready:
+            subscription.closed = True
+            subscription.ready.notify()
+        logger.info("Assinante de eventos da fila removido, total=%s", count)
+    
+    def subscribers(self) -> int:
+        return len(self._subscribers)
+    
+    def publish(self, event_type: str, data: Dict[str, Any]) -> None:
+        if not self._subscribers:
+            return
+        
+        with self._lock:
+            self._sequence += 1
+            event = (self._sequence, event_type, data)
+            slow = [subscription for subscription in self._subscribers if not subscription._offer(event)]
+            for subscription in slow:
+                self._subscribers.remove(subscription)
+        
+        for _ in slow:
+            logger.warning("Assinante de eventos da fila desligado: buffer de %s eventos cheio", self.max_buffer)
+    
+    def stream(self, snapshot: Callable[[], Dict[str, Any]], keepalive: float = 15.0) -> Iterator[str]:
+        """
+        Gera o stream SSE de um novo assinante: primeiro o evento `snapshot`,
+        depois as mudanças. Eventos publicados enquanto o snapshot é montado
+        também são enviados; aplicá-los de novo não muda o estado (enqueue de
+        um pedido já presente e remoção de um ausente são no-ops).
+        """
+        subscription, sequence = self.subscribe()
+        try:
+            yield format_event(sequence, "snapshot", snapshot())
+            while True:
+                for event in subscription.next_events(keepalive) or [None]:
+                    yield format_event(*event) if event else ": keepalive\n\n"
+                if subscription.dropped:
+                    yield format_event(None, "dropped", {"reason": "slow consumer"})
+                    return
+                if subscription.closed:
+                    return
+        finally:
+            # Também quando o cliente desconecta e o servidor fecha o gerador
+            self.unsubscribe(subscription)
+
+
+def order_summary(order: Order) -> Dict[str, Any]:
+    """Campos de um pedido enviados no snapshot e nos eventos de enqueue"""
+    return {"id": order.id, "box": order.box, "size": order.size}
+
+
+def format_event(sequence: Optional[int], event_type: str, data: Dict[str, Any]) -> str:
+    """Um evento no formato text/event-stream"""
+    lines = [] if sequence is None else [f"id: {sequence}"]
+    lines.append(f"event: {event_type}")
+    lines.append(f"data: {json.dumps(data, separators=(',', ':'))}")
+    return "\n".join(lines) + "\n\n"
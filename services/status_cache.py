@@ -0,0 +1,154 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class OrderStatusCache:
+    """
+    Índice em memória id -> status, atualizado a cada transição do OrderService.
+    
+    Pedidos em andamento ficam sempre no índice; pedidos em estado terminal
+    vão para um LRU limitado a `max_terminal` entradas.
+    
+    Entradas registradas por `observe` (status lido do banco numa consulta)
+    ficam marcadas: só uma transição (`set`) impede a carga de pendentes de
+    enfileirar o pedido (ver `seed`).
+    """
+    
+    TERMINAL_STATUSES = frozenset({"completed", "cancelled"})
+    
+    def __init__(self, max_terminal: int = 10000):
+        self.max_terminal = max_terminal
+        self._active: Dict[int, str] = {}
+        self._terminal: OrderedDict = OrderedDict()
+        # Ids cuja entrada veio só de uma leitura do banco, sem transição registrada
+        self._observed: set = set()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, order_id: int) -> Optional[str]:
+        with self._lock:
+            status = self._active.get(order_id)
+            if status is None:
+                status = self._terminal.get(order_id)
+                if status is not None:
+                    self._terminal.move_to_end(order_id)
+            
+            if status is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return status
+    
+    def set(self, order_id: int, status: str) -> None:
+        if order_id == -1:
+            return
+        
+        with self._lock:
+            self._observed.discard(order_id)
+            self._store(order_id, status)
+    
+    def _store(self, order_id: int, status: str) -> None:
+        """Chamado sob o lock"""
+        if status in self.TERMINAL_STATUSES:
+            self._active.pop(order_id, None)
+            self._terminal[order_id] = status
+            self._terminal.move_to_end(order_id)
+            if len(self._terminal) > self.max_terminal:
+                evicted, _ = self._terminal.popitem(last=False)
+                self._observed.discard(evicted)
+        else:
+            self._terminal.pop(order_id, None)
+            self._active[order_id] = status
+    
+    def contains(self, order_id: int) -> bool:
+        """Se o pedido está no índice, sem contar como consulta"""
+        with self._lock:
+            return order_id in self._active or order_id in self._terminal
+    
+    def peek(self, order_id: int) -> Optional[str]:
+        """Status do pedido no índice, sem contar como consulta nem mexer no LRU"""
+        with self._lock:
+            status = self._active.get(order_id)
+            return status if status is not None else self._terminal.get(order_id)
+    
+    def update(self, order_id: int, status: str) -> bool:
+        """Atualiza o status apenas se o pedido já estiver no índice"""
+        with self._lock:
+            known = order_id in self._active or order_id in self._terminal
+        if known:
+            self.set(order_id, status)
+        return known
+    
+    def observe(self, order_id: int, status: str) -> None:
+        """Registra um status lido do banco, se o pedido ainda não estiver no índice"""
+        if order_id == -1:
+            return
+        
+        with self._lock:
+            if order_id in self._active or order_id in self._terminal:
+                return
+            self._observed.add(order_id)
+            self._store(order_id, status)
+    
+    def seed(self, order_id: int, status: str) -> bool:
+        """
+        Usado pela carga de pendentes: registra o status lido do banco e retorna
+        True, a menos que uma transição já tenha registrado o pedido (criado,
+        retirado ou cancelado durante a carga) - nesse caso retorna False e o
+        pedido não deve ser enfileirado. Uma entrada vinda de `observe` não conta.
+        """
+        if order_id == -1:
+            return True
+        
+        with self._lock:
+            known = order_id in self._active or order_id in self._terminal
+            if known and order_id not in self._observed:
+                return False
+            self._observed.discard(order_id)
+            self._store(order_id, status)
+            return True
+    
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "active": len(self._active),
+                "terminal": len(self._terminal),
+            }
+
+
+class PassThroughStatusCache(OrderStatusCache):
+    """
+    Índice que não guarda nada: toda consulta vai ao banco. Usado quando
+    outros processos também alteram os pedidos (fila SQLite), pois o índice
+    de um processo não veria as transições feitas pelos demais.
+    """
+    
+    def get(self, order_id: int) -> Optional[str]:
+        with self._lock:
+            self.misses += 1
+        return None
+    
+    def set(self, order_id: int, status: str) -> None:
+        pass
+    
+    def contains(self, order_id: int) -> bool:
+        return False
+    
+    def peek(self, order_id: int) -> Optional[str]:
+        return None
+    
+    def update(self, order_id: int, status: str) -> bool:
+        return False
+    
+    def observe(self, order_id: int, status: str) -> None:
+        pass
+    
+    def seed(self, order_id: int, status: str) -> bool:
+        return True
@@ -0,0 +1,188 @@
+import json
+import threading
+from typing import Any, Dict, List, Optional
+import requests
+from database.database import Database
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class SyncWorker:
+    """
+    Envia ao sistema central, em segundo plano, os pedidos com is_synced = 0.
+    
+    A cada ciclo lê um lote pelo índice parcial de is_synced, faz POST
+    {"orders": [...]} para `upstream_url` e marca o lote como sincronizado.
+    Em caso de falha transitória (conexão, timeout, 5xx, 408, 425 ou 429),
+    o tamanho do lote cai pela metade e a próxima tentativa espera um backoff
+    exponencial; após sucessos o lote volta a crescer.
+    
+    Qualquer outro 4xx é uma recusa do conteúdo e não se resolve tentando de novo: o lote
+    é dividido ao meio, sem backoff, até isolar o pedido recusado, que é
+    marcado como recusado (ver `Database.mark_sync_rejected`) e contado em
+    `rejected_total`, para não travar os pedidos seguintes.
+    """
+    
+    # Códigos 4xx que indicam um problema passageiro do sistema central, não do lote
+    TRANSIENT_CLIENT_ERRORS = frozenset({408, 425, 429})
+    
+    def __init__(
+        self,
+        database: Database,
+        upstream_url: str,
+        batch_size: int = 100,
+        max_batch_size: int = 500,
+        interval: float = 1.0,
+        timeout: float = 5.0,
+        initial_backoff: float = 0.5,
+        max_backoff: float = 60.0,
+        session: Optional[requests.Session] = None
+    ):
+        self.database = database
+        self.upstream_url = upstream_url
+        self.batch_size = batch_size
+        self.max_batch_size = max_batch_size
+        self.interval = interval
+        self.timeout = timeout
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self._session = session or requests.Session()
+        
+        self._backoff = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.synced_total = 0
+        self.rejected_total = 0
+        self.failures = 0
+    
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sync-worker", daemon=True)
+        self._thread.start()
+        logger.info("Sincronização iniciada: destino=%s, lote=%s", self.upstream_url, self.batch_size)
+    
+    def stop(self, timeout: Optional[float] = None) -> None:
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join(timeout)
+        self._thread = None
+        logger.info("Sincronização encerrada: %s pedidos enviados", self.synced_total)
+    
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            requested = self.batch_size
+            try:
+                synced = self.run_once()
+            except Exception as e:
+                logger.error("Erro inesperado na sincronização: %s", e, exc_info=True)
+                synced = 0
+                self._register_failure()
+            
+            # Lote cheio indica mais pendências, e lote reduzido sem backoff indica uma recusa
+            # sendo isolada: segue sem esperar o intervalo
+            if self._backoff > 0:
+                delay = self._backoff
+            elif synced >= requested or self.batch_size < requested:
+                delay = 0
+            else:
+                delay = self.interval
+            self._stop.wait(delay)
+    
+    def run_once(self) -> int:
+        """Sincroniza um lote; retorna quantos pedidos saíram da fila (enviados ou recusados)"""
+        rows = self.database.get_unsynced(self.batch_size)
+        if not rows:
+            return 0
+        
+        try:
+            response = self._session.post(
+                self.upstream_url,
+                json={"orders": [self._row_to_payload(row) for row in rows]},
+                timeout=self.timeout
+            )
+            response.raise_for_status()
+        except requests.HTTPError as e:
+            if self._is_rejection(e.response):
+                return self._handle_rejection(rows, e.response.status_code)
+            self._register_failure()
+            logger.warning(
+                "Falha ao sincronizar %s pedidos: %s. "
+                "Novo lote=%s, nova tentativa em %.1fs",
+                len(rows), e, self.batch_size, self._backoff
+            )
+            return 0
+        except requests.RequestException as e:
+            self._register_failure()
+            logger.warning(
+                "Falha ao sincronizar %s pedidos: %s. "
+                "Novo lote=%s, nova tentativa em %.1fs",
+                len(rows), e, self.batch_size, self._backoff
+            )
+            return 0
+        
+        self.database.mark_synced([(row[0], row[8]) for row in rows])
+        self._register_success()
+        self.synced_total += len(rows)
+        logger.debug("%s pedidos sincronizados com o sistema central", len(rows))
+        return len(rows)
+    
+    def _is_rejection(self, response: Optional[requests.Response]) -> bool:
+        return (
+            response is not None
+            and 400 <= response.status_code < 500
+            and response.status_code not in self.TRANSIENT_CLIENT_ERRORS
+        )
+    
+    def _handle_rejection(self, rows: List[tuple], status_code: int) -> int:
+        """Divide o lote recusado até isolar o pedido; um pedido sozinho recusado é marcado e ignorado"""
+        # O sistema central respondeu: não há o que esperar
+        self._backoff = 0.0
+        if len(rows) > 1:
+            self.batch_size = max(1, len(rows) // 2)
+            logger.warning(
+                "Lote de %s pedidos recusado pelo sistema central (HTTP %s); isolando com lote=%s",
+                len(rows), status_code, self.batch_size
+            )
+            return 0
+        
+        self.database.mark_sync_rejected([(row[0], row[8]) for row in rows])
+        self.rejected_total += 1
+        logger.error(
+            "Pedido %s recusado pelo sistema central (HTTP %s); não será reenviado até ser alterado",
+            rows[0][1], status_code
+        )
+        return 1
+    
+    def _register_failure(self) -> None:
+        self.failures += 1
+        self.batch_size = max(1, self.batch_size // 2)
+        self._backoff = min(self.max_backoff, self._backoff * 2 if self._backoff else self.initial_backoff)
+    
+    def _register_success(self) -> None:
+        self._backoff = 0.0
+        self.batch_size = min(self.max_batch_size, self.batch_size * 2)
+    
+    def _row_to_payload(self, row: tuple) -> Dict[str, Any]:
+        _, order_id, box, status, size, priority, timestamp, products_json, _ = row
+        return {
+            "id": order_id,
+            "box": box,
+            "status": status,
+            "size": size,
+            "priority": priority,
+            "timestamp": timestamp,
+            "products": json.loads(products_json),
+        }
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "synced_total": self.synced_total,
+            "rejected_total": self.rejected_total,
+            "failures": self.failures,
+            "batch_size": self.batch_size,
+            "backoff": self._backoff,
+        }
@@ -1,5 +1,8 @@
+import itertools
+import json
 import pytest
 import requests
+import threading
 import time
 from typing import Dict, Any, Optional
 
@@ -19,6 +22,13 @@ from tests.testE2E.mock import (
 
 BASE_URL = "http://localhost:1607"
 
+# O banco do servidor guarda os pedidos das execuções anteriores e ids repetidos são recusados
+_order_ids = itertools.count(int(time.time() * 1000))
+
+
+def new_order_id() -> int:
+    return next(_order_ids)
+
 
 @pytest.fixture
 def api_client():
@@ -29,9 +39,18 @@ def api_client():
         def create_order(self, order_data: Dict[str, Any]) -> requests.Response:
             return requests.post(f"{self.base_url}/order/put", json=order_data)
         
+        def create_orders_batch(self, orders_data: Any) -> requests.Response:
+            return requests.post(f"{self.base_url}/order/put_batch", json=orders_data)
+        
         def get_order(self) -> requests.Response:
             return requests.get(f"{self.base_url}/order/get")
         
+        def get_order_waiting(self, wait: Any) -> requests.Response:
+            return requests.get(f"{self.base_url}/order/get", params={"wait": wait})
+        
+        def get_orders(self, count: Any) -> requests.Response:
+            return requests.get(f"{self.base_url}/order/get", params={"n": count})
+        
         def finish_order(self, order: Dict[str, Any]) -> requests.Response:
             return requests.post(f"{self.base_url}/order/finish", json=order)
         
@@ -41,9 +60,33 @@ def api_client():
         def cancel_order_by_id(self, order_id: int) -> requests.Response:
             return requests.get(f"{self.base_url}/order/cancel_by_id", params={"id": order_id})
         
+        def finish_order_by_path(self, order_id: int) -> requests.Response:
+            return requests.post(f"{self.base_url}/order/{order_id}/finish")
+        
+        def cancel_order_by_path(self, order_id: int) -> requests.Response:
+            return requests.post(f"{self.base_url}/order/{order_id}/cancel")
+        
+        def update_product(self, order_id: int, product_id: int, fields: Any) -> requests.Response:
+            return requests.patch(f"{self.base_url}/order/{order_id}/product/{product_id}", json=fields)
+        
         def get_order_status(self, order_id: int) -> requests.Response:
             return requests.get(f"{self.base_url}/order/status", params={"id": order_id})
     
+        def export_orders(self, **params) -> requests.Response:
+            return requests.get(f"{self.base_url}/orders/export", params=params, stream=True)
+        
+        def get_metrics(self) -> requests.Response:
+            return requests.get(f"{self.base_url}/metrics")
+        
+        def get_stats(self, **params) -> requests.Response:
+            return requests.get(f"{self.base_url}/stats", params=params)
+        
+        def get_queue_snapshot(self, **params) -> requests.Response:
+            return requests.get(f"{self.base_url}/queue/snapshot", params=params)
+        
+        def get_queue_events(self) -> requests.Response:
+            return requests.get(f"{self.base_url}/queue/events", stream=True, timeout=5)
+    
     return APIClient(BASE_URL)
 
 
@@ -63,7 +106,7 @@ class TestOrderCreation:
     def test_given_valid_order_data_when_creating_order_then_order_is_created(
         self, api_client, created_order_ids
     ):
-        order_data = create_order_data()
+        order_data = create_order_data(order_id=new_order_id())
         
         response = api_client.create_order(order_data)
         
@@ -74,6 +117,19 @@ class TestOrderCreation:
         assert data["order"]["id"] == order_data["id"]
         created_order_ids.append(data["order"]["id"])
     
+    def test_given_existing_order_id_when_creating_again_then_conflict_is_returned(
+        self, api_client, created_order_ids
+    ):
+        order_data = create_order_data(order_id=new_order_id())
+        api_client.create_order(order_data)
+        created_order_ids.append(order_data["id"])
+        
+        response = api_client.create_order(dict(order_data, box=2))
+        
+        assert response.status_code == 409
+        assert response.json()["status"] == "error"
+        assert api_client.get_order_status(order_data["id"]).json()["order_status"] == "pending"
+    
     def test_given_invalid_order_format_when_creating_order_then_error_is_returned(
         self, api_client
     ):
@@ -86,7 +142,7 @@ class TestOrderCreation:
     def test_given_order_with_multiple_products_when_creating_order_then_order_is_created(
         self, api_client, created_order_ids
     ):
-        order_data = create_order_with_multiple_products()
+        order_data = create_order_with_multiple_products(order_id=new_order_id())
         
         response = api_client.create_order(order_data)
         
@@ -97,12 +153,58 @@ class TestOrderCreation:
         created_order_ids.append(data["order"]["id"])
 
 
+class TestOrderBatchCreation:
+    
+    def test_given_valid_orders_batch_when_creating_then_all_orders_are_created(
+        self, api_client, created_order_ids
+    ):
+        orders_data = [create_simple_order(order_id=new_order_id()) for _ in range(3)]
+        created_order_ids.extend(order["id"] for order in orders_data)
+        
+        response = api_client.create_orders_batch({"orders": orders_data})
+        
+        assert response.status_code == 201
+        data = response.json()
+        assert data["status"] == "success"
+        assert data["created"] == 3
+        assert [item["order"]["id"] for item in data["results"]] == [order["id"] for order in orders_data]
+    
+    def test_given_batch_with_invalid_item_when_creating_then_valid_items_are_created(
+        self, api_client, created_order_ids
+    ):
+        orders_data = [create_simple_order(order_id=new_order_id()), {"id": "not-a-number"}, "not an order"]
+        created_order_ids.append(orders_data[0]["id"])
+        
+        response = api_client.create_orders_batch(orders_data)
+        
+        assert response.status_code == 207
+        data = response.json()
+        assert data["created"] == 1
+        assert data["failed"] == 2
+        assert [item["status"] for item in data["results"]] == ["created", "error", "error"]
+    
+    def test_given_batch_with_only_invalid_items_when_creating_then_error_is_returned(self, api_client):
+        response = api_client.create_orders_batch([{"id": "not-a-number"}, "not an order"])
+        
+        assert response.status_code == 400
+        data = response.json()
+        assert data["status"] == "error"
+        assert data["details"]["created"] == 0
+        assert [item["status"] for item in data["details"]["results"]] == ["error", "error"]
+    
+    def test_given_empty_batch_when_creating_then_error_is_returned(self, api_client):
+        response = api_client.create_orders_batch([])
+        
+        assert response.status_code == 400
+        assert response.json()["status"] == "error"
+
+
 class TestOrderRetrieval:
     
     def test_given_order_in_queue_when_getting_order_then_order_is_retrieved(
         self, api_client, created_order_ids
     ):
-        order_data = create_order_data()
+        order_data = create_order_data(order_id=new_order_id())
         api_client.create_order(order_data)
         time.sleep(0.5)
         created_order_ids.append(order_data["id"])
@@ -128,6 +230,59 @@ class TestOrderRetrieval:
                 return
             time.sleep(0.1)
         pytest.fail("Queue should be empty after multiple attempts")
+    
+    def test_given_empty_queue_when_waiting_for_order_then_order_is_retrieved_on_arrival(
+        self, api_client, created_order_ids
+    ):
+        order_data = create_order_data(order_id=new_order_id())
+        created_order_ids.append(order_data["id"])
+        producer = threading.Timer(0.3, api_client.create_order, args=(order_data,))
+        producer.start()
+        
+        response = api_client.get_order_waiting(5)
+        producer.join()
+        
+        assert response.status_code == 200
+        assert response.json()["order"]["id"] == order_data["id"]
+    
+    def test_given_empty_queue_when_wait_expires_then_error_is_returned(self, api_client):
+        started = time.monotonic()
+        response = api_client.get_order_waiting(0.2)
+        
+        assert response.status_code == 404
+        assert time.monotonic() - started >= 0.2
+    
+    @pytest.mark.parametrize("wait", ["-1", "abc", "inf"])
+    def test_given_invalid_wait_when_getting_order_then_error_is_returned(self, api_client, wait):
+        response = api_client.get_order_waiting(wait)
+        
+        assert response.status_code == 400
+        assert response.json()["message"] == "Invalid wait"
+
+
+class TestOrderBatchRetrieval:
+    
+    def test_given_orders_in_queue_when_getting_n_orders_then_up_to_n_are_retrieved_in_order(
+        self, api_client, created_order_ids
+    ):
+        orders_data = [create_simple_order(order_id=new_order_id()) for _ in range(3)]
+        api_client.create_orders_batch(orders_data)
+        created_order_ids.extend(order["id"] for order in orders_data)
+        
+        first_response = api_client.get_orders(2)
+        second_response = api_client.get_orders(5)
+        
+        assert first_response.status_code == 200
+        first_orders = first_response.json()["orders"]
+        assert [order["id"] for order in first_orders] == [order["id"] for order in orders_data[:2]]
+        assert all(order["status"] == "production" for order in first_orders)
+        assert [order["id"] for order in second_response.json()["orders"]] == [orders_data[2]["id"]]
+    
+    def test_given_invalid_count_when_getting_orders_then_error_is_returned(self, api_client):
+        response = api_client.get_orders(0)
+        
+        assert response.status_code == 400
+        assert response.json()["status"] == "error"
 
 
 class TestOrderCompletion:
@@ -135,7 +290,7 @@ class TestOrderCompletion:
     def test_given_order_in_production_when_finishing_order_then_order_is_completed(
         self, api_client, created_order_ids
     ):
-        order_data = create_order_data()
+        order_data = create_order_data(order_id=new_order_id())
         api_client.create_order(order_data)
         time.sleep(0.5)
         created_order_ids.append(order_data["id"])
@@ -148,14 +303,46 @@ class TestOrderCompletion:
         assert response.status_code == 200
         data = response.json()
         assert data["status"] == "success"
+    
+    def test_given_order_in_production_when_finishing_by_id_then_order_is_completed_once(
+        self, api_client, created_order_ids
+    ):
+        order_data = create_order_data(order_id=new_order_id())
+        api_client.create_order(order_data)
+        time.sleep(0.5)
+        created_order_ids.append(order_data["id"])
+        
+        order_id = api_client.get_order().json()["order"]["id"]
+        response = api_client.finish_order_by_path(order_id)
+        repeated = api_client.finish_order_by_path(order_id)
+        
+        assert response.status_code == 200
+        assert api_client.get_order_status(order_id).json()["order_status"] == "completed"
+        assert repeated.status_code == 409
+        assert repeated.json()["message"] == "Order is completed"
 
+    
+    def test_given_pending_or_unknown_order_when_finishing_with_body_then_transition_is_refused(
+        self, api_client, created_order_ids
+    ):
+        order_data = create_simple_order(order_id=new_order_id())
+        api_client.create_order(order_data)
+        created_order_ids.append(order_data["id"])
+        
+        pending = api_client.finish_order(order_data)
+        unknown = api_client.finish_order(create_fake_order())
+        
+        assert pending.status_code == 409
+        assert pending.json()["message"] == "Order is pending"
+        assert api_client.get_order_status(order_data["id"]).json()["order_status"] == "pending"
+        assert unknown.status_code == 404
 
 class TestOrderCancellation:
     
     def test_given_order_in_queue_when_cancelling_order_then_order_is_cancelled(
         self, api_client, created_order_ids
     ):
-        order_data = create_order_data()
+        order_data = create_order_data(order_id=new_order_id())
         api_client.create_order(order_data)
         time.sleep(0.5)
         created_order_ids.append(order_data["id"])
@@ -169,18 +356,37 @@ class TestOrderCancellation:
     def test_given_order_id_when_cancelling_by_id_then_order_is_cancelled(
         self, api_client, created_order_ids
     ):
-        order_data = create_simple_order(order_id=100)
+        order_data = create_simple_order(order_id=new_order_id())
         api_client.create_order(order_data)
         time.sleep(0.5)
-        created_order_ids.append(100)
+        created_order_ids.append(order_data["id"])
         
-        response = api_client.cancel_order_by_id(100)
+        response = api_client.cancel_order_by_id(order_data["id"])
         
         assert response.status_code == 200
         data = response.json()
         assert data["status"] == "success"
     
-    def test_given_nonexistent_order_when_cancelling_then_error_or_success_is_returned(
+    def test_given_order_id_in_path_when_cancelling_then_order_is_cancelled(
+        self, api_client, created_order_ids
+    ):
+        order_id = new_order_id()
+        api_client.create_order(create_simple_order(order_id=order_id))
+        time.sleep(0.5)
+        created_order_ids.append(order_id)
+        
+        response = api_client.cancel_order_by_path(order_id)
+        
+        assert response.status_code == 200
+        assert api_client.get_order_status(order_id).json()["order_status"] == "cancelled"
+        assert api_client.cancel_order_by_path(order_id).status_code == 409
+    
+    def test_given_nonexistent_order_id_in_path_when_cancelling_then_not_found_is_returned(self, api_client):
+        response = api_client.cancel_order_by_path(987654)
+        
+        assert response.status_code == 404
+    
+    def test_given_nonexistent_order_when_cancelling_then_not_found_is_returned(
         self, api_client
     ):
         fake_order = create_fake_order()
@@ -188,8 +394,45 @@ class TestOrderCancellation:
         response = api_client.cancel_order(fake_order)
         data = response.json()
         
+        assert response.status_code == 404
+        assert data["status"] == "error"
+
+
+class TestProductUpdate:
+    
+    def test_given_order_product_when_patching_status_then_product_is_updated(
+        self, api_client, created_order_ids
+    ):
+        order_id = new_order_id()
+        api_client.create_order(create_order_with_multiple_products(order_id=order_id))
+        created_order_ids.append(order_id)
+        
+        response = api_client.update_product(order_id, 502, {"status": "completed"})
+        
         assert response.status_code == 200
-        assert data["status"] in ["success", "error"]
+        data = response.json()
+        assert data["status"] == "success"
+        assert data["product"]["id"] == 502
+        assert data["product"]["status"] == "completed"
+        assert data["product"]["flavour"] == "chocolate"
+    
+    def test_given_unknown_product_when_patching_then_not_found_is_returned(self, api_client, created_order_ids):
+        order_id = new_order_id()
+        api_client.create_order(create_order_with_multiple_products(order_id=order_id))
+        created_order_ids.append(order_id)
+        
+        response = api_client.update_product(order_id, 999, {"status": "completed"})
+        
+        assert response.status_code == 404
+    
+    def test_given_invalid_fields_when_patching_then_bad_request_is_returned(self, api_client, created_order_ids):
+        order_id = new_order_id()
+        api_client.create_order(create_order_with_multiple_products(order_id=order_id))
+        created_order_ids.append(order_id)
+        
+        assert api_client.update_product(order_id, 501, {"products": []}).status_code == 400
+        assert api_client.update_product(order_id, 501, {}).status_code == 400
+        assert api_client.update_product(order_id, 501, ["status"]).status_code == 400
 
 
 class TestOrderStatus:
@@ -197,7 +440,7 @@ class TestOrderStatus:
     def test_given_existing_order_id_when_getting_status_then_status_is_returned(
         self, api_client, created_order_ids
     ):
-        order_data = create_order_data()
+        order_data = create_order_data(order_id=new_order_id())
         api_client.create_order(order_data)
         time.sleep(0.5)
         created_order_ids.append(order_data["id"])
@@ -229,18 +472,160 @@ class TestOrderStatus:
         assert response.status_code in [404, 500]
 
 
+class TestOrderExport:
+    
+    def test_given_orders_when_exporting_with_filters_then_ndjson_pages_are_streamed(
+        self, api_client, created_order_ids
+    ):
+        orders_data = [create_simple_order(order_id=new_order_id(), box=7) for _ in range(3)]
+        api_client.create_orders_batch(orders_data)
+        created_order_ids.extend(order["id"] for order in orders_data)
+        
+        first_page = api_client.export_orders(box=7, status="pending", limit=2)
+        first_rows = [json.loads(line) for line in first_page.iter_lines() if line]
+        second_page = api_client.export_orders(box=7, status="pending", after=first_rows[-1]["rowid"])
+        second_rows = [json.loads(line) for line in second_page.iter_lines() if line]
+        
+        assert first_page.status_code == 200
+        assert first_page.headers["Content-Type"].startswith("application/x-ndjson")
+        assert [row["id"] for row in first_rows] == [order["id"] for order in orders_data[:2]]
+        assert [row["id"] for row in second_rows] == [orders_data[2]["id"]]
+        assert second_rows[0]["products"][0]["flavour"] == "chocolate"
+    
+    def test_given_invalid_time_filter_when_exporting_then_error_is_returned(self, api_client):
+        response = api_client.export_orders(since="yesterday")
+        
+        assert response.status_code == 400
+        assert response.json()["status"] == "error"
+    
+    @pytest.mark.parametrize("filters", [{"box": "abc"}, {"box": -1}, {"after": "x"}, {"limit": "xyz"}, {"limit": 0}])
+    def test_given_invalid_numeric_filter_when_exporting_then_error_is_returned(self, api_client, filters):
+        response = api_client.export_orders(**filters)
+        
+        assert response.status_code == 400
+        assert response.json()["message"] == f"Invalid '{next(iter(filters))}'"
+
+
+class TestMetrics:
+    
+    def test_given_requests_when_scraping_metrics_then_prometheus_text_is_returned(
+        self, api_client, created_order_ids
+    ):
+        order_data = create_simple_order(order_id=new_order_id())
+        api_client.create_order(order_data)
+        created_order_ids.append(order_data["id"])
+        
+        response = api_client.get_metrics()
+        
+        assert response.status_code == 200
+        assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+        assert 'orders_api_http_requests_total{method="POST",route="/order/put",status="201"}' in response.text
+        assert (
+            'orders_api_http_request_duration_seconds_bucket{method="POST",route="/order/put",le="+Inf"}'
+            in response.text
+        )
+        assert 'orders_api_db_query_duration_seconds_count{statement="insert"}' in response.text
+        assert "# TYPE orders_api_queue_size gauge" in response.text
+
+
+class TestStats:
+    
+    def test_given_created_order_when_getting_stats_then_current_hour_counts_it(
+        self, api_client, created_order_ids
+    ):
+        before = api_client.get_stats(hours=1).json()["hours"][-1]["created"]
+        order_data = create_simple_order(order_id=new_order_id())
+        api_client.create_order(order_data)
+        created_order_ids.append(order_data["id"])
+        
+        response = api_client.get_stats(hours=3)
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert data["bucket_seconds"] == 3600
+        assert len(data["hours"]) == 3
+        assert data["hours"][-1]["created"] == before + 1
+        assert "flavours" in data["totals"]
+    
+    def test_given_invalid_window_when_getting_stats_then_bad_request_is_returned(self, api_client):
+        assert api_client.get_stats(hours=0).status_code == 400
+        assert api_client.get_stats(hours="abc").status_code == 400
+        assert api_client.get_stats(hours=100000).status_code == 400
+
+
+class TestQueueSnapshot:
+    
+    def test_given_queued_orders_when_requesting_snapshot_then_page_and_totals_are_returned(
+        self, api_client, created_order_ids
+    ):
+        for order_id in (new_order_id() for _ in range(3)):
+            order_data = create_simple_order(order_id=order_id, box=36)
+            api_client.create_order(order_data)
+            created_order_ids.append(order_id)
+        
+        response = api_client.get_queue_snapshot(offset=1, limit=1)
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert (data["offset"], data["limit"]) == (1, 1)
+        assert len(data["orders"]) == 1
+        assert data["totals"]["depth"] >= 3
+        assert data["totals"]["boxes"]["36"] == 3
+        assert data["totals"]["oldest_age_seconds"] >= 0
+    
+    @pytest.mark.parametrize("params", [{"offset": -1}, {"limit": 0}, {"limit": 501}, {"offset": "abc"}])
+    def test_given_invalid_pagination_when_requesting_snapshot_then_error_is_returned(self, api_client, params):
+        response = api_client.get_queue_snapshot(**params)
+        
+        assert response.status_code == 400
+        assert response.json()["message"] == "Invalid pagination"
+
+
+def _read_event(lines) -> list:
+    """Linhas do próximo evento SSE, ignorando comentários de keepalive"""
+    event = []
+    for line in lines:
+        if line and not line.startswith(":"):
+            event.append(line)
+        elif not line and event:
+            break
+    return event
+
+
+class TestQueueEvents:
+    
+    def test_given_subscriber_when_order_is_created_then_snapshot_and_enqueue_event_are_streamed(
+        self, api_client, created_order_ids
+    ):
+        order_data = create_simple_order(order_id=new_order_id())
+        created_order_ids.append(order_data["id"])
+        
+        with api_client.get_queue_events() as response:
+            assert response.status_code == 200
+            assert response.headers["Content-Type"].startswith("text/event-stream")
+            lines = response.iter_lines(decode_unicode=True)
+            assert "event: snapshot" in _read_event(lines)
+            
+            api_client.create_order(order_data)
+            event = _read_event(lines)
+        
+        assert "event: enqueue" in event
+        data = json.loads(next(line for line in event if line.startswith("data: "))[len("data: "):])
+        assert data["id"] == order_data["id"]
+
+
 class TestMultipleOrders:
     
     def test_given_multiple_orders_when_processing_then_orders_are_processed_in_order(
         self, api_client, created_order_ids
     ):
         orders = []
-        for i in range(3):
-            order_data = create_simple_order(order_id=100 + i)
+        for _ in range(3):
+            order_data = create_simple_order(order_id=new_order_id())
             response = api_client.create_order(order_data)
             assert response.status_code == 201
             orders.append(response.json()["order"])
-            created_order_ids.append(100 + i)
+            created_order_ids.append(order_data["id"])
         
         assert len(orders) == 3
         
@@ -257,7 +642,7 @@ class TestCompleteFlow:
     def test_given_new_order_when_completing_full_flow_then_all_steps_succeed(
         self, api_client, created_order_ids
     ):
-        order_data = create_order_data()
+        order_data = create_order_data(order_id=new_order_id())
         
         create_response = api_client.create_order(order_data)
         assert create_response.status_code == 201
@@ -0,0 +1,21 @@
+import pytest
+
+import sys
+from pathlib import Path
+
+root_dir = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(root_dir))
+
+from database.database import Database
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "orders_test.db")
+
+
+@pytest.fixture
+def database(db_path):
+    db = Database(db_path)
+    yield db
+    db.close()
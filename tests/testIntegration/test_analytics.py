@@ -0,0 +1,82 @@
+import sys
+from pathlib import Path
+
+root_dir = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(root_dir))
+
+from database.queue_manager import QueueManager
+from models.models import Order
+from services.analytics import BUCKET_SECONDS, OrderAnalytics
+from services.order_service import OrderService
+from tests.testE2E.mock import create_order_with_multiple_products, create_simple_order
+
+
+class FakeClock:
+    
+    def __init__(self, now: float = 1000 * BUCKET_SECONDS):
+        self.now = now
+    
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestOrderAnalytics:
+    
+    def test_given_order_lifecycle_when_reading_stats_then_counts_and_durations_are_bucketed(self, database):
+        clock = FakeClock()
+        service = OrderService(database, QueueManager(), analytics=OrderAnalytics(clock=clock))
+        service.create_order(create_order_with_multiple_products(order_id=1))
+        service.create_order(create_simple_order(order_id=2))
+        
+        clock.now += 60
+        service.get_next_order()
+        clock.now += BUCKET_SECONDS
+        service.finish_order_by_id(1)
+        service.cancel_order_by_id(2)
+        stats = service.get_stats(2)
+        
+        previous, current = stats["hours"]
+        assert (previous["created"], previous["started"], previous["avg_wait_seconds"]) == (2, 1, 60.0)
+        assert (current["completed"], current["cancelled"]) == (1, 1)
+        assert current["avg_production_seconds"] == BUCKET_SECONDS
+        assert stats["totals"]["created"] == 2 and stats["totals"]["completed"] == 1
+        assert [item["name"] for item in stats["totals"]["toppings"]] == ["peanuts", "ovaltine"]
+    
+    def test_given_popularity_when_ranking_then_most_ordered_come_first(self):
+        analytics = OrderAnalytics(clock=FakeClock())
+        order = create_order_with_multiple_products(order_id=1)
+        order["products"][1]["flavour"] = "vanilla"
+        order["products"][1]["syrups"] = [{"name": "chocolate", "qtd": 3}]
+        
+        analytics.record_created([Order.model_validate(order)])
+        totals = analytics.stats(1, top=1)["totals"]
+        
+        assert totals["flavours"] == [{"name": "vanilla", "count": 2}]
+        assert totals["syrups"] == [{"name": "chocolate", "count": 3}]
+    
+    def test_given_old_buckets_when_window_moves_then_they_expire(self):
+        clock = FakeClock()
+        analytics = OrderAnalytics(retention_hours=3, clock=clock)
+        analytics.record_cancelled(1)
+        
+        clock.now += 3 * BUCKET_SECONDS
+        analytics.record_cancelled(2)
+        stats = analytics.stats(hours=10)
+        
+        assert len(stats["hours"]) == 3
+        assert [bucket["cancelled"] for bucket in stats["hours"]] == [0, 0, 1]
+        assert len(analytics._buckets) == 1
+    
+    def test_given_orders_never_finished_when_their_hour_expires_then_instants_are_dropped(self):
+        clock = FakeClock()
+        analytics = OrderAnalytics(retention_hours=3, clock=clock)
+        analytics.record_created([Order.model_validate(create_simple_order(order_id=i)) for i in (1, 2)])
+        analytics.record_started([1])
+        
+        clock.now += 2 * BUCKET_SECONDS
+        analytics.record_created([Order.model_validate(create_simple_order(order_id=3))])
+        assert (set(analytics._created_at), set(analytics._started_at)) == ({2, 3}, {1})
+        
+        clock.now += BUCKET_SECONDS
+        analytics.record_cancelled(4)
+        assert (set(analytics._created_at), set(analytics._started_at)) == ({3}, set())
@@ -0,0 +1,157 @@
+import pytest
+
+import sys
+import threading
+from pathlib import Path
+
+root_dir = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(root_dir))
+
+from database.checkpoint import CheckpointError, read_checkpoint, write_checkpoint
+from database.database import Database
+from database.queue_manager import QueueManager
+from models.models import Order
+from services.order_service import OrderService
+from services.pending_loader import PendingOrderLoader
+from services.queue_checkpointer import QueueCheckpointer
+from tests.testE2E.mock import create_order_with_multiple_products, create_simple_order
+
+
+@pytest.fixture
+def checkpoint_path(tmp_path):
+    return str(tmp_path / "queue.ckpt")
+
+
+def _restart(database: Database, checkpoint_path: str) -> tuple:
+    queue = QueueManager()
+    loader = PendingOrderLoader(database, queue, checkpoint_path=checkpoint_path)
+    loader.run()
+    return queue, loader
+
+
+class TestCheckpointFile:
+
+    def test_given_orders_when_writing_and_reading_then_fields_and_products_are_kept(self, checkpoint_path):
+        orders = [Order.model_validate(create_simple_order(order_id=i, box=i)) for i in (1, 2)]
+        orders.append(Order(id=3, box=7, size=4, priority=2, status="pending"))
+        
+        write_checkpoint(checkpoint_path, orders, change_seq=42)
+        checkpoint = read_checkpoint(checkpoint_path)
+        
+        assert checkpoint.change_seq == 42
+        assert [order.model_dump() for order in checkpoint.orders] == [order.model_dump() for order in orders]
+    
+    def test_given_corrupted_checkpoint_when_reading_then_checksum_error_is_raised(self, checkpoint_path):
+        write_checkpoint(checkpoint_path, [Order(id=1, box=1, size=1)], change_seq=1)
+        data = bytearray(Path(checkpoint_path).read_bytes())
+        data[-1] ^= 0xFF
+        Path(checkpoint_path).write_bytes(bytes(data))
+        
+        with pytest.raises(CheckpointError, match="Checksum"):
+            read_checkpoint(checkpoint_path)
+    
+    def test_given_other_version_when_reading_then_version_error_is_raised(self, checkpoint_path):
+        write_checkpoint(checkpoint_path, [], change_seq=1)
+        data = bytearray(Path(checkpoint_path).read_bytes())
+        data[4] = 99
+        Path(checkpoint_path).write_bytes(bytes(data))
+        
+        with pytest.raises(CheckpointError, match="Versão"):
+            read_checkpoint(checkpoint_path)
+
+
+class TestCheckpointRestore:
+
+    def test_given_changes_after_checkpoint_when_restarting_then_only_changed_rows_are_replayed(
+        self, database, checkpoint_path, monkeypatch
+    ):
+        queue = QueueManager()
+        service = OrderService(database, queue)
+        for i in range(1, 6):
+            service.create_order(create_simple_order(order_id=i))
+        QueueCheckpointer(queue, database, checkpoint_path).run_once()
+        
+        service.get_next_order()
+        service.cancel_order_by_id(3)
+        service.create_order(create_simple_order(order_id=6))
+        monkeypatch.setattr(database, "iter_pending", lambda *args: pytest.fail("full load"))
+        
+        restored, loader = _restart(database, checkpoint_path)
+        
+        assert loader.progress()["source"] == "checkpoint"
+        assert [order.id for order in restored.get_all_orders()] == [2, 4, 5, 6]
+        assert restored.get_by_id(2).products == queue.get_by_id(2).products
+    
+    def test_given_queued_order_changed_after_checkpoint_when_restarting_then_current_row_is_restored(
+        self, database, checkpoint_path
+    ):
+        queue = QueueManager()
+        service = OrderService(database, queue)
+        service.create_order(create_order_with_multiple_products(order_id=1))
+        service.create_order(create_simple_order(order_id=2))
+        QueueCheckpointer(queue, database, checkpoint_path).run_once()
+        
+        service.update_product(1, 502, {"flavour": "mint"})
+        restored, loader = _restart(database, checkpoint_path)
+        
+        assert loader.progress()["source"] == "checkpoint"
+        assert [order.id for order in restored.get_all_orders()] == [1, 2]
+        assert restored.get_by_id(1).products[1].flavour == "mint"
+    
+    def test_given_process_killed_between_dequeue_and_claim_flush_when_restarting_then_order_is_back_in_queue(
+        self, database, checkpoint_path, monkeypatch
+    ):
+        queue = QueueManager()
+        service = OrderService(database, queue)
+        for i in (1, 2):
+            service.create_order(create_simple_order(order_id=i))
+        checkpointer = QueueCheckpointer(queue, database, checkpoint_path, settle_timeout=0.2)
+        assert checkpointer.run_once()
+        service.create_order(create_simple_order(order_id=3))
+        
+        # A troca para 'production' do pedido retirado para antes de chegar ao banco, como num processo morto
+        claiming, killed = threading.Event(), threading.Event()
+        set_status = database.set_status
+        
+        def stalled_set_status(*args, **kwargs):
+            claiming.set()
+            killed.wait(5)
+            return set_status(*args, **kwargs)
+        
+        monkeypatch.setattr(database, "set_status", stalled_set_status)
+        worker = threading.Thread(target=service.get_next_order)
+        worker.start()
+        try:
+            assert claiming.wait(5)
+            assert not checkpointer.run_once()
+            restored, loader = _restart(database, checkpoint_path)
+        finally:
+            killed.set()
+            worker.join(5)
+        
+        assert loader.progress()["source"] == "checkpoint"
+        assert [order.id for order in restored.get_all_orders()] == [1, 2, 3]
+        
+        assert checkpointer.run_once()
+        restored, _ = _restart(database, checkpoint_path)
+        assert [order.id for order in restored.get_all_orders()] == [2, 3]
+    
+    def test_given_corrupted_checkpoint_when_restarting_then_full_load_is_used(self, database, checkpoint_path):
+        database.insert_many([Order(id=i) for i in (1, 2)])
+        Path(checkpoint_path).write_bytes(b"not a checkpoint")
+        
+        restored, loader = _restart(database, checkpoint_path)
+        
+        assert loader.progress()["source"] == "database"
+        assert [order.id for order in restored.get_all_orders()] == [1, 2]
+    
+    def test_given_unchanged_database_when_checkpointing_again_then_file_is_not_rewritten(
+        self, database, checkpoint_path
+    ):
+        database.insert(Order(id=1))
+        checkpointer = QueueCheckpointer(QueueManager(), database, checkpoint_path)
+        
+        assert checkpointer.run_once()
+        assert not checkpointer.run_once()
+        database.insert(Order(id=2))
+        assert checkpointer.run_once()
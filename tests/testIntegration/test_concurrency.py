@@ -0,0 +1,136 @@
+import random
+import threading
+
+import sys
+from pathlib import Path
+
+root_dir = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(root_dir))
+
+from database.database import Database
+from database.queue_manager import QueueManager
+from models.models import Order
+from services.order_service import OrderService
+from tests.testE2E.mock import create_simple_order
+
+
+THREADS = 8
+
+
+def _run_threads(target, count: int = THREADS) -> None:
+    barrier = threading.Barrier(count)
+    errors = []
+    
+    def run(index):
+        barrier.wait()
+        try:
+            target(index)
+        except Exception as e:
+            errors.append(e)
+    
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
+
+
+def _statuses(database: Database, ids) -> dict:
+    return {order_id: database.get_status(order_id) for order_id in ids}
+
+
+class TestQueueManagerConcurrency:
+
+    def test_given_concurrent_producers_and_consumers_when_draining_then_every_order_leaves_once(self):
+        queue = QueueManager()
+        taken = [[] for _ in range(THREADS)]
+        per_thread = 2000
+        
+        def work(index):
+            for i in range(per_thread):
+                queue.enqueue(Order(id=index * per_thread + i + 1))
+                if i % 2:
+                    taken[index].extend(order.id for order in queue.dequeue_many(2))
+        
+        _run_threads(work)
+        remaining = [order.id for order in queue.dequeue_many(THREADS * per_thread)]
+        
+        all_ids = [order_id for ids in taken for order_id in ids] + remaining
+        assert sorted(all_ids) == list(range(1, THREADS * per_thread + 1))
+        assert queue.is_empty()
+
+
+class TestOrderServiceConcurrency:
+
+    def test_given_concurrent_gets_when_draining_then_no_order_is_handed_out_twice(self, database):
+        service = OrderService(database, QueueManager())
+        service.create_orders([create_simple_order(order_id=i) for i in range(1, 401)])
+        handed_out = [[] for _ in range(THREADS)]
+        
+        def work(index):
+            while True:
+                order = service.get_next_order() if index % 2 else next(iter(service.get_next_orders(3)), None)
+                if order is None:
+                    return
+                handed_out[index].append(order.id)
+        
+        _run_threads(work)
+        
+        ids = [order_id for ids in handed_out for order_id in ids]
+        assert len(ids) == len(set(ids))
+        assert set(_statuses(database, range(1, 401)).values()) == {"production"}
+    
+    def test_given_cancels_racing_gets_when_settled_then_outcome_matches_who_claimed_first(self, database):
+        total = 600
+        service = OrderService(database, QueueManager())
+        handed_out, cancelled = set(), set()
+        
+        def work(index):
+            rng = random.Random(index)
+            for i in range(index, total, THREADS):
+                service.create_order(create_simple_order(order_id=i + 1))
+            for _ in range(total // THREADS):
+                if index % 2:
+                    order = service.get_next_order()
+                    if order is not None:
+                        handed_out.add(order.id)
+                else:
+                    order_id = rng.randint(1, total)
+                    if service.cancel_order_by_id(order_id):
+                        cancelled.add(order_id)
+        
+        _run_threads(work)
+        
+        # Cancelado vence (antes da retirada o get o descarta; depois, cancela o pedido em produção)
+        remaining = {order.id for order in service.queue.get_all_orders()}
+        for order_id, status in _statuses(database, range(1, total + 1)).items():
+            if order_id in cancelled:
+                expected = "cancelled"
+            elif order_id in handed_out:
+                expected = "production"
+            else:
+                expected = "pending"
+            assert status == expected, order_id
+            assert service.get_order_status(order_id) == expected
+            assert (order_id in remaining) == (expected == "pending")
+    
+    def test_given_creates_racing_gets_when_settled_then_handed_out_orders_are_in_production(self, database):
+        service = OrderService(database, QueueManager())
+        per_thread = 150
+        handed_out = []
+        
+        def work(index):
+            if index % 2:
+                for i in range(per_thread):
+                    service.create_order(create_simple_order(order_id=index * per_thread + i + 1))
+            else:
+                for _ in range(per_thread):
+                    order = service.get_next_order()
+                    if order is not None:
+                        handed_out.append(order.id)
+        
+        _run_threads(work)
+        
+        assert handed_out
+        assert set(_statuses(database, handed_out).values()) == {"production"}
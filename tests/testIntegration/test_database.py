@@ -0,0 +1,353 @@
+import sqlite3
+import pytest
+
+import sys
+from pathlib import Path
+
+root_dir = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(root_dir))
+
+from database import database as database_module
+from database.database import Database
+from database.migrations import MIGRATIONS, get_schema_version
+from database.write_behind import WriteBehindConfig
+from models.models import Order, Product
+from tests.testE2E.mock import create_order_data, create_order_with_multiple_products, create_simple_order
+
+
+def _query_plan(db_path: str, sql: str, params: tuple) -> str:
+    conn = sqlite3.connect(db_path)
+    try:
+        rows = conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+        return " | ".join(row[-1] for row in rows)
+    finally:
+        conn.close()
+
+
+def _create_legacy_database(db_path: str, rows: list):
+    conn = sqlite3.connect(db_path)
+    conn.execute('''
+        CREATE TABLE Orders (
+            id INTEGER DEFAULT -1,
+            box INTEGER NOT NULL,
+            status TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            products TEXT NOT NULL,
+            timestamp TEXT DEFAULT (datetime('now', 'localtime')),
+            is_synced INTEGER DEFAULT 0
+        )
+    ''')
+    conn.executemany(
+        'INSERT INTO Orders (id, box, status, size, products) VALUES (?, ?, ?, ?, ?)',
+        rows
+    )
+    conn.commit()
+    conn.close()
+
+
+class TestMigrations:
+
+    def test_given_new_database_when_opening_then_schema_is_at_latest_version(
+        self, database, db_path
+    ):
+        conn = sqlite3.connect(db_path)
+        version = get_schema_version(conn)
+        indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        conn.close()
+
+        assert version == MIGRATIONS[-1].version
+        assert {"idx_orders_id", "idx_orders_status_timestamp", "idx_orders_unsynced"} <= indexes
+
+    def test_given_legacy_database_with_duplicates_when_migrating_then_latest_row_is_kept(
+        self, db_path
+    ):
+        _create_legacy_database(db_path, [
+            (1, 1, "pending", 1, "[]"),
+            (1, 1, "completed", 1, "[]"),
+            (2, 1, "pending", 1, "[]"),
+            (-1, 1, "pending", 1, "[]"),
+            (-1, 1, "pending", 1, "[]"),
+        ])
+
+        db = Database(db_path)
+        order = db.get_by_id(1)
+        pending = db.get_pending()
+        db.close()
+
+        assert order.status == "completed"
+        assert sorted(o.id for o in pending) == [-1, -1, 2]
+
+    def test_given_migrated_database_when_reopening_then_migrations_are_not_reapplied(
+        self, db_path
+    ):
+        Database(db_path).close()
+        Database(db_path).close()
+
+        conn = sqlite3.connect(db_path)
+        count = conn.execute("SELECT COUNT(*) FROM schema_version").fetchone()[0]
+        conn.close()
+
+        assert count == len(MIGRATIONS)
+
+
+class TestDatabaseWrites:
+
+    def test_given_existing_id_when_inserting_again_then_row_is_kept(self, database):
+        database.insert(Order.model_validate(create_order_data(order_id=7, status="completed")))
+        database.insert(Order.model_validate(create_order_data(order_id=7, box=3)))
+
+        order = database.get_by_id(7)
+
+        assert order.status == "completed"
+        assert order.box == 1
+        assert database.existing_ids([7, 8, -1]) == {7}
+
+    def test_given_orders_batch_when_inserting_many_then_all_rows_are_written(self, database):
+        orders = [Order.model_validate(create_simple_order(order_id=i)) for i in range(1, 6)]
+
+        database.insert_many(orders)
+
+        assert [order.id for order in database.get_pending()] == [1, 2, 3, 4, 5]
+
+    def test_given_expected_status_when_setting_status_then_only_matching_rows_change(self, database):
+        database.insert_many([Order.model_validate(create_simple_order(order_id=i)) for i in range(1, 4)])
+        database.insert(Order.model_validate(create_order_data(order_id=4, status="completed")))
+
+        changed = database.set_status([1, 2, 4, 9], "production", "pending")
+
+        assert changed == [1, 2]
+        assert [database.get_status(i) for i in range(1, 5)] == ["production", "production", "pending", "completed"]
+        assert database.set_status([1, 3], "cancelled", ("pending", "production")) == [1, 3]
+        assert database.set_status([1], "completed", "production") == []
+
+    def test_given_status_change_when_reading_changes_then_each_row_gets_its_own_sequence(self, database):
+        database.insert_many([Order.model_validate(create_simple_order(order_id=i)) for i in range(1, 4)])
+        since = database.get_change_seq()
+
+        database.set_status([1, 2, 3], "production", "pending")
+        changed = [order.id for chunk in database.iter_changed_since(since) for order in chunk]
+
+        assert changed == [1, 2, 3]
+        assert database.get_change_seq() == since + 3
+
+
+class TestExport:
+
+    def test_given_filters_when_exporting_in_small_pages_then_rows_come_in_rowid_order(self, database):
+        for i in range(1, 12):
+            order = Order.model_validate(create_simple_order(order_id=i))
+            order.status = "pending" if i % 2 else "completed"
+            database.insert(order)
+
+        rows = list(database.iter_orders(status="pending", chunk_size=2))
+        assert [row[1] for row in rows] == [1, 3, 5, 7, 9, 11]
+
+        limited = list(database.iter_orders(status="pending", after=rows[1][0], limit=3, chunk_size=2))
+        assert [row[1] for row in limited] == [5, 7, 9]
+
+    def test_given_export_in_progress_when_reading_status_then_pool_connection_is_free(self, db_path):
+        db = Database(db_path, pool_size=1)
+        try:
+            for i in range(1, 6):
+                db.insert(Order.model_validate(create_simple_order(order_id=i)))
+
+            rows = db.iter_orders(chunk_size=2)
+            assert next(rows)[1] == 1
+
+            assert db.get_status(3) == "pending"
+            assert [row[1] for row in rows] == [2, 3, 4, 5]
+        finally:
+            db.close()
+
+
+class TestNormalizedProducts:
+
+    def _rows(self, db_path: str, table: str) -> list:
+        conn = sqlite3.connect(db_path)
+        try:
+            return conn.execute(f"SELECT * FROM {table} ORDER BY order_id, position").fetchall()
+        finally:
+            conn.close()
+
+    def test_given_normalized_layout_when_inserting_then_product_rows_are_replaced(self, db_path):
+        db = Database(db_path, normalized_products=True)
+
+        db.insert(Order.model_validate(create_order_with_multiple_products(order_id=7)))
+        db.insert(Order.model_validate(create_simple_order(order_id=7)))
+        db.insert_many([Order.model_validate(create_order_with_multiple_products(order_id=i)) for i in (8, 9)])
+        db.close()
+
+        products = self._rows(db_path, "Products")
+        assert [(row[0], row[1]) for row in products] == [(7, 0), (8, 0), (8, 1), (9, 0), (9, 1)]
+        assert products[2] == (8, 1, 502, 3, "ice cream", "pending", "chocolate")
+        assert self._rows(db_path, "Syrups")[:2] == [(8, 0, "caramel", 1), (8, 1, "chocolate", 2)]
+        assert len(self._rows(db_path, "Toppings")) == 4
+
+    def test_given_orders_written_before_enabling_when_opening_normalized_then_they_are_copied(self, db_path):
+        database = Database(db_path)
+        database.insert(Order.model_validate(create_order_with_multiple_products(order_id=7)))
+        database.close()
+
+        Database(db_path, normalized_products=True).close()
+        Database(db_path, normalized_products=True).close()
+
+        assert [row[:3] for row in self._rows(db_path, "Products")] == [(7, 0, 501), (7, 1, 502)]
+        assert self._rows(db_path, "Toppings") == [(7, 0, "peanuts", 1), (7, 1, "ovaltine", 1)]
+
+    @pytest.mark.parametrize("normalized", [False, True])
+    def test_given_product_when_updating_in_place_then_only_its_fields_change(self, db_path, normalized):
+        db = Database(db_path, normalized_products=normalized)
+        db.insert(Order.model_validate(create_order_with_multiple_products(order_id=7)))
+
+        position, product_json = db.update_product(7, 502, {"status": "completed", "cup": 9})
+        products = db.get_by_id(7).products
+        counts = db.count_products_by_flavour("completed")
+        db.close()
+
+        assert position == 1
+        assert Product.model_validate_json(product_json).model_dump() == products[1].model_dump()
+        assert (products[1].status, products[1].cup, products[1].flavour) == ("completed", 9, "chocolate")
+        assert products[0].status == "pending"
+        assert counts == [("chocolate", 1)]
+
+    def test_given_unknown_order_or_product_when_updating_then_nothing_changes(self, database):
+        database.insert(Order.model_validate(create_order_with_multiple_products(order_id=7)))
+
+        assert database.update_product(7, 999, {"status": "completed"}) is None
+        assert database.update_product(8, 501, {"status": "completed"}) is None
+        with pytest.raises(ValueError):
+            database.update_product(7, 501, {"products": []})
+
+
+class TestWriteBehind:
+
+    def _count_rows(self, db_path: str) -> int:
+        conn = sqlite3.connect(db_path)
+        try:
+            return conn.execute("SELECT COUNT(*) FROM Orders").fetchone()[0]
+        finally:
+            conn.close()
+
+    def test_given_write_behind_when_closing_then_pending_writes_are_flushed(self, db_path):
+        db = Database(db_path, write_behind=WriteBehindConfig(max_batch_size=50, max_delay=0.05))
+
+        for i in range(1, 201):
+            db.insert(Order.model_validate(create_simple_order(order_id=i)))
+        db.close()
+
+        assert self._count_rows(db_path) == 200
+
+    def test_given_write_behind_when_reading_then_own_writes_are_visible(self, db_path):
+        db = Database(db_path, write_behind=WriteBehindConfig(max_delay=0.05))
+        order = Order.model_validate(create_simple_order(order_id=1))
+
+        db.insert(order)
+        order.status = "production"
+        db.update(order)
+        stored = db.get_by_id(1)
+        db.close()
+
+        assert stored.status == "production"
+
+    def test_given_write_behind_when_setting_status_then_journaled_insert_is_seen(self, db_path):
+        db = Database(db_path, write_behind=WriteBehindConfig(max_delay=5.0))
+
+        db.insert(Order.model_validate(create_simple_order(order_id=1)))
+        changed = db.set_status([1], "production", "pending")
+        db.close()
+
+        assert changed == [1]
+        assert Database(db_path).get_status(1) == "production"
+
+    def test_given_known_statuses_when_setting_status_then_transition_is_journaled_without_flush(self, db_path):
+        db = Database(db_path, write_behind=WriteBehindConfig(max_delay=5.0))
+
+        db.insert_many([Order.model_validate(create_simple_order(order_id=i)) for i in (1, 2)])
+        changed = db.set_status([1, 2], "production", "pending", {1: "pending", 2: "cancelled"})
+
+        assert changed == [1]
+        assert db._writer.pending() == 2
+        db.close()
+        reopened = Database(db_path)
+        assert reopened.get_status(1) == "production"
+        assert reopened.get_status(2) == "pending"
+        reopened.close()
+
+    def test_given_stale_known_status_when_setting_status_then_row_keeps_its_status(self, db_path):
+        db = Database(db_path, write_behind=WriteBehindConfig(max_delay=0.05))
+
+        db.insert(Order.model_validate(create_simple_order(order_id=1)))
+        db.set_status([1], "completed", "pending")
+        db.set_status([1], "cancelled", ("pending", "production"), {1: "pending"})
+        db.close()
+
+        assert Database(db_path).get_status(1) == "completed"
+
+    def test_given_failing_statement_when_writing_together_then_whole_mutation_is_discarded(self, db_path):
+        db = Database(db_path, write_behind=WriteBehindConfig(max_delay=0.05))
+        order = Order.model_validate(create_simple_order(order_id=1))
+
+        db._execute_writes([
+            (database_module.SQL_INSERT, [db._insert_params(order)]),
+            ("INSERT INTO Products (order_id, product_id) VALUES (?, ?)", [(1, 1)]),
+        ])
+        db.insert(Order.model_validate(create_simple_order(order_id=2)))
+        db.close()
+
+        reopened = Database(db_path)
+        assert reopened.get_status(1) is None
+        assert reopened.get_status(2) == "pending"
+        reopened.close()
+
+    def test_given_fsync_before_ack_when_inserting_then_row_is_committed_on_return(self, db_path):
+        db = Database(db_path, write_behind=WriteBehindConfig(fsync_before_ack=True))
+
+        db.insert(Order.model_validate(create_simple_order(order_id=1)))
+
+        assert self._count_rows(db_path) == 1
+        db.close()
+
+
+class TestQueryPlans:
+
+    @pytest.mark.parametrize("sql, params", [
+        (database_module.SQL_GET_BY_ID, (1,)),
+        (database_module.SQL_GET_STATUS, (1,)),
+        (database_module.SQL_UPDATE, (1, "production", 1, "[]", 0, 1)),
+        (database_module.SQL_GET_PENDING, ()),
+        (database_module.SQL_GET_PENDING_SAME_TIMESTAMP, ("", 0, 100)),
+        (database_module.SQL_GET_PENDING_AFTER_TIMESTAMP, ("", 100)),
+        (database_module.SQL_GET_CHANGED_SINCE, (0, 100)),
+        (database_module.SQL_GET_UNSYNCED, (10,)),
+        (database_module.SQL_SET_STATUS.format(expected="?"), ("cancelled", 1, "pending")),
+        (database_module.SQL_FIND_PRODUCT, (1, 1)),
+        (database_module.SQL_FIND_PRODUCT_IN_JSON, (1, 1)),
+        (database_module.SQL_COUNT_PRODUCTS_BY_FLAVOUR, ("pending",)),
+    ])
+    def test_given_hot_query_when_explaining_then_an_index_is_used(
+        self, database, db_path, sql, params
+    ):
+        for i in range(1, 50):
+            database.insert(Order.model_validate(create_simple_order(order_id=i)))
+
+        plan = _query_plan(db_path, sql, params)
+
+        assert "USING" in plan and "INDEX" in plan, plan
+        # "SCAN Orders" sozinho é varredura da tabela inteira; percorrer um índice parcial é aceito
+        assert "SCAN Orders" not in plan.split(" | "), plan
+
+    @pytest.mark.parametrize("conditions, params", [
+        ("rowid > ?", (0, 100)),
+        ("rowid > ? AND status = ?", (0, "pending", 100)),
+        ("rowid > ? AND status = ? AND box = ?", (0, "pending", 1, 100)),
+    ])
+    def test_given_export_page_when_explaining_then_rows_are_not_sorted(
+        self, database, db_path, conditions, params
+    ):
+        for i in range(1, 50):
+            database.insert(Order.model_validate(create_simple_order(order_id=i)))
+
+        plan = _query_plan(db_path, database_module.SQL_EXPORT_PAGE.format(conditions=conditions), params)
+
+        assert "TEMP B-TREE" not in plan, plan
+        assert "SCAN Orders" not in plan.split(" | "), plan
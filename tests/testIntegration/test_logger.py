@@ -0,0 +1,37 @@
+import logging
+
+import sys
+from pathlib import Path
+
+root_dir = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(root_dir))
+
+from utils import logger as logger_module
+from utils.logger import DebugSamplingFilter
+
+
+def _record(level: int, lineno: int = 10) -> logging.LogRecord:
+    return logging.LogRecord("database.database", level, "database.py", lineno, "msg %s", (1,), None)
+
+
+class TestLoggerConfiguration:
+    
+    def test_given_levels_spec_when_resolving_then_most_specific_prefix_wins(self, monkeypatch):
+        monkeypatch.setattr(logger_module, "_levels", logger_module._parse_levels(
+            "database=WARNING, database.queue_manager=ERROR, invalid"
+        ))
+        monkeypatch.setattr(logger_module, "_default_level", logging.INFO)
+        
+        assert logger_module._level_for("database.queue_manager") == logging.ERROR
+        assert logger_module._level_for("database.database") == logging.WARNING
+        assert logger_module._level_for("databases") == logging.INFO
+        assert logger_module._level_for("api.http.routes") == logging.INFO
+    
+    def test_given_sampling_when_filtering_then_one_debug_per_site_in_every_n_passes(self):
+        sampling = DebugSamplingFilter(every=3)
+        
+        passed = [sampling.filter(_record(logging.DEBUG)) for _ in range(7)]
+        
+        assert passed == [True, False, False, True, False, False, True]
+        assert sampling.filter(_record(logging.DEBUG, lineno=20))
+        assert all(sampling.filter(_record(logging.INFO)) for _ in range(5))
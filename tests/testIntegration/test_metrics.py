@@ -0,0 +1,86 @@
+import threading
+import pytest
+
+import sys
+from pathlib import Path
+
+root_dir = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(root_dir))
+
+from flask import Flask
+
+from api.http.order_controller import OrderController
+from api.http.routes import register_routes
+from database.queue_manager import QueueManager
+from services.order_service import OrderService
+from tests.testE2E.mock import create_simple_order
+from utils.metrics import HTTP_REQUESTS, HTTP_REQUEST_SECONDS, QUEUE_WAIT_SECONDS, Registry
+
+
+@pytest.fixture
+def client(database):
+    app = Flask(__name__)
+    register_routes(app, OrderController(OrderService(database, QueueManager())))
+    return app.test_client()
+
+
+class TestMetricsRegistry:
+    
+    def test_given_observations_when_rendering_then_histogram_buckets_are_cumulative(self):
+        registry = Registry()
+        histogram = registry.histogram("latency_seconds", "Latência", ("route",), buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 0.5, 3.0):
+            histogram.observe(value, "/order/get")
+        
+        text = "".join(registry.render())
+        
+        assert '# TYPE latency_seconds histogram' in text
+        assert 'latency_seconds_bucket{route="/order/get",le="0.1"} 1\n' in text
+        assert 'latency_seconds_bucket{route="/order/get",le="1"} 3\n' in text
+        assert 'latency_seconds_bucket{route="/order/get",le="+Inf"} 4\n' in text
+        assert 'latency_seconds_sum{route="/order/get"} 4.05\n' in text
+        assert 'latency_seconds_count{route="/order/get"} 4\n' in text
+    
+    def test_given_finished_threads_when_reading_counter_then_their_increments_are_kept(self):
+        counter = Registry().counter("events_total", "Eventos", ("kind",))
+        
+        def work():
+            for _ in range(1000):
+                counter.inc("a")
+        
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        del threads
+        
+        assert counter.value("a") == 8000
+        assert counter.value("b") == 0
+
+
+class TestMetricsEndpoint:
+    
+    def test_given_requests_when_scraping_then_route_counters_and_latencies_are_exposed(self, client):
+        requests_before = HTTP_REQUESTS.value("GET", "/order/status", "404")
+        latencies_before = HTTP_REQUEST_SECONDS.count("GET", "/order/status")
+        client.get("/order/status", query_string={"id": 123456})
+        
+        response = client.get("/metrics")
+        text = response.get_data(as_text=True)
+        
+        assert response.status_code == 200
+        assert response.content_type.startswith("text/plain; version=0.0.4")
+        assert HTTP_REQUESTS.value("GET", "/order/status", "404") == requests_before + 1
+        assert HTTP_REQUEST_SECONDS.count("GET", "/order/status") == latencies_before + 1
+        assert 'orders_api_http_requests_total{method="GET",route="/order/status",status="404"}' in text
+        assert 'orders_api_db_query_duration_seconds_count{statement="get_status"}' in text
+    
+    def test_given_dequeued_order_when_scraping_then_queue_wait_is_observed(self, client):
+        waits_before = QUEUE_WAIT_SECONDS.count()
+        client.post("/order/put", json=create_simple_order(order_id=1))
+        
+        client.get("/order/get")
+        
+        assert QUEUE_WAIT_SECONDS.count() == waits_before + 1
+        assert 'orders_api_queue_wait_seconds_count ' in client.get("/metrics").get_data(as_text=True)
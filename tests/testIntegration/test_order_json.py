@@ -0,0 +1,69 @@
+import json
+
+import sys
+from pathlib import Path
+
+root_dir = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(root_dir))
+
+from flask import Flask
+from pydantic import BaseModel
+from models.models import Order
+from tests.testE2E.mock import create_order_with_multiple_products
+from utils.responses import OrderResponse
+
+
+def _order() -> Order:
+    return Order.model_validate(create_order_with_multiple_products(order_id=7))
+
+
+class TestOrderJson:
+
+    def test_given_order_when_serializing_then_bytes_match_pydantic_and_are_cached(self):
+        order = _order()
+        
+        assert order.json_bytes() == BaseModel.model_dump_json(order).encode()
+        assert order.json_bytes() is order.json_bytes()
+        assert json.loads(order.model_dump_json()) == order.model_dump()
+    
+    def test_given_field_assignment_when_serializing_then_only_the_changed_part_is_rebuilt(self):
+        order = _order()
+        products_json = order.products_json()
+        order.json_bytes()
+        
+        order.status = "production"
+        
+        assert json.loads(order.json_bytes())["status"] == "production"
+        assert order.products_json() is products_json
+        
+        order.products = order.products[:1]
+        assert len(json.loads(order.json_bytes())["products"]) == 1
+        assert order.products_json() is not products_json
+    
+    def test_given_products_changed_in_place_when_invalidating_then_new_json_is_built(self):
+        order = _order()
+        order.json_bytes()
+        
+        order.products[0].status = "completed"
+        order.invalidate_json()
+        
+        assert json.loads(order.json_bytes())["products"][0]["status"] == "completed"
+    
+    def test_given_order_read_from_database_when_serializing_then_products_are_not_decoded(self, database):
+        database.insert(_order())
+        
+        order = database.get_by_id(7)
+        payload = order.json_bytes()
+        
+        assert "products" not in order.__dict__
+        assert json.loads(payload) == _order().model_dump()
+    
+    def test_given_order_when_building_response_then_cached_bytes_are_spliced(self):
+        order = _order()
+        
+        with Flask(__name__).app_context():
+            response, status_code = OrderResponse.order_created(order)
+        
+        assert status_code == 201
+        assert response.mimetype == "application/json"
+        assert response.get_json() == {"status": "success", "message": "Order received", "order": order.model_dump()}
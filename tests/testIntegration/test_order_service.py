@@ -0,0 +1,186 @@
+import json
+import pytest
+
+import sys
+from pathlib import Path
+
+root_dir = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(root_dir))
+
+from database.database import Database
+from database.queue_manager import QueueManager
+from database.write_behind import WriteBehindConfig
+from services.order_service import DuplicateOrderError, OrderService
+from services.status_cache import OrderStatusCache
+from tests.testE2E.mock import create_order_with_multiple_products, create_simple_order
+
+
+@pytest.fixture
+def order_service(database):
+    return OrderService(database, QueueManager())
+
+
+class TestOrderStatusCache:
+    
+    def test_given_order_transitions_when_getting_status_then_cache_answers_without_database(
+        self, order_service, monkeypatch
+    ):
+        order_service.create_order(create_simple_order(order_id=1))
+        order_service.create_order(create_simple_order(order_id=2))
+        order_service.get_next_order()
+        order_service.cancel_order_by_id(2)
+        monkeypatch.setattr(order_service.database, "get_status", lambda order_id: pytest.fail("cache miss"))
+        
+        assert order_service.get_order_status(1) == "production"
+        assert order_service.get_order_status(2) == "cancelled"
+        assert order_service.status_cache.stats()["hits"] == 2
+    
+    def test_given_status_not_cached_when_getting_status_then_database_is_used_and_cached(
+        self, database
+    ):
+        OrderService(database, QueueManager()).create_order(create_simple_order(order_id=1))
+        service = OrderService(database, QueueManager())
+        
+        assert service.get_order_status(1) == "pending"
+        assert service.get_order_status(1) == "pending"
+        assert service.get_order_status(99) is None
+        assert service.status_cache.stats()["hits"] == 1
+        assert service.status_cache.stats()["misses"] == 2
+    
+    def test_given_full_terminal_lru_when_adding_then_least_recent_is_evicted(self):
+        cache = OrderStatusCache(max_terminal=2)
+        cache.set(1, "completed")
+        cache.set(2, "cancelled")
+        cache.get(1)
+        cache.set(3, "completed")
+        cache.set(4, "pending")
+        
+        assert cache.get(2) is None
+        assert cache.get(1) == "completed"
+        assert cache.get(4) == "pending"
+        assert cache.stats()["terminal"] == 2
+
+
+class TestStatusTransitions:
+    
+    def test_given_order_in_production_when_finishing_by_id_then_only_status_is_written(
+        self, order_service, monkeypatch
+    ):
+        order_service.create_order(create_simple_order(order_id=1))
+        order_service.get_next_order()
+        monkeypatch.setattr(order_service.database, "update", lambda order: pytest.fail("full row rewrite"))
+        
+        assert order_service.finish_order_by_id(1)
+        assert order_service.database.get_by_id(1).status == "completed"
+        assert order_service.get_order_status(1) == "completed"
+    
+    def test_given_order_body_when_finishing_or_cancelling_then_transition_result_is_returned(self, order_service):
+        order_service.create_order(create_simple_order(order_id=1))
+        
+        assert not order_service.finish_order(create_simple_order(order_id=1))
+        assert not order_service.cancel_order(create_simple_order(order_id=99))
+        assert order_service.cancel_order(create_simple_order(order_id=1))
+        with pytest.raises(ValueError):
+            order_service.finish_order({"id": "not-a-number"})
+    
+    def test_given_order_not_in_production_when_finishing_by_id_then_transition_is_refused(self, order_service):
+        order_service.create_order(create_simple_order(order_id=1))
+        
+        assert not order_service.finish_order_by_id(1)
+        assert not order_service.finish_order_by_id(99)
+        assert order_service.get_order_status(1) == "pending"
+    
+    def test_given_finished_order_when_cancelling_by_id_then_transition_is_refused(self, order_service):
+        order_service.create_order(create_simple_order(order_id=1))
+        order_service.create_order(create_simple_order(order_id=2))
+        order_service.get_next_order()
+        order_service.finish_order_by_id(1)
+        
+        assert not order_service.cancel_order_by_id(1)
+        assert order_service.cancel_order_by_id(2)
+        assert order_service.get_next_order() is None
+        assert [order_service.get_order_status(i) for i in (1, 2)] == ["completed", "cancelled"]
+    
+    def test_given_order_cancelled_after_leaving_queue_when_claiming_then_it_is_skipped(self, order_service):
+        order_service.create_order(create_simple_order(order_id=1))
+        order_service.create_order(create_simple_order(order_id=2))
+        order_service.database.set_status([1], "cancelled", "pending")
+        
+        assert order_service.get_next_order().id == 2
+        assert order_service.database.get_status(1) == "cancelled"
+
+    
+    def test_given_write_behind_when_transitioning_then_journal_is_not_flushed(self, tmp_path, monkeypatch):
+        db_path = str(tmp_path / "orders_test.db")
+        database = Database(db_path, write_behind=WriteBehindConfig(max_delay=0.05))
+        service = OrderService(database, QueueManager())
+        for i in (1, 2, 3):
+            service.create_order(create_simple_order(order_id=i))
+        monkeypatch.setattr(database, "flush", lambda: pytest.fail("synchronous commit"))
+        
+        assert [order.id for order in service.get_next_orders(2)] == [1, 2]
+        assert service.finish_order_by_id(1)
+        assert service.cancel_order_by_id(3)
+        assert not service.finish_order_by_id(3)
+        monkeypatch.undo()
+        database.close()
+        
+        reopened = Database(db_path)
+        assert [reopened.get_status(i) for i in (1, 2, 3)] == ["completed", "production", "cancelled"]
+        reopened.close()
+
+class TestProductUpdates:
+    
+    def test_given_queued_order_when_updating_product_then_next_get_returns_the_change(self, order_service):
+        order_service.create_order(create_order_with_multiple_products(order_id=7))
+        order_service.queue.get_by_id(7).json_bytes()
+        
+        product_json = order_service.update_product(7, 501, {"status": "completed"})
+        order = order_service.get_next_order()
+        
+        assert json.loads(product_json)["status"] == "completed"
+        assert json.loads(order.json_bytes())["products"][0]["status"] == "completed"
+        assert order_service.database.get_by_id(7).products[0].status == "completed"
+    
+    def test_given_invalid_or_unknown_product_when_updating_then_nothing_changes(self, order_service):
+        order_service.create_order(create_order_with_multiple_products(order_id=7))
+        
+        assert order_service.update_product(7, 999, {"status": "completed"}) is None
+        with pytest.raises(ValueError):
+            order_service.update_product(7, 501, {"syrups": []})
+        with pytest.raises(ValueError):
+            order_service.update_product(7, 501, {"status": None})
+        assert order_service.database.get_by_id(7).products[0].status == "pending"
+
+
+class TestDuplicateOrders:
+    
+    def test_given_existing_id_when_creating_again_then_order_is_refused_and_queue_is_unchanged(self, order_service):
+        order_service.create_order(create_simple_order(order_id=1, box=1))
+        order_service.get_next_order()
+        order_service.finish_order_by_id(1)
+        order_service.create_order(create_simple_order(order_id=2, box=1))
+        
+        with pytest.raises(DuplicateOrderError):
+            order_service.create_order(create_simple_order(order_id=1, box=2))
+        with pytest.raises(DuplicateOrderError):
+            order_service.create_order(create_simple_order(order_id=2, box=2))
+        
+        assert order_service.database.get_by_id(1).status == "completed"
+        assert order_service.get_next_order().box == 1
+        assert order_service.analytics.stats(1)["totals"]["created"] == 2
+    
+    def test_given_id_only_in_database_when_creating_then_order_is_refused(self, database):
+        OrderService(database, QueueManager()).create_order(create_simple_order(order_id=1))
+        
+        with pytest.raises(DuplicateOrderError):
+            OrderService(database, QueueManager()).create_order(create_simple_order(order_id=1))
+    
+    def test_given_batch_with_repeated_ids_when_creating_then_only_new_ids_are_created(self, order_service):
+        order_service.create_order(create_simple_order(order_id=1))
+        
+        results = order_service.create_orders([create_simple_order(order_id=i) for i in (1, 2, 2, 3)])
+        
+        assert [result["status"] for result in results] == ["error", "created", "error", "created"]
+        assert results[0]["message"] == "Order 1 already exists"
+        assert [order.id for order in order_service.queue.get_all_orders()] == [1, 2, 3]
@@ -0,0 +1,83 @@
+import sys
+from pathlib import Path
+
+root_dir = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(root_dir))
+
+from database.database import Database
+from database.queue_manager import QueueManager
+from models.models import Order
+from services.order_service import OrderService
+from services.pending_loader import PendingOrderLoader
+from services.status_cache import OrderStatusCache
+
+
+def _set_timestamp(database: Database, order_id: int, timestamp: str) -> None:
+    with database._get_connection() as conn:
+        conn.execute("UPDATE Orders SET timestamp = ? WHERE id = ?", (timestamp, order_id))
+        conn.commit()
+
+
+class TestPendingOrderLoader:
+
+    def test_given_pending_rows_when_loading_in_chunks_then_queue_follows_timestamp_then_rowid(self, database):
+        database.insert_many([Order(id=i, box=1, size=1) for i in (5, 3, 1, 4, 2)])
+        database.insert(Order(id=6, status="completed"))
+        _set_timestamp(database, 1, "2024-01-01 10:00:00")
+        _set_timestamp(database, 4, "2024-01-01 09:00:00")
+        
+        queue = QueueManager()
+        loader = PendingOrderLoader(database, queue, chunk_size=2)
+        
+        assert loader.run() == 5
+        assert [order.id for order in queue.get_all_orders()] == [4, 1, 5, 3, 2]
+        assert loader.progress()["loaded"] == 5
+        assert loader.is_done()
+    
+    def test_given_orders_created_during_load_when_dequeuing_then_backlog_comes_first(self, database):
+        database.insert_many([Order(id=i) for i in (1, 2, 3)])
+        queue = QueueManager()
+        service = OrderService(database, queue)
+        service.create_order({"id": 10, "box": 1, "size": 1, "products": []})
+        
+        PendingOrderLoader(database, queue, service.status_cache, chunk_size=1).run()
+        
+        assert [order.id for order in queue.dequeue_many(4)] == [1, 2, 3, 10]
+    
+    def test_given_order_cancelled_before_it_is_loaded_when_loading_then_it_is_not_enqueued(self, database):
+        database.insert_many([Order(id=i) for i in (1, 2, 3)])
+        queue = QueueManager()
+        status_cache = OrderStatusCache()
+        status_cache.set(2, "cancelled")
+        
+        loader = PendingOrderLoader(database, queue, status_cache)
+        loader.run()
+        
+        assert [order.id for order in queue.get_all_orders()] == [1, 3]
+        assert loader.progress()["skipped"] == 1
+        assert status_cache.get(1) == "pending"
+    
+    def test_given_status_polled_before_it_is_loaded_when_loading_then_order_is_still_enqueued(self, database):
+        database.insert_many([Order(id=i) for i in (1, 2, 3)])
+        queue = QueueManager()
+        service = OrderService(database, queue)
+        
+        assert service.get_order_status(2) == "pending"
+        loader = PendingOrderLoader(database, queue, service.status_cache)
+        loader.run()
+        
+        assert [order.id for order in queue.get_all_orders()] == [1, 2, 3]
+        assert loader.progress()["skipped"] == 0
+        service.get_next_order()
+        assert service.get_order_status(1) == "production"
+    
+    def test_given_background_load_when_waiting_then_all_pending_orders_are_queued(self, database):
+        database.insert_many([Order(id=i) for i in range(1, 2501)])
+        queue = QueueManager()
+        
+        loader = PendingOrderLoader(database, queue, chunk_size=100)
+        loader.start()
+        
+        assert loader.wait(timeout=10)
+        assert queue.size() == 2500
+        assert queue.dequeue().id == 1
@@ -0,0 +1,65 @@
+import json
+
+import sys
+from pathlib import Path
+
+root_dir = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(root_dir))
+
+from database.queue_manager import QueueManager
+from services.order_service import OrderService
+from services.queue_events import QueueEventBroker
+from tests.testE2E.mock import create_simple_order
+
+
+def _parse(chunk: str) -> dict:
+    fields = dict(line.split(": ", 1) for line in chunk.strip().split("\n"))
+    return {"id": fields.get("id"), "event": fields["event"], "data": json.loads(fields["data"])}
+
+
+class TestQueueEventBroker:
+
+    def test_given_subscribers_when_publishing_then_each_receives_events_in_sequence(self):
+        broker = QueueEventBroker()
+        first, _ = broker.subscribe()
+        second, sequence = broker.subscribe()
+        
+        broker.publish("enqueue", {"id": 1})
+        broker.publish("dequeue", {"id": 1})
+        
+        expected = [(sequence + 1, "enqueue", {"id": 1}), (sequence + 2, "dequeue", {"id": 1})]
+        assert first.next_events(0) == expected
+        assert second.next_events(0) == expected
+    
+    def test_given_slow_subscriber_when_buffer_fills_then_only_it_is_dropped(self):
+        broker = QueueEventBroker()
+        slow, _ = broker.subscribe(max_buffer=2)
+        fast, _ = broker.subscribe(max_buffer=10)
+        
+        for order_id in range(3):
+            broker.publish("enqueue", {"id": order_id})
+        
+        assert slow.dropped and len(slow.next_events(0)) == 2
+        assert not fast.dropped and len(fast.next_events(0)) == 3
+        assert broker.subscribers() == 1
+    
+    def test_given_service_when_streaming_then_snapshot_comes_first_followed_by_transitions(self, database):
+        service = OrderService(database, QueueManager())
+        service.create_order(create_simple_order(order_id=1))
+        stream = service.events.stream(service.queue_snapshot, keepalive=0.01)
+        
+        snapshot = _parse(next(stream))
+        service.create_order(create_simple_order(order_id=2, box=3))
+        service.get_next_order()
+        service.cancel_order_by_id(2)
+        events = [_parse(next(stream)) for _ in range(3)]
+        
+        assert snapshot["event"] == "snapshot"
+        assert snapshot["data"]["orders"] == [{"id": 1, "box": 1, "size": 1}]
+        assert [(event["event"], event["data"]["id"]) for event in events] == [
+            ("enqueue", 2), ("dequeue", 1), ("cancel", 2)
+        ]
+        assert events[0]["data"]["box"] == 3
+        assert next(stream) == ": keepalive\n\n"
+        stream.close()
+        assert service.events.subscribers() == 0
@@ -0,0 +1,196 @@
+import threading
+import time
+import pytest
+
+import sys
+from pathlib import Path
+
+root_dir = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(root_dir))
+
+from database.queue_manager import QueueManager, BoxLanesPolicy, ShortestJobFirstPolicy, create_policy
+from models.models import Order
+
+
+def _orders(count: int, start: int = 1):
+    return [Order(id=i, box=1, size=1) for i in range(start, start + count)]
+
+
+class TestQueueCancellation:
+    
+    def test_given_cancelled_orders_when_dequeuing_then_fifo_order_is_kept(self):
+        queue = QueueManager()
+        queue.enqueue_many(_orders(5))
+        
+        assert queue.remove(Order(id=2))
+        assert queue.remove(Order(id=4))
+        
+        assert queue.size() == 3
+        assert [queue.dequeue().id for _ in range(3)] == [1, 3, 5]
+        assert queue.dequeue() is None
+    
+    def test_given_order_not_in_queue_when_removing_then_false_is_returned(self):
+        queue = QueueManager()
+        queue.enqueue_many(_orders(2))
+        
+        assert not queue.remove(Order(id=99))
+        assert not queue.remove(Order(id=-1))
+        assert queue.size() == 2
+    
+    def test_given_many_cancellations_when_compacting_then_queue_stays_consistent(self):
+        queue = QueueManager()
+        total = QueueManager.COMPACTION_MIN_TOMBSTONES * 3
+        queue.enqueue_many(_orders(total))
+        
+        for order_id in range(1, total + 1):
+            if order_id % 3 != 0:
+                queue.remove(Order(id=order_id))
+        
+        assert queue.size() == total // 3
+        assert [order.id for order in queue.get_all_orders()] == list(range(3, total + 1, 3))
+        assert queue.get_by_id(3).id == 3
+        assert queue.get_by_id(1) is None
+
+
+class TestSchedulingPolicies:
+    
+    def test_given_default_policy_when_dequeuing_then_orders_leave_in_arrival_order(self):
+        queue = QueueManager()
+        queue.enqueue_many([Order(id=1, size=5), Order(id=2, size=1), Order(id=3, size=3)])
+        
+        assert [order.id for order in queue.dequeue_many(3)] == [1, 2, 3]
+    
+    def test_given_sjf_policy_when_dequeuing_then_smaller_orders_leave_first(self):
+        queue = QueueManager("sjf")
+        queue.enqueue_many([Order(id=1, size=12), Order(id=2, size=1), Order(id=3, size=1)])
+        
+        assert [order.id for order in queue.get_all_orders()] == [2, 3, 1]
+        assert [order.id for order in queue.dequeue_many(3)] == [2, 3, 1]
+    
+    def test_given_priority_policy_when_dequeuing_then_higher_priority_leaves_first(self):
+        queue = QueueManager("priority")
+        queue.enqueue_many([Order(id=1), Order(id=2, priority=5), Order(id=3, priority=1)])
+        
+        assert [order.id for order in queue.dequeue_many(3)] == [2, 3, 1]
+    
+    def test_given_box_lanes_policy_when_dequeuing_then_boxes_are_served_round_robin(self):
+        queue = QueueManager("box_lanes")
+        queue.enqueue_many([
+            Order(id=1, box=1), Order(id=2, box=1), Order(id=3, box=1),
+            Order(id=4, box=2), Order(id=5, box=3),
+        ])
+        queue.remove(Order(id=5))
+        
+        assert [order.id for order in queue.get_all_orders()] == [1, 4, 2, 3]
+        assert [order.id for order in queue.dequeue_many(5)] == [1, 4, 2, 3]
+        assert queue.is_empty()
+    
+    def test_given_aging_when_large_order_waited_long_then_it_is_not_starved(self, monkeypatch):
+        clock = iter([0.0, 100.0, 100.0])
+        monkeypatch.setattr("database.queue_manager.time.monotonic", lambda: next(clock))
+        queue = QueueManager(ShortestJobFirstPolicy(aging_rate=0.5))
+        
+        queue.enqueue(Order(id=1, size=12))
+        queue.enqueue(Order(id=2, size=1))
+        
+        assert queue.dequeue().id == 1
+    
+    def test_given_unknown_policy_name_when_creating_then_error_is_raised(self):
+        with pytest.raises(ValueError):
+            create_policy("random")
+        assert isinstance(create_policy("box_lanes"), BoxLanesPolicy)
+
+
+def _park(queue: QueueManager, results: list, wait: float = 5.0) -> threading.Thread:
+    """Inicia um dequeue com espera e só retorna quando ele está estacionado na fila"""
+    parked = queue.waiting()
+    thread = threading.Thread(target=lambda: results.append(queue.dequeue(wait=wait)))
+    thread.start()
+    while queue.waiting() == parked:
+        time.sleep(0.001)
+    return thread
+
+
+class TestLongPolling:
+
+    def test_given_parked_waiters_when_orders_arrive_then_they_are_served_in_arrival_order(self):
+        queue = QueueManager()
+        results = [[] for _ in range(3)]
+        threads = [_park(queue, result) for result in results]
+        
+        queue.enqueue(Order(id=1))
+        queue.enqueue_many(_orders(3, start=2))
+        for thread in threads:
+            thread.join()
+        
+        assert [result[0].id for result in results] == [1, 2, 3]
+        assert queue.waiting() == 0
+        assert queue.dequeue().id == 4
+    
+    def test_given_parked_waiter_when_order_arrives_then_plain_dequeue_does_not_take_it(self):
+        queue = QueueManager()
+        results = []
+        thread = _park(queue, results)
+        
+        queue.enqueue(Order(id=1))
+        taken = queue.dequeue()
+        thread.join()
+        
+        assert taken is None
+        assert results[0].id == 1
+    
+    def test_given_empty_queue_when_wait_expires_then_none_is_returned_and_waiter_leaves(self):
+        queue = QueueManager()
+        
+        started = time.monotonic()
+        assert queue.dequeue(wait=0.05) is None
+        
+        assert time.monotonic() - started >= 0.05
+        assert queue.waiting() == 0
+        queue.enqueue(Order(id=1))
+        assert queue.size() == 1
+
+
+class TestQueueTotals:
+    
+    def test_given_orders_entering_and_leaving_when_reading_totals_then_counters_follow(self):
+        queue = QueueManager()
+        queue.enqueue_many([Order(id=1, box=1, size=2), Order(id=2, box=2, size=3), Order(id=3, box=1, size=4)])
+        queue.dequeue()
+        queue.remove(Order(id=3))
+        
+        totals = queue.totals()
+        assert (totals["depth"], totals["cups"], totals["boxes"]) == (1, 3, {2: 1})
+        assert totals["oldest_age_seconds"] >= 0
+        
+        queue.dequeue()
+        assert queue.totals() == {"depth": 0, "cups": 0, "boxes": {}, "oldest_age_seconds": None}
+    
+    def test_given_backlog_loaded_after_live_orders_when_reading_age_then_backlog_is_oldest(self, monkeypatch):
+        clock = iter([10.0, 20.0])
+        monkeypatch.setattr(time, "monotonic", lambda: next(clock))
+        queue = QueueManager()
+        queue.enqueue(Order(id=1))
+        queue.enqueue_backlog([Order(id=2)], enqueued_at=5.0)
+        
+        assert queue.totals()["oldest_age_seconds"] == 15.0
+    
+    def test_given_long_waiting_order_when_many_others_pass_then_arrivals_stay_bounded(self):
+        queue = QueueManager()
+        queue.enqueue(Order(id=0, size=1))
+        for order in _orders(QueueManager.COMPACTION_MIN_TOMBSTONES * 3):
+            queue.enqueue(order)
+            queue.remove(order)
+        
+        assert len(queue._arrivals) <= QueueManager.COMPACTION_MIN_TOMBSTONES + 2
+        assert queue.totals()["depth"] == 1 and queue.get_page(0, 10)[0].id == 0
+    
+    def test_given_policy_when_paging_then_pages_follow_service_order(self):
+        queue = QueueManager(BoxLanesPolicy(ShortestJobFirstPolicy()))
+        queue.enqueue_many([Order(id=i, box=i % 2, size=10 - i) for i in range(1, 9)])
+        
+        expected = [order.id for order in queue.get_all_orders()]
+        pages = [order.id for offset in range(0, 8, 3) for order in queue.get_page(offset, 3)]
+        
+        assert pages == expected
+        assert queue.get_page(8, 3) == []
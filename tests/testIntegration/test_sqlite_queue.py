@@ -0,0 +1,129 @@
+import multiprocessing
+import threading
+import time
+import pytest
+
+import sys
+from pathlib import Path
+
+root_dir = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(root_dir))
+
+from database.database import Database
+from database.sqlite_queue import SQLiteQueueManager
+from models.models import Order
+from services.order_service import OrderService
+from services.status_cache import PassThroughStatusCache
+from tests.testE2E.mock import create_simple_order
+
+
+def _claim_all(database_path: str) -> list:
+    """Processo consumidor: reivindica pedidos até a fila compartilhada esvaziar"""
+    database = Database(database_path)
+    queue = SQLiteQueueManager(database)
+    claimed = []
+    while True:
+        orders = queue.dequeue_many(3) if len(claimed) % 2 else [queue.dequeue()]
+        if not orders or orders[0] is None:
+            break
+        claimed.extend(order.id for order in orders)
+    database.close()
+    return claimed
+
+
+class TestSQLiteQueueManager:
+
+    def test_given_policy_when_claiming_then_orders_leave_in_policy_order_as_production(self, database):
+        database.insert_many([Order(id=i, size=5 - i, priority=i % 3) for i in range(1, 5)])
+        
+        assert [order.id for order in SQLiteQueueManager(database, "priority").get_all_orders()] == [2, 1, 4, 3]
+        queue = SQLiteQueueManager(database, "sjf")
+        order = queue.dequeue()
+        
+        assert order.id == 4 and order.status == "production"
+        assert database.get_status(4) == "production"
+        assert [order.id for order in queue.dequeue_many(10)] == [3, 2, 1]
+        assert queue.dequeue() is None and queue.is_empty()
+    
+    def test_given_pending_order_when_removing_then_only_the_first_remove_wins(self, database):
+        database.insert(Order(id=1))
+        queue = SQLiteQueueManager(database)
+        
+        assert queue.get_by_id(1).id == 1
+        assert queue.remove(Order(id=1))
+        assert not queue.remove(Order(id=1))
+        assert database.get_status(1) == "cancelled"
+        assert queue.get_by_id(1) is None and queue.size() == 0
+    
+    def test_given_waiting_dequeue_when_order_is_enqueued_then_it_is_claimed_without_polling_delay(self, database):
+        queue = SQLiteQueueManager(database)
+        queue.POLL_INTERVAL = 60.0
+        
+        def produce():
+            database.insert(Order(id=1))
+            queue.enqueue(Order(id=1))
+        
+        producer = threading.Timer(0.1, produce)
+        producer.start()
+        order = queue.dequeue(wait=5)
+        producer.join()
+        
+        assert order.id == 1 and database.get_status(1) == "production"
+        assert queue.dequeue(wait=0.01) is None and queue.waiting() == 0
+    
+    def test_given_waiting_get_when_service_creates_order_then_row_exists_before_waiter_wakes(self, database):
+        queue = SQLiteQueueManager(database)
+        queue.POLL_INTERVAL = 60.0
+        service = OrderService(database, queue, PassThroughStatusCache())
+        
+        producer = threading.Timer(0.1, service.create_order, [create_simple_order(order_id=1)])
+        producer.start()
+        started = time.monotonic()
+        order = service.get_next_order(wait=5)
+        elapsed = time.monotonic() - started
+        producer.join()
+        
+        assert order is not None and order.id == 1
+        assert elapsed < 1.0
+        assert database.get_status(1) == "production"
+    
+    def test_given_pending_orders_when_reading_totals_and_pages_then_they_match_the_queue(self, database):
+        database.insert_many([Order(id=i, box=i % 2, size=i) for i in range(1, 6)])
+        queue = SQLiteQueueManager(database)
+        queue.dequeue()
+        
+        totals = queue.totals()
+        assert (totals["depth"], totals["cups"], totals["boxes"]) == (4, 14, {0: 2, 1: 2})
+        assert totals["oldest_age_seconds"] >= 0
+        assert [order.id for order in queue.get_page(1, 2)] == [3, 4]
+        assert [order.id for order in queue.get_all_orders(limit=2)] == [2, 3]
+    
+    def test_given_box_lanes_policy_when_creating_then_error_is_raised(self, database):
+        with pytest.raises(ValueError, match="box_lanes"):
+            SQLiteQueueManager(database, "box_lanes")
+    
+    def test_given_service_on_sqlite_queue_when_cycling_orders_then_status_comes_from_database(self, database):
+        service = OrderService(database, SQLiteQueueManager(database), PassThroughStatusCache())
+        for i in (1, 2):
+            service.create_order(create_simple_order(order_id=i))
+        
+        order = service.get_next_order()
+        database.update(Order(id=2, status="completed"))
+        
+        assert order.id == 1 and order.products[0].flavour == "chocolate"
+        assert service.get_order_status(1) == "production"
+        assert service.get_order_status(2) == "completed"
+        assert service.cancel_order_by_id(1)
+        assert service.get_order_status(1) == "cancelled"
+        assert service.get_next_order() is None
+    
+    def test_given_several_processes_when_claiming_then_no_order_is_delivered_twice(self, database):
+        total = 600
+        database.insert_many([Order(id=i) for i in range(1, total + 1)])
+        
+        with multiprocessing.get_context("spawn").Pool(4) as pool:
+            results = pool.map(_claim_all, [database.database_name] * 4)
+        
+        claimed = [order_id for ids in results for order_id in ids]
+        assert sorted(claimed) == list(range(1, total + 1))
+        assert sum(1 for ids in results if ids) > 1
@@ -0,0 +1,143 @@
+import json
+import sqlite3
+import threading
+import pytest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import sys
+from pathlib import Path
+
+root_dir = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(root_dir))
+
+from models.models import Order
+from services.sync_worker import SyncWorker
+from tests.testE2E.mock import create_simple_order
+
+
+class UpstreamStandIn:
+    """Servidor HTTP local que faz o papel do sistema central"""
+    
+    def __init__(self):
+        self.batches = []
+        self.fail_next = 0
+        self.reject_ids = set()
+        stand_in = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers["Content-Length"]))
+                orders = json.loads(body)["orders"]
+                if stand_in.fail_next > 0:
+                    stand_in.fail_next -= 1
+                    self.send_response(503)
+                elif any(order["id"] in stand_in.reject_ids for order in orders):
+                    self.send_response(422)
+                else:
+                    stand_in.batches.append(orders)
+                    self.send_response(200)
+                self.end_headers()
+            
+            def log_message(self, *args):
+                pass
+        
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/orders"
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+    
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def upstream():
+    stand_in = UpstreamStandIn()
+    yield stand_in
+    stand_in.close()
+
+
+def _unsynced_count(db_path: str) -> int:
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM Orders WHERE is_synced = 0").fetchone()[0]
+    finally:
+        conn.close()
+
+
+class TestSyncWorker:
+    
+    def test_given_unsynced_orders_when_syncing_then_batches_are_sent_and_marked(
+        self, database, db_path, upstream
+    ):
+        database.insert_many([Order.model_validate(create_simple_order(order_id=i)) for i in range(1, 6)])
+        worker = SyncWorker(database, upstream.url, batch_size=2)
+        
+        while worker.run_once():
+            pass
+        
+        assert [len(batch) for batch in upstream.batches] == [2, 3]
+        assert sorted(order["id"] for batch in upstream.batches for order in batch) == [1, 2, 3, 4, 5]
+        assert _unsynced_count(db_path) == 0
+    
+    def test_given_upstream_failure_when_syncing_then_batch_shrinks_and_backoff_grows(
+        self, database, db_path, upstream
+    ):
+        database.insert_many([Order.model_validate(create_simple_order(order_id=i)) for i in range(1, 9)])
+        upstream.fail_next = 2
+        worker = SyncWorker(database, upstream.url, batch_size=8, initial_backoff=0.5)
+        
+        assert worker.run_once() == 0
+        assert worker.run_once() == 0
+        assert worker.batch_size == 2
+        assert worker.stats()["backoff"] == 1.0
+        assert worker.run_once() == 2
+        assert worker.stats()["backoff"] == 0.0
+        assert _unsynced_count(db_path) == 6
+    
+    def test_given_permanently_rejected_order_when_syncing_then_it_is_skipped_and_others_are_synced(
+        self, database, db_path, upstream
+    ):
+        database.insert_many([Order.model_validate(create_simple_order(order_id=i)) for i in range(1, 9)])
+        upstream.reject_ids = {3}
+        worker = SyncWorker(database, upstream.url, batch_size=8, max_batch_size=8)
+        
+        for _ in range(20):
+            worker.run_once()
+        
+        assert sorted(order["id"] for batch in upstream.batches for order in batch) == [1, 2, 4, 5, 6, 7, 8]
+        assert worker.stats()["rejected_total"] == 1
+        assert worker.stats()["failures"] == 0
+        assert worker.stats()["backoff"] == 0.0
+        assert _unsynced_count(db_path) == 0
+        assert database.get_unsynced(10) == []
+    
+    def test_given_order_changed_after_read_when_marking_then_it_stays_unsynced(
+        self, database, db_path
+    ):
+        order = Order.model_validate(create_simple_order(order_id=1))
+        database.insert(order)
+        rows = database.get_unsynced(10)
+        
+        order.status = "production"
+        database.update(order)
+        database.mark_synced([(row[0], row[8]) for row in rows])
+        
+        assert _unsynced_count(db_path) == 1
+    
+    def test_given_running_worker_when_orders_arrive_then_they_are_synced_in_background(
+        self, database, db_path, upstream
+    ):
+        worker = SyncWorker(database, upstream.url, interval=0.01)
+        worker.start()
+        database.insert(Order.model_validate(create_simple_order(order_id=1)))
+        
+        for _ in range(200):
+            if upstream.batches:
+                break
+            threading.Event().wait(0.01)
+        worker.stop()
+        
+        assert upstream.batches[0][0]["id"] == 1
+        assert upstream.batches[0][0]["products"][0]["flavour"] == "chocolate"
@@ -1,43 +1,211 @@
+import atexit
 import logging
+import os
 import sys
+import threading
 from pathlib import Path
-from logging.handlers import RotatingFileHandler
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from queue import Empty, SimpleQueue
+from typing import Dict, Optional, Tuple
 
 
-def setup_logger(name: str = None, log_file: str = "orders_api.log") -> logging.Logger:
-    logger = logging.getLogger(name or __name__)
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+_pipeline_lock = threading.Lock()
+_queue_handler: Optional[QueueHandler] = None
+_listener: Optional[QueueListener] = None
+_default_level = logging.DEBUG
+_levels: Dict[str, int] = {}
+
+
+class DeferredQueueHandler(QueueHandler):
+    """
+    Enfileira o registro sem formatá-lo: a mensagem %-style só é montada
+    na thread do QueueListener, fora da requisição. Por isso os argumentos
+    de log devem ser valores que não mudam depois da chamada (ids, textos...).
+    """
     
-    if logger.handlers:
-        return logger
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+class _BatchFlushMixin:
+    """
+    StreamHandler.emit faz flush a cada registro; aqui o flush fica para o fim
+    de cada lote drenado pelo BatchingQueueListener (ou para o close).
+    """
+    
+    def flush(self) -> None:
+        pass
+    
+    def flush_batch(self) -> None:
+        logging.StreamHandler.flush(self)
+
+
+class BatchedStreamHandler(_BatchFlushMixin, logging.StreamHandler):
+    pass
+
+
+class BatchedRotatingFileHandler(_BatchFlushMixin, RotatingFileHandler):
+    """
+    A checagem de rotação (stat + seek no arquivo) sai de cada registro e
+    passa a ser feita uma vez por lote; o arquivo pode passar de maxBytes
+    pelo tamanho de um lote.
+    """
+    
+    def shouldRollover(self, record: logging.LogRecord) -> bool:
+        return False
+    
+    def flush_batch(self) -> None:
+        super().flush_batch()
+        if self.stream is not None and self.maxBytes > 0 and self.stream.tell() >= self.maxBytes:
+            self.acquire()
+            try:
+                self.doRollover()
+            finally:
+                self.release()
+
+
+class BatchingQueueListener(QueueListener):
+    """Drena a fila de log em lotes e faz um único flush por handler ao fim de cada lote"""
     
-    logger.setLevel(logging.DEBUG)
+    MAX_BATCH = 512
     
-    formatter = logging.Formatter(
-        '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        datefmt='%Y-%m-%d %H:%M:%S'
-    )
+    def _monitor(self) -> None:
+        log_queue = self.queue
+        while True:
+            batch = [log_queue.get()]
+            while len(batch) < self.MAX_BATCH:
+                try:
+                    batch.append(log_queue.get_nowait())
+                except Empty:
+                    break
+            
+            stopping = False
+            for record in batch:
+                if record is self._sentinel:
+                    stopping = True
+                else:
+                    self.handle(record)
+            
+            for handler in self.handlers:
+                try:
+                    getattr(handler, 'flush_batch', handler.flush)()
+                except (OSError, ValueError):
+                    # Stream fechado ou indisponível: como em Handler.emit, o log não derruba a thread
+                    pass
+            if stopping:
+                return
+
+
+class DebugSamplingFilter(logging.Filter):
+    """
+    Deixa passar 1 a cada `every` registros DEBUG de cada ponto de log
+    (arquivo e linha); a primeira ocorrência sempre passa. Registros INFO
+    ou acima nunca são descartados. A contagem é aproximada sob concorrência.
+    """
     
-    console_handler = logging.StreamHandler(sys.stdout)
-    console_handler.setLevel(logging.INFO)
-    console_handler.setFormatter(formatter)
-    logger.addHandler(console_handler)
+    def __init__(self, every: int = 1):
+        super().__init__()
+        self.every = max(1, every)
+        self._counts: Dict[Tuple[str, int], int] = {}
     
-    log_dir = Path(__file__).parent.parent / "logs"
-    log_dir.mkdir(exist_ok=True)
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.every == 1 or record.levelno > logging.DEBUG:
+            return True
+        
+        site = (record.pathname, record.lineno)
+        count = self._counts.get(site, 0)
+        self._counts[site] = count + 1
+        return count % self.every == 0
+
+
+def _parse_level(value: str) -> Optional[int]:
+    level = logging.getLevelName(value.strip().upper())
+    return level if isinstance(level, int) else None
+
+
+def _parse_levels(spec: str) -> Dict[str, int]:
+    """Lê "database=INFO,api.http.routes=WARNING" em {prefixo do logger: nível}"""
+    levels = {}
+    for item in spec.split(','):
+        name, _, value = item.partition('=')
+        level = _parse_level(value) if name.strip() else None
+        if level is None:
+            if item.strip():
+                sys.stderr.write(f"ORDERS_API_LOG_LEVELS: entrada ignorada '{item.strip()}'\n")
+            continue
+        levels[name.strip()] = level
+    return levels
+
+
+def _level_for(name: str) -> int:
+    """Nível do prefixo mais específico configurado para o logger, ou o nível padrão"""
+    best, level = -1, _default_level
+    for prefix, prefix_level in _levels.items():
+        if (name == prefix or name.startswith(prefix + '.')) and len(prefix) > best:
+            best, level = len(prefix), prefix_level
+    return level
+
+
+def _ensure_pipeline(log_file: str) -> QueueHandler:
+    """
+    Cria, uma única vez por processo, os handlers de console e de arquivo e o
+    QueueListener que os alimenta em uma thread própria. Variáveis de ambiente:
+    ORDERS_API_LOG_LEVEL (nível padrão, DEBUG), ORDERS_API_LOG_LEVELS (níveis por
+    logger) e ORDERS_API_LOG_DEBUG_SAMPLE (grava 1 a cada N DEBUG de cada ponto).
+    """
+    global _queue_handler, _listener, _default_level, _levels
     
-    file_handler = RotatingFileHandler(
-        log_dir / log_file,
-        maxBytes=10 * 1024 * 1024,
-        backupCount=5,
-        encoding='utf-8'
-    )
-    file_handler.setLevel(logging.DEBUG)
-    file_handler.setFormatter(formatter)
-    logger.addHandler(file_handler)
+    with _pipeline_lock:
+        if _queue_handler is not None:
+            return _queue_handler
+        
+        _default_level = _parse_level(os.environ.get("ORDERS_API_LOG_LEVEL", "DEBUG")) or logging.DEBUG
+        _levels = _parse_levels(os.environ.get("ORDERS_API_LOG_LEVELS", ""))
+        
+        formatter = logging.Formatter(LOG_FORMAT, datefmt=DATE_FORMAT)
+        
+        console_handler = BatchedStreamHandler(sys.stdout)
+        console_handler.setLevel(logging.INFO)
+        console_handler.setFormatter(formatter)
+        
+        log_dir = Path(__file__).parent.parent / "logs"
+        log_dir.mkdir(exist_ok=True)
+        
+        file_handler = BatchedRotatingFileHandler(
+            log_dir / log_file,
+            maxBytes=10 * 1024 * 1024,
+            backupCount=5,
+            encoding='utf-8'
+        )
+        file_handler.setLevel(logging.DEBUG)
+        file_handler.setFormatter(formatter)
+        
+        log_queue = SimpleQueue()
+        queue_handler = DeferredQueueHandler(log_queue)
+        queue_handler.addFilter(DebugSamplingFilter(int(os.environ.get("ORDERS_API_LOG_DEBUG_SAMPLE", 1))))
+        
+        _listener = BatchingQueueListener(log_queue, console_handler, file_handler, respect_handler_level=True)
+        _listener.start()
+        atexit.register(_listener.stop)
+        
+        _queue_handler = queue_handler
+        return _queue_handler
+
+
+def setup_logger(name: str = None, log_file: str = "orders_api.log") -> logging.Logger:
+    logger = logging.getLogger(name or __name__)
+    
+    if logger.handlers:
+        return logger
+    
+    logger.addHandler(_ensure_pipeline(log_file))
+    logger.setLevel(_level_for(logger.name))
     
     return logger
 
 
 def get_logger(name: str = None) -> logging.Logger:
     return setup_logger(name)
-
@@ -0,0 +1,255 @@
+import threading
+import time
+import weakref
+from bisect import bisect_left
+from functools import wraps
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Latências de requisições e consultas: 100µs a 10s
+LATENCY_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+# Tempo de espera na fila: 100ms a 1h
+WAIT_BUCKETS = (0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0, 3600.0)
+
+
+class _Shard:
+    __slots__ = ("values", "__weakref__")
+    
+    def __init__(self, size: int):
+        self.values = [0] * size
+
+
+class _ShardedValues:
+    """
+    Vetor de valores somados, com uma cópia por thread: cada thread só escreve
+    na sua, então registrar não usa lock. A leitura soma as cópias vivas com
+    as das threads já encerradas, acumuladas quando o threading.local as libera.
+    """
+    
+    def __init__(self, size: int):
+        self.size = size
+        self._local = threading.local()
+        self._live: weakref.WeakSet = weakref.WeakSet()
+        self._retired = [0] * size
+        self._lock = threading.Lock()
+    
+    def local(self) -> List[float]:
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._new_shard()
+        return shard.values
+    
+    def _new_shard(self) -> _Shard:
+        shard = _Shard(self.size)
+        self._local.shard = shard
+        with self._lock:
+            self._live.add(shard)
+        weakref.finalize(shard, self._retire, shard.values)
+        return shard
+    
+    def _retire(self, values: List[float]) -> None:
+        with self._lock:
+            for index, value in enumerate(values):
+                self._retired[index] += value
+    
+    def snapshot(self) -> List[float]:
+        # As referências em `shards` impedem que um shard seja aposentado (e somado
+        # em _retired) no meio da leitura; a soma é feita fora do lock porque a
+        # liberação delas pode disparar _retire nesta mesma thread.
+        with self._lock:
+            totals = list(self._retired)
+            shards = list(self._live)
+        for shard in shards:
+            for index, value in enumerate(shard.values):
+                totals[index] += value
+        return totals
+
+
+class _Metric:
+
+    kind = "untyped"
+    
+    def __init__(self, name: str, description: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.description = description
+        self.labels = tuple(labels)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+    
+    def _child(self, values: Tuple[str, ...]):
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.get(values)
+                if child is None:
+                    child = self._children[values] = self._new_child()
+        return child
+    
+    def _new_child(self):
+        raise NotImplementedError
+    
+    def _label_text(self, values: Tuple[str, ...], extra: str = "") -> str:
+        pairs = [f'{name}="{_escape(value)}"' for name, value in zip(self.labels, values)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+    
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.description}\n"
+        yield f"# TYPE {self.name} {self.kind}\n"
+        for values, child in sorted(self._children.items()):
+            yield from self._render_child(values, child)
+    
+    def _render_child(self, values: Tuple[str, ...], child) -> Iterator[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+
+    kind = "counter"
+    
+    def _new_child(self) -> _ShardedValues:
+        return _ShardedValues(1)
+    
+    def inc(self, *label_values: str, amount: float = 1) -> None:
+        self._child(label_values).local()[0] += amount
+    
+    def value(self, *label_values: str) -> float:
+        child = self._children.get(label_values)
+        return child.snapshot()[0] if child else 0
+    
+    def _render_child(self, values, child) -> Iterator[str]:
+        yield f"{self.name}{self._label_text(values)} {_number(child.snapshot()[0])}\n"
+
+
+class Histogram(_Metric):
+    """Histograma com buckets fixos; cada observação é um bisect e dois incrementos"""
+    
+    kind = "histogram"
+    
+    def __init__(
+        self, name: str, description: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS
+    ):
+        super().__init__(name, description, labels)
+        self.buckets = tuple(sorted(buckets))
+    
+    def _new_child(self) -> _ShardedValues:
+        # Um contador por bucket, mais o +Inf, seguido da soma das observações
+        return _ShardedValues(len(self.buckets) + 2)
+    
+    def observe(self, value: float, *label_values: str) -> None:
+        values = self._child(label_values).local()
+        values[bisect_left(self.buckets, value)] += 1
+        values[-1] += value
+    
+    def time(self, *label_values: str) -> Callable:
+        """Decorador que observa a duração de cada chamada da função"""
+        def decorator(func: Callable) -> Callable:
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.observe(time.perf_counter() - start, *label_values)
+            return wrapper
+        return decorator
+    
+    def count(self, *label_values: str) -> int:
+        child = self._children.get(label_values)
+        return int(sum(child.snapshot()[:-1])) if child else 0
+    
+    def _render_child(self, values, child) -> Iterator[str]:
+        snapshot = child.snapshot()
+        labels = self._label_text(values)
+        cumulative = 0
+        for bound, count in zip(self.buckets, snapshot):
+            cumulative += count
+            bucket_labels = self._label_text(values, 'le="%s"' % _number(bound))
+            yield f"{self.name}_bucket{bucket_labels} {_number(cumulative)}\n"
+        cumulative += snapshot[len(self.buckets)]
+        inf_labels = self._label_text(values, 'le="+Inf"')
+        yield f"{self.name}_bucket{inf_labels} {_number(cumulative)}\n"
+        yield f"{self.name}_sum{labels} {_number(snapshot[-1])}\n"
+        yield f"{self.name}_count{labels} {_number(cumulative)}\n"
+
+
+class Gauge(_Metric):
+    """Valor lido na hora da coleta, por uma função registrada com `set_function`"""
+    
+    kind = "gauge"
+    
+    def __init__(self, name: str, description: str):
+        super().__init__(name, description)
+        self._function: Optional[Callable[[], float]] = None
+    
+    def set_function(self, function: Callable[[], float]) -> None:
+        self._function = function
+    
+    def render(self) -> Iterator[str]:
+        if self._function is None:
+            return
+        yield f"# HELP {self.name} {self.description}\n"
+        yield f"# TYPE {self.name} {self.kind}\n"
+        yield f"{self.name} {_number(self._function())}\n"
+
+
+class Registry:
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+    
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Métrica já registrada: {metric.name}")
+            self._metrics[metric.name] = metric
+        return metric
+    
+    def counter(self, name: str, description: str, labels: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, description, labels))
+    
+    def histogram(
+        self, name: str, description: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS
+    ) -> Histogram:
+        return self.register(Histogram(name, description, labels, buckets))
+    
+    def gauge(self, name: str, description: str) -> Gauge:
+        return self.register(Gauge(name, description))
+    
+    def render(self) -> Iterator[str]:
+        """Todas as métricas no formato de exposição em texto do Prometheus"""
+        for metric in list(self._metrics.values()):
+            yield from metric.render()
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _number(value: float) -> str:
+    if isinstance(value, float) and value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value)
+
+
+REGISTRY = Registry()
+
+HTTP_REQUESTS = REGISTRY.counter(
+    "orders_api_http_requests_total", "Requisições HTTP atendidas", ("method", "route", "status")
+)
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    "orders_api_http_request_duration_seconds", "Latência das requisições HTTP", ("method", "route")
+)
+DB_QUERY_SECONDS = REGISTRY.histogram(
+    "orders_api_db_query_duration_seconds", "Latência das operações no SQLite por tipo", ("statement",)
+)
+QUEUE_SIZE = REGISTRY.gauge("orders_api_queue_size", "Pedidos aguardando na fila")
+QUEUE_WAIT_SECONDS = REGISTRY.histogram(
+    "orders_api_queue_wait_seconds", "Tempo entre a entrada na fila e a retirada do pedido", buckets=WAIT_BUCKETS
+)
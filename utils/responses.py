@@ -1,5 +1,6 @@
-from flask import jsonify
-from typing import Any, Optional
+import json
+from flask import Response, jsonify
+from typing import Any, Dict, Iterable, List, Optional
 
 
 class ApiResponse:
@@ -47,22 +48,102 @@ class ApiResponse:
     def invalid_format(message: str = "Invalid format"):
         return ApiResponse.bad_request(message=message)
 
+    
+    @staticmethod
+    def success_raw(fields: Dict[str, bytes], message: Optional[str] = None, status_code: int = 200):
+        """
+        Como `success`, mas com valores já serializados em JSON (ex.: `Order.json_bytes`),
+        emendados no corpo sem passar de novo pelo encoder.
+        """
+        parts = [b'{"status":"success"']
+        if message:
+            parts.append(b',"message":' + json.dumps(message).encode())
+        for name, value in fields.items():
+            parts.append(b',"' + name.encode() + b'":' + value)
+        parts.append(b'}\n')
+        return Response(b''.join(parts), mimetype="application/json"), status_code
+    
+    @staticmethod
+    def stream(lines: Iterable[str], mimetype: str, status_code: int = 200, headers: Optional[dict] = None):
+        return Response(lines, mimetype=mimetype, headers=headers), status_code
+
+
+def _order_json(order: Any) -> bytes:
+    """JSON de um pedido, reaproveitando o guardado no Order quando houver"""
+    return order.json_bytes() if hasattr(order, 'json_bytes') else json.dumps(order).encode()
+
+
+def _orders_json(orders: List[Any]) -> bytes:
+    return b'[' + b','.join(_order_json(order) for order in orders) + b']'
+
 
 class OrderResponse(ApiResponse):
     
     @staticmethod
     def order_created(order: Any):
-        return ApiResponse.created(
-            data={"order": order.model_dump() if hasattr(order, 'model_dump') else order},
-            message="Order received"
-        )
+        return ApiResponse.success_raw({"order": _order_json(order)}, message="Order received", status_code=201)
     
     @staticmethod
-    def order_retrieved(order: Any):
+    def orders_batch_created(results: List[Dict[str, Any]]):
+        created = sum(1 for result in results if result["status"] == "created")
+        failed = len(results) - created
+        
+        items = []
+        for result in results:
+            item = dict(result)
+            if "order" in item and hasattr(item["order"], 'model_dump'):
+                item["order"] = item["order"].model_dump()
+            items.append(item)
+        
+        if created == 0:
+            return ApiResponse.error(
+                message="No orders were created",
+                status_code=400,
+                details={"results": items, "created": created, "failed": failed}
+            )
+        
         return ApiResponse.success(
-            data={"order": order.model_dump() if hasattr(order, 'model_dump') else order}
+            data={"results": items, "created": created, "failed": failed},
+            message="Orders batch processed",
+            status_code=207 if failed else 201
         )
     
+    @staticmethod
+    def order_already_exists(message: str):
+        return ApiResponse.error(message=message, status_code=409)
+    
+    @staticmethod
+    def order_retrieved(order: Any):
+        return ApiResponse.success_raw({"order": _order_json(order)})
+    
+    @staticmethod
+    def orders_retrieved(orders: List[Any]):
+        return ApiResponse.success_raw({"orders": _orders_json(orders)})
+    
+    @staticmethod
+    def queue_snapshot(page: Dict[str, Any]):
+        fields = {name: json.dumps(value).encode() for name, value in page.items() if name != "orders"}
+        fields["orders"] = _orders_json(page["orders"])
+        return ApiResponse.success_raw(fields)
+    
+    @staticmethod
+    def orders_export(rows: Iterable[tuple]):
+        """NDJSON com uma linha por pedido; `products` é copiado como já está gravado no banco"""
+        def lines():
+            for rowid, order_id, box, status, size, priority, timestamp, products_json in rows:
+                head = json.dumps({
+                    "rowid": rowid,
+                    "id": order_id,
+                    "box": box,
+                    "status": status,
+                    "size": size,
+                    "priority": priority,
+                    "timestamp": timestamp,
+                })
+                yield f'{head[:-1]}, "products": {products_json}}}\n'
+        
+        return ApiResponse.stream(lines(), mimetype="application/x-ndjson")
+    
     @staticmethod
     def order_finished():
         return ApiResponse.success(message="Order marked as completed")
@@ -72,6 +153,30 @@ class OrderResponse(ApiResponse):
         message = f"Order {order_id} cancelled" if order_id else "Order cancelled"
         return ApiResponse.success(message=message)
     
+    @staticmethod
+    def invalid_transition(status: str):
+        return ApiResponse.error(message=f"Order is {status}", status_code=409)
+    
+    @staticmethod
+    def product_updated(product_json: str):
+        return ApiResponse.success_raw({"product": product_json.encode()}, message="Product updated")
+    
+    @staticmethod
+    def product_not_found():
+        return ApiResponse.not_found(message="Product not found")
+    
+    @staticmethod
+    def invalid_product_format():
+        return ApiResponse.invalid_format(message="Invalid product format")
+    
+    @staticmethod
+    def stats(stats: Dict[str, Any]):
+        return ApiResponse.success(data=stats)
+    
+    @staticmethod
+    def invalid_stats_window():
+        return ApiResponse.bad_request(message="Invalid hours")
+    
     @staticmethod
     def order_status(status: str):
         return ApiResponse.success(data={"order_status": status})
@@ -92,6 +197,22 @@ class OrderResponse(ApiResponse):
     def invalid_order_id():
         return ApiResponse.bad_request(message="Invalid ID")
     
+    @staticmethod
+    def invalid_order_count():
+        return ApiResponse.bad_request(message="Invalid order count")
+    
+    @staticmethod
+    def invalid_wait():
+        return ApiResponse.bad_request(message="Invalid wait")
+    
+    @staticmethod
+    def invalid_pagination():
+        return ApiResponse.bad_request(message="Invalid pagination")
+    
+    @staticmethod
+    def invalid_export_filter(message: str):
+        return ApiResponse.bad_request(message=message)
+    
     @staticmethod
     def order_not_in_queue():
         return ApiResponse.not_found(message="Order not found in queue")